@@ -0,0 +1,87 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the number of tree nodes, the memory, and the lookup time of the
+   region map built from fragmented client IP ranges with and without
+   aggregation. Every build is measured in its own process.
+
+   python3 benchmarks/bench_aggregation.py [REGIONS] [PREFIXES] [SPLIT]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import synthetic
+import region_srv
+
+
+def measure(region_data, engine, aggregate):
+    memory_before = synthetic.resident_memory()
+    start = time.perf_counter()
+    region_map = region_srv.create_smt_region_map(
+        region_data, engine, aggregate == 'aggregated'
+    )
+    load_s = time.perf_counter() - start
+    final_bytes = synthetic.resident_memory() - memory_before
+    ipv4_ranges_map = region_map.ipv4_ranges_map
+    address = synthetic.ipv4_prefixes(1, 1)[0].split('/')[0]
+    lookups = 100000
+    return {
+        'load_s': load_s,
+        'final_bytes': final_bytes,
+        'nodes': len(ipv4_ranges_map) + len(region_map.ipv6_ranges_map),
+        'lookup_ns': timeit.timeit(
+            lambda: ipv4_ranges_map.get(address), number=lookups
+        ) * 1e9 / lookups
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        print(json.dumps(measure(*sys.argv[2:5])))
+        return
+
+    regions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    prefixes = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    split = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    print('%-9s %-11s %10s %10s %12s %10s' % (
+        'engine', 'ranges', 'nodes', 'load s', 'final MiB', 'lookup ns'
+    ))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(
+            region_data, regions, prefixes, split=split
+        )
+        for engine in region_srv.LOOKUP_ENGINES:
+            for aggregate in ('configured', 'aggregated'):
+                result = json.loads(subprocess.check_output([
+                    sys.executable, __file__, '--measure', region_data,
+                    engine, aggregate
+                ]))
+                print('%-9s %-11s %10d %10.2f %12.1f %10.0f' % (
+                    engine, aggregate, result['nodes'], result['load_s'],
+                    result['final_bytes'] / 2 ** 20, result['lookup_ns']
+                ))
+
+
+if __name__ == '__main__':
+    main()
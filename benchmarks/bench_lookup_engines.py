@@ -0,0 +1,101 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare lookup latency and resident memory of the lookup engines. Each
+   engine is measured in its own process such that the memory use does not
+   interfere.
+
+   python3 benchmarks/bench_lookup_engines.py [PREFIXES] [LOOKUPS]
+"""
+
+import json
+import random
+import subprocess
+import sys
+import time
+
+import synthetic
+import region_srv
+
+
+def measure(engine_name, prefixes, lookups):
+    engine = region_srv.LOOKUP_ENGINES[engine_name]
+    regions = 100
+    per_region = prefixes // regions
+    ranges = [
+        (prefix, [synthetic.region_name(region)])
+        for region in range(1, regions + 1)
+        for prefix in synthetic.ipv4_prefixes(region, per_region)
+    ]
+    rng = random.Random(0)
+    addresses = [
+        '%d.%d.%d.%d' % (
+            rng.randint(1, regions), rng.randint(0, 255),
+            rng.randint(0, 255), rng.randint(0, 255)
+        ) for _ in range(lookups)
+    ]
+
+    memory_before = synthetic.resident_memory()
+    start = time.perf_counter()
+    ranges_map = engine.create(32)
+    for prefix, value in ranges:
+        ranges_map.insert(prefix, value)
+    ranges_map = engine.finalize(ranges_map)
+    build_time = time.perf_counter() - start
+    del ranges
+    memory = synthetic.resident_memory() - memory_before
+
+    get = ranges_map.get
+    start = time.perf_counter()
+    for address in addresses:
+        get(address)
+    lookup_time = time.perf_counter() - start
+
+    return {
+        'engine': engine_name,
+        'prefixes': per_region * regions,
+        'build_s': build_time,
+        'lookup_ns': lookup_time / lookups * 1e9,
+        'memory_bytes': memory
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--engine':
+        print(json.dumps(measure(
+            sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+        )))
+        return
+
+    prefixes = sys.argv[1] if len(sys.argv) > 1 else '100000'
+    lookups = sys.argv[2] if len(sys.argv) > 2 else '200000'
+    print('%-10s %10s %10s %12s %14s' % (
+        'engine', 'prefixes', 'build s', 'lookup ns', 'memory MiB'
+    ))
+    for engine_name in sorted(region_srv.LOOKUP_ENGINES):
+        result = json.loads(subprocess.check_output([
+            sys.executable, __file__, '--engine', engine_name,
+            prefixes, lookups
+        ]))
+        print('%-10s %10d %10.2f %12.0f %14.1f' % (
+            result['engine'], result['prefixes'], result['build_s'],
+            result['lookup_ns'], result['memory_bytes'] / 2 ** 20
+        ))
+
+
+if __name__ == '__main__':
+    main()
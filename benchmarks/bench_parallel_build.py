@@ -0,0 +1,70 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the time to build the region map with the client IP ranges
+   parsed by the loading thread and in a pool of 2 to N processes, N
+   defaults to the number of CPUs. Every parallel build is checked to
+   create the same trees as the serial build.
+
+   python3 benchmarks/bench_parallel_build.py [N] [REGIONS] [PREFIXES]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_srv
+
+
+def get_ranges(ranges_map):
+    return dict((prefix, ranges_map[prefix][0][5]) for prefix in ranges_map)
+
+
+def main():
+    max_processes = int(sys.argv[1]) if len(sys.argv) > 1 \
+        else os.cpu_count()
+    regions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    prefixes = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    print('%-10s %10s %10s %10s' % (
+        'processes', 'build s', 'speedup', 'identical'
+    ))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, regions, prefixes)
+        serial = None
+        for processes in range(1, max(max_processes, 1) + 1):
+            start = time.perf_counter()
+            region_map = region_srv.create_smt_region_map(
+                region_data, processes=processes
+            )
+            build_time = time.perf_counter() - start
+            ranges = (
+                get_ranges(region_map.ipv4_ranges_map),
+                get_ranges(region_map.ipv6_ranges_map)
+            )
+            if serial is None:
+                serial = (build_time, ranges)
+            print('%-10d %10.2f %10.2f %10s' % (
+                processes, build_time, serial[0] / build_time,
+                ranges == serial[1]
+            ))
+
+
+if __name__ == '__main__':
+    main()
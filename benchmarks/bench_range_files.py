@@ -0,0 +1,76 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the peak memory of loading the client IP ranges from the region
+   data configuration with streaming them from per region range files.
+   Every load is measured in its own process.
+
+   python3 benchmarks/bench_range_files.py [REGIONS] [PREFIXES_PER_REGION]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_srv
+
+
+def measure(region_data):
+    memory_before = synthetic.resident_memory()
+    start = time.perf_counter()
+    region_map = region_srv.create_smt_region_map(region_data)
+    return {
+        'load_s': time.perf_counter() - start,
+        'peak_bytes': synthetic.peak_memory() - memory_before,
+        'final_bytes': synthetic.resident_memory() - memory_before,
+        'prefixes': len(region_map.ipv4_ranges_map) +
+        len(region_map.ipv6_ranges_map)
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        print(json.dumps(measure(sys.argv[2])))
+        return
+
+    regions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    prefixes = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    print('%-12s %10s %10s %14s %14s' % (
+        'ranges', 'prefixes', 'load s', 'peak MiB', 'final MiB'
+    ))
+    for range_files in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            region_data = os.path.join(tmp_dir, 'regionData.cfg')
+            synthetic.write_region_data(
+                region_data, regions, prefixes, range_files=range_files
+            )
+            result = json.loads(subprocess.check_output([
+                sys.executable, __file__, '--measure', region_data
+            ]))
+        print('%-12s %10d %10.2f %14.1f %14.1f' % (
+            'files' if range_files else 'inline', result['prefixes'],
+            result['load_s'], result['peak_bytes'] / 2 ** 20,
+            result['final_bytes'] / 2 ** 20
+        ))
+
+
+if __name__ == '__main__':
+    main()
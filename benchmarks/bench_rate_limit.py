@@ -0,0 +1,80 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the requests per second of the regionInfo request handling for
+   requests that are answered, without rate limit, and for requests that
+   are rejected by the rate limit, and the requests per second of the
+   rate limit alone with many clients.
+
+   python3 benchmarks/bench_rate_limit.py [REQUESTS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from werkzeug.datastructures import Accept, ETags, MIMEAccept, MultiDict
+
+import synthetic
+import region_ratelimit
+
+
+def requests_per_second(region_info, requests, requester_ip):
+    args = MultiDict()
+    accept_mimetypes = MIMEAccept()
+    accept_encodings = Accept()
+    if_none_match = ETags()
+    start = time.perf_counter()
+    for _ in range(requests):
+        region_info.get_region_info(
+            requester_ip, args, accept_mimetypes, accept_encodings,
+            if_none_match
+        )
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, 10, 100, servers=4)
+        region_info = synthetic.load_region_info(
+            tmp_dir, region_data, logFormat='access', rateLimit=1,
+            rateLimitBurst=1
+        )
+        rate_limiter = region_info.rate_limiter
+
+        region_info.rate_limiter = None
+        answered = requests_per_second(region_info, requests, '1.0.0.1')
+        region_info.rate_limiter = rate_limiter
+        rejected = requests_per_second(region_info, requests, '1.0.0.1')
+
+        clients = region_ratelimit.RateLimiter(1, 1, 10000)
+        start = time.perf_counter()
+        for i in range(requests):
+            clients.allow('10.%d.%d.1' % (i // 256 % 256, i % 256))
+        limit_only = requests / (time.perf_counter() - start)
+
+    print('%-24s %14s' % ('case', 'requests/s'))
+    print('%-24s %14.0f' % ('answered', answered))
+    print('%-24s %14.0f' % ('rejected', rejected))
+    print('%-24s %14.0f' % ('rate limit, 64k clients', limit_only))
+
+
+if __name__ == '__main__':
+    main()
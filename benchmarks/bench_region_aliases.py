@@ -0,0 +1,80 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the requests per second of get_response_xml for a region hint
+   matching the region name, for a hint matching an availability zone of
+   the region, and for a hint matching no region, which falls back to the
+   client IP lookup, and the size and build time of the alias index.
+
+   python3 benchmarks/bench_region_aliases.py [REQUESTS] [REGIONS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_srv
+
+
+def requests_per_second(region_map, requests, region_hint):
+    start = time.perf_counter()
+    for _ in range(requests):
+        region_srv.get_response_xml(
+            '1.0.0.1',
+            region_hint,
+            region_map.region_name_to_smt_data_map,
+            region_map.ipv4_ranges_map,
+            region_map.ipv6_ranges_map,
+            region_map.response_cache,
+            region_aliases=region_map.region_aliases
+        )
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    regions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, regions, 100, servers=4)
+        region_map = region_srv.create_smt_region_map(region_data)
+
+    start = time.perf_counter()
+    region_aliases = region_srv.RegionAliases(
+        region_map.region_name_to_smt_data_map
+    )
+    build_time = time.perf_counter() - start
+    print('alias index: %d hints for %d regions, built in %.1f ms' % (
+        len(region_aliases), regions, build_time * 1000
+    ))
+
+    region = synthetic.region_name(1)
+    print('%-16s %14s' % ('region hint', 'requests/s'))
+    for case, region_hint in (
+            ('region name', region),
+            ('zone', region + 'b'),
+            ('unknown', 'unknown-region')
+    ):
+        print('%-16s %14.0f' % (
+            case, requests_per_second(region_map, requests, region_hint)
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the requests per second through the Flask test client without
+   instrumentation, with the request stage timings, and with one in 100
+   and one in 10 requests profiled, and print the stage timings of a
+   request.
+
+   python3 benchmarks/bench_request_timing.py [REQUESTS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+
+
+def requests_per_second(client, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(
+            '/regionInfo', environ_base={'REMOTE_ADDR': '1.0.0.1'}
+        )
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, 10, 100, servers=4)
+        region_info = synthetic.load_region_info(
+            tmp_dir, region_data, logFormat='access', requestTiming='true',
+            profileSampleRate=100,
+            profileFile=os.path.join(tmp_dir, 'regionInfo.prof')
+        )
+        client = region_info.app.test_client()
+        timed_wsgi_app = region_info.app.wsgi_app
+        request_profiler = region_info.request_profiler
+
+        print('%-20s %14s' % ('case', 'requests/s'))
+        region_info.app.wsgi_app = region_info.untimed_wsgi_app
+        region_info.request_timing = False
+        region_info.request_profiler = None
+        print('%-20s %14.0f' % (
+            'disabled', requests_per_second(client, requests)
+        ))
+
+        region_info.app.wsgi_app = timed_wsgi_app
+        region_info.request_timing = True
+        print('%-20s %14.0f' % (
+            'timing', requests_per_second(client, requests)
+        ))
+        server_timing = client.get(
+            '/regionInfo', environ_base={'REMOTE_ADDR': '1.0.0.1'}
+        ).headers['Server-Timing']
+
+        region_info.request_timing = False
+        region_info.request_profiler = request_profiler
+        for sample_rate in (100, 10):
+            request_profiler.sample_rate = sample_rate
+            print('%-20s %14.0f' % (
+                'profile 1 in %d' % sample_rate,
+                requests_per_second(client, requests)
+            ))
+
+    print('Server-Timing: %s' % server_timing)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the requests per second of get_response_xml with and without
+   the pre-rendered response cache.
+
+   python3 benchmarks/bench_response_cache.py [REQUESTS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_srv
+
+
+def requests_per_second(region_map, requests, requester_ip, region_hint,
+                        response_cache):
+    start = time.perf_counter()
+    for _ in range(requests):
+        region_srv.get_response_xml(
+            requester_ip,
+            region_hint,
+            region_map.region_name_to_smt_data_map,
+            region_map.ipv4_ranges_map,
+            region_map.ipv6_ranges_map,
+            response_cache
+        )
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, 10, 100, servers=4)
+        region_map = region_srv.create_smt_region_map(region_data)
+
+    print('%-12s %14s %14s %8s' % ('case', 'uncached/s', 'cached/s', 'gain'))
+    for case, requester_ip, region_hint in (
+            ('region hint', '0.0.0.0', synthetic.region_name(1)),
+            ('IPv4', '1.0.0.1', None),
+            ('IPv6', '2001:1::1', None)
+    ):
+        uncached = requests_per_second(
+            region_map, requests, requester_ip, region_hint, None
+        )
+        cached = requests_per_second(
+            region_map, requests, requester_ip, region_hint,
+            region_map.response_cache
+        )
+        print('%-12s %14.0f %14.0f %7.2fx' % (
+            case, uncached, cached, cached / uncached
+        ))
+
+
+if __name__ == '__main__':
+    main()
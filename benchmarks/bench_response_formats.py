@@ -0,0 +1,82 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the response size, uncompressed and pre-compressed with every
+   available content coding, and the time to produce a response of the
+   response formats, rendered per request and joined from the pre-rendered
+   response cache, for regions with different numbers of update servers.
+
+   python3 benchmarks/bench_response_formats.py [REQUESTS]
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+import synthetic
+import region_srv
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print('%-8s %-6s %8s %s %14s %14s' % (
+        'servers', 'format', 'bytes',
+        ' '.join(
+            '%8s' % encoding for encoding in region_srv.RESPONSE_ENCODINGS
+        ),
+        'rendered us', 'cached us'
+    ))
+    for servers in (2, 4, 8, 16):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            region_data = os.path.join(tmp_dir, 'regionData.cfg')
+            synthetic.write_region_data(region_data, 1, 1, servers=servers)
+            region_map = region_srv.create_smt_region_map(
+                region_data, compress=True
+            )
+        smt_server_data = region_map.region_name_to_smt_data_map[
+            synthetic.region_name(1)
+        ]
+        for response_format in region_srv.RESPONSE_FORMATS:
+            response_cache = region_map.response_caches[response_format]
+            size = len(region_srv.get_smt_server_response(
+                smt_server_data, response_format, response_cache
+            ))
+            rendered, cached = (
+                timeit.timeit(
+                    lambda: region_srv.get_smt_server_response(
+                        smt_server_data, response_format, cache
+                    ),
+                    number=requests
+                ) * 1e6 / requests
+                for cache in (None, response_cache)
+            )
+            compressed_sizes = ' '.join(
+                '%8d' % len(compressed_responses[response_format][
+                    synthetic.region_name(1)
+                ][0])
+                for compressed_responses in
+                region_map.compressed_responses.values()
+            )
+            print('%-8d %-6s %8d %s %14.2f %14.2f' % (
+                servers, response_format, size, compressed_sizes,
+                rendered, cached
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the memory of several processes that each build their own region
+   map with processes mapping the shared region map snapshot. All
+   processes hold their map at the same time, the proportional set size
+   (PSS) splits shared pages between the processes.
+
+   python3 benchmarks/bench_shared_map.py [PROCESSES] [REGIONS] [PREFIXES]
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_snapshot
+import region_srv
+
+
+def proportional_memory():
+    """Proportional set size of this process in bytes"""
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+
+
+def hold(mode, region_data, snapshot):
+    """Load the map in the given mode, report when done, and measure the
+       memory once all processes loaded theirs"""
+    memory_before = proportional_memory()
+    start = time.perf_counter()
+    if mode == 'shared':
+        region_map = region_snapshot.load_shared_region_map(
+            region_data, snapshot
+        )
+    else:
+        region_map = region_srv.create_smt_region_map(region_data)
+    load_s = time.perf_counter() - start
+
+    # Touch the whole map
+    rng = random.Random(0)
+    for _ in range(20000):
+        region_map.ipv4_ranges_map.get(
+            '%d.%d.%d.1' % (rng.randint(1, 255), rng.randrange(256),
+                            rng.randrange(256))
+        )
+    print('ready', flush=True)
+    sys.stdin.readline()
+    print(json.dumps({
+        'load_s': load_s,
+        'pss_bytes': proportional_memory() - memory_before
+    }), flush=True)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--hold':
+        hold(*sys.argv[2:5])
+        return
+
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    regions = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    prefixes = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    print('%-9s %10s %14s %14s' % (
+        'mode', 'processes', 'max load s', 'total PSS MiB'
+    ))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        snapshot = os.path.join(tmp_dir, 'regionData.snap')
+        synthetic.write_region_data(region_data, regions, prefixes)
+        for mode in ('private', 'shared'):
+            holders = [
+                subprocess.Popen(
+                    [sys.executable, __file__, '--hold', mode, region_data,
+                     snapshot],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                    universal_newlines=True
+                )
+                for _ in range(processes)
+            ]
+            for holder in holders:
+                holder.stdout.readline()
+            results = []
+            for holder in holders:
+                holder.stdin.write('\n')
+                holder.stdin.flush()
+                results.append(json.loads(holder.stdout.readline()))
+                holder.wait()
+            print('%-9s %10d %14.2f %14.1f' % (
+                mode, processes,
+                max(result['load_s'] for result in results),
+                sum(result['pss_bytes'] for result in results) / 2 ** 20
+            ))
+
+
+if __name__ == '__main__':
+    main()
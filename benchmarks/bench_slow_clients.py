@@ -0,0 +1,261 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the latency of regular clients while many slow clients are
+   connected to the WSGI application with a pool of 15 threads, as
+   mod_wsgi runs it with threads=15, and to the ASGI application. The
+   slow clients send their request headers one byte at a time. The ASGI
+   application is served by uvicorn if it is installed, otherwise by a
+   minimal asyncio HTTP/1.0 server. Every server runs in its own process.
+
+   python3 benchmarks/bench_slow_clients.py [SLOW_CLIENTS] [REQUESTS]
+"""
+
+import asyncio
+import concurrent.futures
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import synthetic
+
+WSGI_THREADS = 15
+
+
+class PoolWSGIServer(WSGIServer):
+    """WSGI server handling requests in a fixed pool of threads"""
+
+    def __init__(self, server_address, threads):
+        super().__init__(server_address, QuietWSGIRequestHandler)
+        self.executor = concurrent.futures.ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+async def serve_asgi(application, ready):
+    """Serve the ASGI application with a minimal HTTP/1.0 server"""
+
+    async def handle(reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, _ = lines[0].split(' ', 2)
+        path, _, query = target.partition('?')
+        headers = [
+            tuple(line.split(':', 1)) for line in lines[1:] if ':' in line
+        ]
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query.encode('latin-1'),
+            'headers': [
+                (name.strip().lower().encode('latin-1'),
+                 value.strip().encode('latin-1'))
+                for name, value in headers
+            ],
+            'client': writer.get_extra_info('peername')[:2]
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                writer.write(b'HTTP/1.0 %d \r\n' % message['status'])
+                for name, value in message['headers']:
+                    writer.write(b'%s: %s\r\n' % (name, value))
+                writer.write(b'\r\n')
+            else:
+                writer.write(message.get('body', b''))
+
+        await application(scope, receive, send)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0, backlog=4096)
+    ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def serve(mode, tmp_dir, region_data):
+    """Serve the application of the given mode and print the port"""
+    def ready(port):
+        print(port, flush=True)
+
+    if mode == 'wsgi':
+        region_info = synthetic.load_region_info(
+            tmp_dir, region_data, logMode='async', logFormat='access'
+        )
+        server = PoolWSGIServer(('127.0.0.1', 0), WSGI_THREADS)
+        server.request_queue_size = 4096
+        server.set_app(region_info.app)
+        ready(server.server_address[1])
+        server.serve_forever()
+        return
+
+    synthetic.load_region_info(
+        tmp_dir, region_data, logMode='async', logFormat='access'
+    )
+    import regionInfo_asgi
+    try:
+        import uvicorn
+    except ImportError:
+        asyncio.run(serve_asgi(regionInfo_asgi.application, ready))
+        return
+    config = uvicorn.Config(
+        regionInfo_asgi.application, host='127.0.0.1', port=0,
+        log_level='warning', backlog=4096
+    )
+    server = uvicorn.Server(config)
+
+    async def run():
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        ready(server.servers[0].sockets[0].getsockname()[1])
+        await task
+
+    asyncio.run(run())
+
+
+async def slow_client(port, duration, stop):
+    """Connect and send the request headers one byte at a time until stop
+       is set or duration passed"""
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        return
+    writer.write(b'GET /regionInfo?regionHint=region-1 HTTP/1.0\r\nX-Slow: ')
+    end = time.monotonic() + duration
+    while time.monotonic() < end and not stop.is_set():
+        writer.write(b'a')
+        try:
+            await writer.drain()
+        except ConnectionError:
+            return
+        await asyncio.sleep(0.1)
+    writer.close()
+
+
+def run_slow_clients(port, clients, duration, stop):
+    async def run():
+        await asyncio.gather(*(
+            slow_client(port, duration, stop) for _ in range(clients)
+        ))
+    asyncio.run(run())
+
+
+def measure(port, slow_clients, requests, fast_clients=4):
+    stop = threading.Event()
+    slow = threading.Thread(
+        target=run_slow_clients, args=(port, slow_clients, 60, stop)
+    )
+    slow.start()
+    time.sleep(1)
+
+    def fast_client(requests):
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            connection = http.client.HTTPConnection(
+                '127.0.0.1', port, timeout=120
+            )
+            connection.request('GET', '/regionInfo?regionHint=region-1')
+            connection.getresponse().read()
+            connection.close()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(fast_clients) as executor:
+        latencies = sorted(
+            latency
+            for result in [
+                executor.submit(fast_client, requests // fast_clients)
+                for _ in range(fast_clients)
+            ]
+            for latency in result.result()
+        )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    slow.join()
+    return (
+        len(latencies) / elapsed,
+        latencies[len(latencies) // 2],
+        latencies[int(len(latencies) * 0.99)]
+    )
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(*sys.argv[2:5])
+        return
+
+    slow_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    print('%-6s %12s %12s %12s %12s' % (
+        'mode', 'slow clients', 'requests/s', 'p50 ms', 'p99 ms'
+    ))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, 10, 100)
+        for mode in ('wsgi', 'asgi'):
+            for clients in (0, slow_clients):
+                server = subprocess.Popen(
+                    [sys.executable, __file__, '--serve', mode, tmp_dir,
+                     region_data],
+                    stdout=subprocess.PIPE
+                )
+                try:
+                    port = int(server.stdout.readline())
+                    result = measure(port, clients, requests)
+                finally:
+                    server.kill()
+                    server.wait()
+                print('%-6s %12d %12.0f %12.2f %12.2f' % (
+                    mode, clients, result[0], result[1] * 1000,
+                    result[2] * 1000
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the time to load the region map from the region data
+   configuration with the time to load a compiled snapshot.
+
+   python3 benchmarks/bench_snapshot.py [REGIONS] [PREFIXES_PER_REGION]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_snapshot
+import region_srv
+
+
+def main():
+    regions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    prefixes = int(sys.argv[2]) if len(sys.argv) > 2 else 2500
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        snapshot = os.path.join(tmp_dir, 'regionData.snap')
+        synthetic.write_region_data(region_data, regions, prefixes)
+
+        start = time.perf_counter()
+        region_srv.create_smt_region_map(region_data)
+        parse_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        region_snapshot.compile_region_map(region_data, snapshot)
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        region_snapshot.load_region_map(region_data, snapshot)
+        load_time = time.perf_counter() - start
+
+        print('%d regions, %d IPv4 and %d IPv6 prefixes' % (
+            regions, regions * prefixes, regions * prefixes
+        ))
+        print('snapshot size:      %10d bytes' % os.path.getsize(snapshot))
+        print('parse region data:  %10.3f s' % parse_time)
+        print('compile snapshot:   %10.3f s' % compile_time)
+        print('load snapshot:      %10.3f s' % load_time)
+
+
+if __name__ == '__main__':
+    main()
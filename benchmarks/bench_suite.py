@@ -0,0 +1,260 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Load and latency benchmark suite of the region service, the results are
+   written as JSON such that they can be compared between releases.
+
+   For every combination of number of regions and prefixes per region a
+   synthetic region data configuration is generated and measured in its
+   own process:
+     build:      create_smt_region_map time and peak resident memory
+     latency:    get_response_xml latency percentiles in ns for a region
+                 hint hit, an IP hit, and a miss
+     throughput: requests per second of /regionInfo through the Flask test
+                 client and through a local threaded WSGI server
+
+   python3 benchmarks/bench_suite.py [-r 10,100] [-p 100,1000] [-o FILE]
+"""
+
+import concurrent.futures
+import http.client
+import json
+import optparse
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import synthetic
+import region_srv
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def latency_cases(regions):
+    """Return the (case, requester IP, region hint) of the measured cases,
+       the IP hit is in the last region"""
+    return (
+        ('hint hit', '0.0.0.0', synthetic.region_name(regions)),
+        ('ipv4 hit', synthetic.ipv4_prefixes(regions, 1)[0].split('/')[0],
+         None),
+        ('ipv6 hit', synthetic.ipv6_prefixes(regions, 1)[0].split('/')[0],
+         None),
+        ('miss', '0.0.0.1', None)
+    )
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    result = dict(
+        ('p%s' % percentile, samples[min(
+            len(samples) - 1, int(len(samples) * percentile / 100)
+        )])
+        for percentile in PERCENTILES
+    )
+    result['mean'] = sum(samples) // len(samples)
+    return result
+
+
+def measure_build(region_data):
+    memory_before = synthetic.resident_memory()
+    start = time.perf_counter_ns()
+    region_map = region_srv.create_smt_region_map(region_data)
+    return region_map, {
+        'build_ms': (time.perf_counter_ns() - start) / 1e6,
+        'peak_rss_bytes': synthetic.peak_memory() - memory_before,
+        'final_rss_bytes': synthetic.resident_memory() - memory_before,
+        'ipv4_prefixes': len(region_map.ipv4_ranges_map),
+        'ipv6_prefixes': len(region_map.ipv6_ranges_map)
+    }
+
+
+def measure_latency(region_map, cases, requests):
+    latency = {}
+    for case, requester_ip, region_hint in cases:
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter_ns()
+            region_srv.get_response_xml(
+                requester_ip,
+                region_hint,
+                region_map.region_name_to_smt_data_map,
+                region_map.ipv4_ranges_map,
+                region_map.ipv6_ranges_map,
+                region_map.response_cache
+            )
+            samples.append(time.perf_counter_ns() - start)
+        latency[case] = percentiles(samples)
+    return latency
+
+
+def measure_test_client(app, cases, requests):
+    client = app.test_client()
+    throughput = {}
+    for case, requester_ip, region_hint in cases:
+        query = {'regionHint': region_hint} if region_hint else {}
+        environ = {'REMOTE_ADDR': requester_ip}
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get('/regionInfo', query_string=query,
+                       environ_base=environ)
+        throughput[case] = requests / (time.perf_counter() - start)
+    return throughput
+
+
+def measure_wsgi_server(app, region_hint, requests, clients):
+    """Requests per second of clients concurrent connections to a local
+       threaded WSGI server, every request on a new connection as the
+       server speaks HTTP/1.0"""
+    server = make_server(
+        '127.0.0.1', 0, app, server_class=ThreadingWSGIServer,
+        handler_class=QuietWSGIRequestHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    path = '/regionInfo?regionHint=%s' % region_hint
+
+    def client(requests):
+        for _ in range(requests):
+            connection = http.client.HTTPConnection(*server.server_address)
+            connection.request('GET', path)
+            connection.getresponse().read()
+            connection.close()
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(clients) as executor:
+        for result in [
+                executor.submit(client, requests // clients)
+                for _ in range(clients)
+        ]:
+            result.result()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    return {
+        'clients': clients,
+        'requests_per_s': (requests // clients) * clients / elapsed
+    }
+
+
+def measure(regions, prefixes, requests, clients):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        region_data = os.path.join(tmp_dir, 'regionData.cfg')
+        synthetic.write_region_data(region_data, regions, prefixes)
+        cases = latency_cases(regions)
+
+        region_map, build = measure_build(region_data)
+        latency = measure_latency(region_map, cases, requests)
+        del region_map
+
+        region_info = synthetic.load_region_info(
+            tmp_dir, region_data, logFormat='access'
+        )
+        throughput = {
+            'test client': measure_test_client(
+                region_info.app, cases, requests // 10
+            ),
+            'wsgi server': measure_wsgi_server(
+                region_info.app, cases[0][2], requests // 10, clients
+            )
+        }
+
+    return {
+        'regions': regions,
+        'prefixes_per_region': prefixes,
+        'build': build,
+        'latency_ns': latency,
+        'throughput_per_s': throughput
+    }
+
+
+def main():
+    argparse = optparse.OptionParser()
+    argparse.add_option(
+        '-r', '--regions', default='10,100',
+        help='Comma separated numbers of regions'
+    )
+    argparse.add_option(
+        '-p', '--prefixes', default='100,1000',
+        help='Comma separated numbers of IPv4 and IPv6 prefixes per region'
+    )
+    argparse.add_option(
+        '-n', '--requests', type='int', default=20000,
+        help='Measured calls per latency case, a tenth of it per '
+        'throughput case'
+    )
+    argparse.add_option(
+        '-c', '--clients', type='int', default=4,
+        help='Concurrent clients of the WSGI server'
+    )
+    argparse.add_option(
+        '-o', '--output', help='Write the results to this file'
+    )
+    argparse.add_option('--measure', help=optparse.SUPPRESS_HELP)
+    options, args = argparse.parse_args()
+
+    if options.measure:
+        regions, prefixes = (int(arg) for arg in options.measure.split(','))
+        print(json.dumps(measure(
+            regions, prefixes, options.requests, options.clients
+        )))
+        return
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'requests': options.requests,
+        'runs': []
+    }
+    for regions in (int(arg) for arg in options.regions.split(',')):
+        for prefixes in (int(arg) for arg in options.prefixes.split(',')):
+            print(
+                'Measuring %d regions with %d prefixes'
+                % (regions, prefixes), file=sys.stderr
+            )
+            results['runs'].append(json.loads(subprocess.check_output([
+                sys.executable, __file__,
+                '--measure', '%d,%d' % (regions, prefixes),
+                '--requests', str(options.requests),
+                '--clients', str(options.clients)
+            ])))
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2)
+            output.write('\n')
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
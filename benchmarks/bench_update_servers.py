@@ -0,0 +1,119 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the memory of the update server records of large region data
+   configurations as UpdateServer records sharing equal strings between
+   regions with the records as lists of plain tuples of the strings split
+   from every region's options. Region data where every region has its
+   own update servers is compared with region data where the regions share
+   the update servers of 10 groups. The memory is traced with tracemalloc.
+
+   python3 benchmarks/bench_update_servers.py [REGIONS] [SERVERS]
+"""
+
+import configparser
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import synthetic
+import region_srv
+
+OPTIONS = (
+    'smt-server-ip', 'smt-server-ipv6', 'smt-server-name',
+    'smt-registry-name', 'smt-fingerprint'
+)
+
+
+def plain_region_info(ips, ipsv6, names, registry_names, fingerprints,
+                      region):
+    """The records of a region as list of plain tuples, a single name,
+       registry name, or fingerprint is shared by the servers of the
+       region but not between regions"""
+    ips = ips.split(',')
+
+    def split(value):
+        values = value.split(',')
+        return values if len(values) > 1 else values * len(ips)
+
+    return [
+        update_server + (region,) for update_server in zip(
+            ips, ipsv6.split(','), split(names), split(registry_names),
+            split(fingerprints)
+        )
+    ]
+
+
+def plain_records(options):
+    return dict(
+        (region_options[-1], plain_region_info(*region_options))
+        for region_options in options
+    )
+
+
+def update_server_records(options):
+    strings = {}
+    return dict(
+        (region_options[-1], region_srv.parse_region_info(
+            *region_options, strings=strings
+        ))
+        for region_options in options
+    )
+
+
+def measure(region_data, create_records):
+    options = [
+        [region_data.get(section, option) for option in OPTIONS]
+        + [section.lower()]
+        for section in region_data.sections()
+    ]
+    tracemalloc.start()
+    records = create_records(options)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return memory
+
+
+def main():
+    regions = sys.argv[1] if len(sys.argv) > 1 else '1000,10000'
+    servers = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print('%-8s %8s %8s %12s %12s %8s' % (
+        'regions', 'servers', 'groups', 'plain KiB', 'records KiB', 'saved'
+    ))
+    for num_regions in (int(arg) for arg in regions.split(',')):
+        for server_groups in (None, 10):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'regionData.cfg')
+                synthetic.write_region_data(
+                    path, num_regions, 0, servers,
+                    server_groups=server_groups
+                )
+                region_data = configparser.RawConfigParser()
+                region_data.read(path)
+            plain = measure(region_data, plain_records)
+            records = measure(region_data, update_server_records)
+            print('%-8d %8d %8s %12.0f %12.0f %7.0f%%' % (
+                num_regions, num_regions * servers,
+                server_groups or num_regions, plain / 1024, records / 1024,
+                100 - 100 * records / plain
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the requests per second of get_smt_server_response with the
+   update servers in uniformly random order and in weighted order, for
+   regions with 2 to 16 update servers, and the share of the responses
+   starting with the update server at half weight.
+
+   python3 benchmarks/bench_weighted_order.py [REQUESTS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+import region_health
+import region_srv
+
+
+def requests_per_second(smt_server_data, requests, response_cache,
+                        weighted_responses):
+    start = time.perf_counter()
+    for _ in range(requests):
+        region_srv.get_smt_server_response(
+            smt_server_data, 'xml', response_cache, weighted_responses
+        )
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print('%-8s %14s %14s %10s %10s' % (
+        'servers', 'uniform/s', 'weighted/s', 'share', 'expected'
+    ))
+    for servers in (2, 4, 8, 16):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            region_data = os.path.join(tmp_dir, 'regionData.cfg')
+            synthetic.write_region_data(region_data, 10, 10, servers=servers)
+            region_map = region_srv.create_smt_region_map(region_data)
+
+        # The first update server of the region at half weight
+        smt_server_data = region_map.region_name_to_smt_data_map[
+            synthetic.region_name(1)
+        ]
+        weighted_responses = region_health.create_weighted_responses(
+            region_map, {smt_server_data[0].ip: 0.5}
+        )
+        uniform = requests_per_second(
+            smt_server_data, requests, region_map.response_cache, None
+        )
+        weighted = requests_per_second(
+            smt_server_data, requests, region_map.response_cache,
+            weighted_responses
+        )
+        first = region_srv.get_smt_info_xml(smt_server_data[0]).encode()
+        share = sum(
+            region_srv.get_smt_server_response(
+                smt_server_data, 'xml', region_map.response_cache,
+                weighted_responses
+            ).startswith(first, len(b'<regionSMTdata>\n'))
+            for _ in range(requests)
+        ) / requests
+        print('%-8d %14.0f %14.0f %10.3f %10.3f' % (
+            servers, uniform, weighted, share, 0.5 / (servers - 0.5)
+        ))
+
+
+if __name__ == '__main__':
+    main()
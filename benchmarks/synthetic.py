@@ -0,0 +1,151 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Helpers shared by the benchmarks, generation of synthetic region data
+   configuration files and access to the service code."""
+
+import importlib
+import ipaddress
+import os
+import resource
+import sys
+
+bench_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % bench_path)
+
+sys.path.insert(0, code_path)
+
+
+def region_name(region):
+    return 'region-%d' % region
+
+
+def ipv4_prefixes(region, prefixes):
+    """Return the public IPv4 /24 ranges of the given region, R.x.y.0/24
+       with a gap between ranges such that they cannot be merged. Up to
+       255 regions with up to 32768 prefixes each are possible."""
+    return [
+        str(ipaddress.IPv4Network(((region << 24) | (i << 9), 24)))
+        for i in range(prefixes)
+    ]
+
+
+def ipv6_prefixes(region, prefixes):
+    """Return the public IPv6 /48 ranges of the given region, 2001:R:x::/48
+       with a gap between ranges"""
+    return [
+        str(ipaddress.IPv6Network(
+            ((0x2001 << 112) | (region << 96) | (i << 81), 48)
+        ))
+        for i in range(prefixes)
+    ]
+
+
+def split_prefixes(prefixes, split):
+    """Return the given prefixes each split into 2 ** split subnets, a
+       fragmented list of ranges as for example published by cloud
+       providers"""
+    return [
+        str(subnet)
+        for prefix in prefixes
+        for subnet in ipaddress.ip_network(prefix).subnets(split)
+    ]
+
+
+def write_region_data(path, regions, prefixes, servers=3,
+                      range_files=False, split=0, server_groups=None):
+    """Write a regionData.cfg with the given number of regions, each with
+       the given number of IPv4 and IPv6 prefixes and update servers. With
+       range_files the prefixes are written to one file per region and
+       address family next to the regionData.cfg. With split every prefix
+       is written as 2 ** split subnets. With server_groups the regions
+       share the update servers of that many groups, otherwise every
+       region has its own update servers."""
+    with open(path, 'w') as region_data:
+        for region in range(1, regions + 1):
+            region_data.write('[%s]\n' % region_name(region))
+            for option, get_prefixes in (
+                    ('public-ips', ipv4_prefixes),
+                    ('public-ipsv6', ipv6_prefixes)
+            ):
+                region_prefixes = split_prefixes(
+                    get_prefixes(region, prefixes), split
+                )
+                if not range_files:
+                    region_data.write('%s = %s\n' % (
+                        option, ','.join(region_prefixes)
+                    ))
+                    continue
+                ranges_file = '%s-%s.txt' % (region_name(region), option)
+                with open(os.path.join(
+                        os.path.dirname(path), ranges_file
+                ), 'w') as ranges:
+                    for prefix in region_prefixes:
+                        ranges.write('%s\n' % prefix)
+                region_data.write('%s-file = %s\n' % (option, ranges_file))
+            group = region % server_groups + 1 if server_groups else region
+            region_data.write('smt-server-ip = %s\n' % ','.join(
+                '192.168.%d.%d' % (group, i) for i in range(1, servers + 1)
+            ))
+            region_data.write('smt-server-ipv6 = %s\n' % ','.join(
+                'fd00::%x:%x' % (group, i) for i in range(1, servers + 1)
+            ))
+            region_data.write('smt-server-name = %s\n' % ','.join(
+                'smt%d-%s.susecloud.net' % (i, region_name(group))
+                for i in range(1, servers + 1)
+            ))
+            region_data.write(
+                'smt-registry-name = registry-%s.susecloud.net\n'
+                % region_name(group)
+            )
+            region_data.write(
+                'smt-fingerprint = %s\n\n' % ':'.join(['a5'] * 20)
+            )
+
+
+def load_region_info(tmp_dir, region_data, **server_options):
+    """Load the service module with a regionInfo.cfg in tmp_dir for the
+       given region data and [server] options, the service logs to
+       tmp_dir/regionInfo.log"""
+    server_options.setdefault(
+        'logFile', os.path.join(tmp_dir, 'regionInfo.log')
+    )
+    server_options['regionConfig'] = region_data
+    region_info_cfg = os.path.join(tmp_dir, 'regionInfo.cfg')
+    with open(region_info_cfg, 'w') as cfg:
+        cfg.write('[server]\n')
+        for option, value in server_options.items():
+            cfg.write('%s = %s\n' % (option, value))
+
+    argv = sys.argv
+    sys.argv = ['regionInfo.py', '-f', region_info_cfg]
+    try:
+        return importlib.import_module('regionInfo')
+    finally:
+        sys.argv = argv
+
+
+def peak_memory():
+    """Peak resident memory of this process in bytes"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def resident_memory():
+    """Resident memory of this process in bytes"""
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE')
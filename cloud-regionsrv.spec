@@ -34,6 +34,7 @@ Requires:       python3-pytricia
 Requires:       cloud-region-config
 Requires(pre):  pwdutils
 Recommends:     cspApacheAccessConfig
+Suggests:       python3-Brotli
 BuildRoot:      %{_tmppath}/%{name}-%{version}-%{release}-root
 
 BuildArch:      noarch
@@ -82,13 +83,23 @@ fi
 %attr(755,regionsrv,regionsrv) %dir /srv/www/regionService
 /srv/www/regionService/regionInfo.wsgi
 /srv/www/regionService/regionInfo.py
+/srv/www/regionService/regionInfo_asgi.py
 /srv/www/regionService/region_srv.py
+/srv/www/regionService/region_check.py
+/srv/www/regionService/region_health.py
+/srv/www/regionService/region_log.py
+/srv/www/regionService/region_metrics.py
+/srv/www/regionService/region_profile.py
+/srv/www/regionService/region_ratelimit.py
+/srv/www/regionService/region_snapshot.py
 %attr(755,regionsrv,regionsrv) %dir /var/log/regionService
 %attr(644,regionsrv,regionsrv) %ghost /var/log/regionService/regionInfo.log
 %dir %{_sysconfdir}/apache2
 %dir %{_sysconfdir}/apache2/vhosts.d
 %dir %{_sysconfdir}/regionService
 /usr/sbin/genRegionServerCert
+/usr/sbin/regionsrv-check
+/usr/sbin/regionsrv-compile
 
 %files generic-config
 %defattr(-,root,root,-)
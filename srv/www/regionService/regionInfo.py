@@ -25,11 +25,97 @@ specified with -f on the command line; and the configuration for the
 region update server data, /etc/regionService/regionData.cfg, or as configured.
 
 The regionInfo.cfg file is in ini format containing a [server] section
-with the logFile and regionConfig options.
+with the logFile and regionConfig options. The region data is reloaded
+when the file changes if reloadInterval is set to the number of seconds
+between checks, or on SIGHUP if reloadOnSignal is true.
 
 [server]
 logFile = PATH_TO_LOGFILE_INCLUDING_LOGNAME
 regionConfig = PATH_TO_REGION_DATA_FILE_INCLUDING_FILENAME
+reloadInterval = SECONDS_BETWEEN_REGION_DATA_CHECKS
+reloadOnSignal = true|false
+regionSnapshot = PATH_TO_COMPILED_REGION_DATA_SNAPSHOT
+sharedRegionMap = true|false
+lookupEngine = pytricia|bisect
+aggregateRanges = true|false
+lookupCacheSize = NUMBER_OF_CACHED_CLIENT_ADDRESS_LOOKUPS
+logMode = sync|async
+logFormat = verbose|access
+batchMaxQueries = MAXIMUM_NUMBER_OF_QUERIES_PER_BATCH_REQUEST
+metrics = true|false
+cacheMaxAge = SECONDS_RESPONSES_MAY_BE_CACHED
+precompressResponses = true|false
+buildProcesses = NUMBER_OF_PROCESSES_PARSING_CLIENT_IP_RANGES
+healthFile = PATH_TO_UPDATE_SERVER_HEALTH_FILE
+healthInterval = SECONDS_BETWEEN_HEALTH_FILE_CHECKS
+rateLimit = REQUESTS_PER_SECOND_PER_CLIENT
+rateLimitBurst = REQUESTS_A_CLIENT_MAY_SEND_AT_ONCE
+rateLimitClients = NUMBER_OF_CLIENTS_WITH_TRACKED_REQUEST_RATE
+rateLimitIPv4Prefix = PREFIX_LENGTH_OF_IPv4_CLIENT_NETWORKS
+rateLimitIPv6Prefix = PREFIX_LENGTH_OF_IPv6_CLIENT_NETWORKS
+requestTiming = true|false
+profileSampleRate = PROFILE_ONE_IN_THIS_MANY_REQUESTS
+profileFile = PATH_TO_PROFILE_STATISTICS_FILE
+profileTrigger = PATH_TO_FILE_TOUCHED_TO_WRITE_PROFILE
+
+The optional regionSnapshot is created with regionsrv-compile and used
+instead of parsing the region data configuration while it is current.
+With sharedRegionMap true, the snapshot is the region map shared by all
+daemon processes, the first process that finds it stale compiles it and
+the other processes map the compiled snapshot. Every process checks the
+region data and the snapshot every reloadInterval seconds, 10 by default
+with sharedRegionMap, such that all processes map the new snapshot.
+The lookupEngine selects the data structure for the client IP ranges, the
+default pytricia, or bisect, sorted intervals searched in pure Python.
+With aggregateRanges true, the client IP ranges are aggregated into fewer
+ranges with the same lookup results before they are inserted, ranges of
+different regions that overlap are logged as conflicts.
+With lookupCacheSize the results of that many client address lookups are
+cached, the cache is cleared when the region data is reloaded.
+With logMode async, log records are written to the log file in batches by
+a background thread. With logFormat access, every request is logged on a
+single line with client IP, region hint, matched region, status, and
+latency in microseconds instead of logging the full response.
+The /regionInfo/batch endpoint resolving many client IPs and region hints
+in one POST request is enabled by setting batchMaxQueries to the maximum
+number of queries per request. With rateLimit every query of a batch
+counts as a request, a batch holds at most rateLimitBurst queries.
+With metrics true, request counts, stage latencies, and the state of the
+region data are exported in Prometheus text format at /metrics.
+Responses carry an ETag of the update server set of the region, requests
+with a matching If-None-Match header get a 304 response. With cacheMaxAge
+responses carry a Cache-Control header allowing caches to keep them for
+that many seconds, responses based on the client IP are private.
+The update server information is returned as XML unless JSON or CBOR is
+requested with the Accept header or the format=xml|json|cbor query
+argument. With precompressResponses true, the responses are compressed
+when the region data is loaded and served to clients accepting gzip, or
+brotli if the brotli module is installed.
+With buildProcesses greater than one, the client IP ranges are parsed in a
+pool of that many forked processes when the region data is first loaded,
+the region map is the same as when they are parsed by the loading thread.
+Reloads parse them in the reloading thread, forking while the request
+threads run may deadlock the forked processes.
+The optional healthFile lists update servers by IP address or name with
+their state, up, down, or a factor between 0 and 1 of their weight, and is
+checked for changes every healthInterval seconds, 10 by default. An update
+server that is down is returned after all update servers that are up.
+With rateLimit, every client may send that many requests per second on
+average and rateLimitBurst requests at once, requests over the limit get a
+429 response before the update server information is looked up. Clients
+are the networks of the client addresses with the rateLimitIPv4Prefix, 32
+by default, and rateLimitIPv6Prefix, 64 by default. The request rate of
+rateLimitClients clients, 10000 by default, is tracked, the least recently
+seen client is forgotten first.
+With requestTiming true, the time spent in each stage of a /regionInfo
+request, route, limit with rateLimit, parse, lookup, render, and log, is
+returned in the Server-Timing response header, with logFormat access it is
+also logged in microseconds. With profileSampleRate one in that many
+requests is run under cProfile, the aggregated statistics are written to
+profileFile when the profileTrigger file, profileFile with .trigger
+appended by default, is created or touched. From Python 3.12 cProfile
+records all threads while a request is profiled, including concurrent
+requests, and slows them down, a warning is logged at startup.
 
 The region data configuration file is also in ini format. Each section
 defines a region and contains options for public-ips, smt-server-ip,
@@ -45,150 +131,61 @@ smt-server-ip = IP_OF_SMT_SERVER_FOR_THIS_REGION
 smt-server-ipv6 = IPv6_OF_SMT_SERVER_FOR_THIS_REGION
 smt-server-name = HOSTNAME_OF_SMT_SERVER_FOR_THIS_REGION
 smt-fingerprint = SMT_CERT_FINGERPRINT
+smt-server-weight = WEIGHT_OF_SMT_SERVER_FOR_THIS_REGION
+aliases = COMMA_SEPARATED_LIST_OF_OTHER_NAMES_OF_THIS_REGION
+
+Update servers are returned in random order. With smt-server-weight the
+update server returned first is picked with a probability proportional to
+its weight, the other update servers follow in configuration order,
+wrapping around at the last one.
+
+A region hint matches a region by name, by one of its aliases, or by the
+name of one of its availability zones, the region name or an alias
+followed by a letter, for example us-east-1a or us-central1-a.
+
+Large lists of IP ranges can be kept in separate files, referenced with the
+public-ips-file and public-ipsv6-file options, relative to the region data
+configuration file. The files contain one range per line and are read line
+by line.
 """
 
 import configparser
+import functools
 import getopt
-import ipaddress
+import json
 import logging
+import math
 import os
-import pytricia
 import sys
+import time
+import region_health
+import region_log
+import region_metrics
+import region_profile
+import region_ratelimit
+import region_snapshot
 import region_srv
 
 from flask import Flask
+from flask import Response
 from flask import request
 
+# Body size allowed per query of a batch request
+BATCH_QUERY_SIZE = 256
 
-# ============================================================================
-def create_smt_region_map(conf):
-    """Create two mappings:
-         ip_to_smt_data_map:
-             maps all IP ranges to their respective update server info in a
-             tree structure
-         region_name_to_smt_data_map:
-             maps all region names to their respective update server info"""
-    ipv4_ranges_map = pytricia.PyTricia()
-    ipv6_ranges_map = pytricia.PyTricia(128)
-    region_name_to_smt_data_map = {}
-    region_data_cfg = configparser.RawConfigParser()
-    try:
-        parsed = region_data_cfg.read(conf)
-    except Exception as e:
-        logging.error('Could not parse configuration file %s.' % conf)
-        logging.error(str(e))
-        return
-    if not parsed:
-        logging.error('Error parsing config file: %s' % conf)
-        return
-
-    for section in region_data_cfg.sections():
-        try:
-            region_public_ip_ranges = ''
-            region_public_ip_ranges = region_data_cfg.get(
-                section,
-                'public-ips'
-            )
-        except Exception:
-            info_msg = 'public-ips data not configured in section %s.' % section
-            info_msg += ' No IPv4 address based fallback possible.'
-            logging.info(info_msg)
-        try:
-            region_public_ipv6_ranges = ''
-            region_public_ipv6_ranges = region_data_cfg.get(
-                section,
-                'public-ipsv6'
-            )
-        except Exception:
-            info_msg = 'public-ipsv6 data not configured in section '
-            info_msg += '%s. No IPv6 address based fallback possible.' % section
-            logging.info(info_msg)
-        try:
-            region_smt_ips = None
-            region_smt_ips = region_data_cfg.get(section, 'smt-server-ip')
-        except Exception:
-            info_msg = 'smt-server-ip data in section %s not ' % section
-            info_msg += 'configured. Update servers cannot be reached over IPv4'
-            logging.info(info_msg)
-        try:
-            region_smt_ipsv6 = None
-            region_smt_ipsv6 = region_data_cfg.get(section, 'smt-server-ipv6')
-        except Exception:
-            info_msg = 'smt-server-ipv6 data in section %s not ' % section
-            info_msg += 'configured. Update servers cannot be reached over IPv6'
-            logging.info(info_msg)
-        try:
-            region_smt_names = region_data_cfg.get(section, 'smt-server-name')
-        except Exception:
-            logging.error(
-                'Missing smt-server-name data in section %s.' % section
-            )
-            sys.exit(1)
-        try:
-            region_smt_registry_names = region_data_cfg.get(section, 'smt-registry-name')
-        except Exception:
-            logging.info(
-                'Missing smt-registry-name data in section %s.' % section
-            )
-        try:
-            region_smt_cert_fingerprints = region_data_cfg.get(
-                section,
-                'smt-fingerprint'
-            )
-        except Exception:
-            logging.error(
-                'Missing smt-fingerprint data in section %s' % section
-            )
-            sys.exit(1)
+# Seconds between checks for a replaced shared region map snapshot unless
+# reloadInterval is set
+SHARED_MAP_RELOAD_INTERVAL = 10
 
-        if not region_smt_ips and not region_smt_ipsv6:
-            err_msg = 'Missing update server IPs for either protocol at '
-            err_msg += 'least one of smt-server-ip and smt-server-ipv6 '
-            err_msg += 'must be configured'
-            logging.error(err_msg)
-            sys.exit(1)
+# Response formats by media type in order of preference, XML first such that
+# clients accepting any type get the XML they always got
+ACCEPT_FORMATS = {
+    'application/xml': 'xml',
+    'text/xml': 'xml',
+    'application/json': 'json',
+    'application/cbor': 'cbor'
+}
 
-        try:
-            smt_info = region_srv.parse_region_info(
-                region_smt_ips,
-                region_smt_ipsv6,
-                region_smt_names,
-                region_smt_registry_names,
-                region_smt_cert_fingerprints,
-                section.lower()
-            )
-        except ValueError as e:
-            logging.error(
-                '%s in section "%s"' % (e, section)
-            )
-            sys.exit(1)
-
-        region_name_to_smt_data_map[section.lower()] = smt_info
-        for ip_range in region_public_ip_ranges.split(','):
-            if not ip_range:
-                continue
-            try:
-                ipaddress.IPv4Network(ip_range)
-            except ValueError:
-                msg = 'Could not process IPv4 range, improper format: %s'
-                logging.error(msg % ip_range)
-                continue
-
-            ipv4_ranges_map.insert(ip_range, smt_info)
-
-        for ip_range in region_public_ipv6_ranges.split(','):
-            if not ip_range:
-                continue
-            try:
-                ipaddress.IPv6Network(ip_range)
-            except ValueError:
-                msg = 'Could not process IPv6 range, improper format: %s'
-                logging.error(msg % ip_range)
-                continue
-
-            ipv6_ranges_map.insert(ip_range, smt_info)
-
-    return ipv4_ranges_map, ipv6_ranges_map, region_name_to_smt_data_map
 
 # ============================================================================
 def usage():
@@ -200,8 +197,38 @@ def usage():
     print(msg)
 
 
+# ============================================================================
+def warm_up():
+    """Exercise an IPv4 and an IPv6 lookup and the request routing such
+       that the first request does not pay for lazy initialization, and
+       log the startup timings"""
+    start = time.perf_counter()
+    region_map = region_map_reloader.region_map
+    for requester_ip in ('127.0.0.1', '::1'):
+        region_srv.get_response_xml(
+            requester_ip,
+            None,
+            region_map.region_name_to_smt_data_map,
+            region_map.ipv4_ranges_map,
+            region_map.ipv6_ranges_map,
+            region_map.response_cache,
+            weighted_responses=region_map.weighted_responses
+        )
+    with app.test_request_context('/regionInfo'):
+        pass
+    startup_timings['warm up'] = time.perf_counter() - start
+
+    logging.info('Startup timings: %s' % ', '.join(
+        '%s %.1f ms' % (stage, duration * 1000)
+        for stage, duration in startup_timings.items()
+    ))
+    return startup_timings
+
+
 # ============================================================================
 # Process the command line options
+startup_timings = {}
+startup_start = time.perf_counter()
 try:
     cmd_opts, args = getopt.getopt(sys.argv[1:], 'f:hl:r:',
                                    ['file=', 'help', 'log=', 'regiondata='])
@@ -262,51 +289,456 @@ if not region_data_config_name:
         sys.exit(1)
 
 # Set up logging
+log_mode = srvConfig.get('server', 'logMode', fallback='sync')
+log_format = srvConfig.get('server', 'logFormat', fallback='verbose')
+if log_mode not in ('sync', 'async') or \
+        log_format not in ('verbose', 'access'):
+    print('Unknown logMode "%s" or logFormat "%s"' % (log_mode, log_format))
+    sys.exit(1)
 try:
-    logging.basicConfig(
-        filename=log_name,
-        level=logging.INFO,
-        format='%(asctime)s %(levelname)s:%(message)s'
-    )
+    # The listener writing the log in async mode is started once the region
+    # map is loaded, see below
+    log_listener = region_log.setup_logging(log_name, log_mode, start=False)
 except IOError:
     print('Could not open log file "%s" for writing.' % log_name)
     sys.exit(1)
-
-
-# Build the map initially
-ipv4_ranges_map, ipv6_ranges_map, region_name_to_smt_data_map = \
-    create_smt_region_map(region_data_config_name)
+startup_timings['configuration'] = time.perf_counter() - startup_start
+
+# Build the map initially, reload it when the region data changes if
+# configured
+startup_start = time.perf_counter()
+region_snapshot_name = srvConfig.get(
+    'server', 'regionSnapshot', fallback=None
+)
+lookup_engine = srvConfig.get('server', 'lookupEngine', fallback='pytricia')
+if lookup_engine not in region_srv.LOOKUP_ENGINES:
+    logging.error('Unknown lookup engine "%s"' % lookup_engine)
+    sys.exit(1)
+compress_responses = srvConfig.getboolean(
+    'server', 'precompressResponses', fallback=False
+)
+build_processes = srvConfig.getint('server', 'buildProcesses', fallback=1)
+shared_region_map = srvConfig.getboolean(
+    'server', 'sharedRegionMap', fallback=False
+)
+# Processes sharing the region map must all follow a replaced snapshot
+reload_interval = srvConfig.getint(
+    'server', 'reloadInterval',
+    fallback=SHARED_MAP_RELOAD_INTERVAL if shared_region_map else 0
+)
+if shared_region_map:
+    if not region_snapshot_name:
+        logging.error('sharedRegionMap requires regionSnapshot')
+        sys.exit(1)
+    if reload_interval <= 0:
+        logging.error('sharedRegionMap requires reloadInterval')
+        sys.exit(1)
+    region_map_loader = functools.partial(
+        region_snapshot.load_shared_region_map,
+        snapshot=region_snapshot_name,
+        compress=compress_responses
+    )
+else:
+    region_map_loader = functools.partial(
+        region_snapshot.load_region_map,
+        snapshot=region_snapshot_name,
+        engine=lookup_engine,
+        aggregate=srvConfig.getboolean(
+            'server', 'aggregateRanges', fallback=False
+        ),
+        compress=compress_responses
+    )
+# The weighted responses are created with every published region map and
+# after every health change, never in a request
+server_health = region_health.UpdateServerHealth(
+    srvConfig.get('server', 'healthFile', fallback=None),
+    srvConfig.getint('server', 'healthInterval', fallback=10)
+)
+if server_health.path:
+    server_health.load()
+region_map_reloader = region_srv.RegionMapReloader(
+    region_data_config_name,
+    reload_interval,
+    region_map_loader,
+    srvConfig.getint('server', 'lookupCacheSize', fallback=0),
+    prepare=server_health.apply
+)
+server_health.on_change = region_map_reloader.refresh
+# Forking the pool is only safe while no other thread of the service runs,
+# before the log listener, reloader, and health threads are started. Reloads
+# parse the client IP ranges in the reloader thread.
+loaded = region_map_reloader.load(
+    functools.partial(region_map_loader, processes=build_processes)
+)
+if log_listener is not None:
+    log_listener.start()
+if not loaded:
+    sys.exit(1)
+reload_on_signal = srvConfig.getboolean(
+    'server', 'reloadOnSignal', fallback=False
+)
+if reload_on_signal:
+    reload_on_signal = region_map_reloader.install_signal_handler()
+if region_map_reloader.interval or reload_on_signal:
+    region_map_reloader.start()
+if server_health.path:
+    server_health.start()
+startup_timings['region map'] = time.perf_counter() - startup_start
 
 # Implement the REST API
+startup_start = time.perf_counter()
+batch_max_queries = srvConfig.getint('server', 'batchMaxQueries', fallback=0)
+batch_max_body_size = batch_max_queries * BATCH_QUERY_SIZE
+cache_max_age = srvConfig.getint('server', 'cacheMaxAge', fallback=0)
+rate_limiter = None
+rate_limit = srvConfig.getfloat('server', 'rateLimit', fallback=0)
+if rate_limit > 0:
+    rate_limiter = region_ratelimit.RateLimiter(
+        rate_limit,
+        srvConfig.getint(
+            'server', 'rateLimitBurst', fallback=math.ceil(rate_limit)
+        ),
+        srvConfig.getint('server', 'rateLimitClients', fallback=10000),
+        srvConfig.getint('server', 'rateLimitIPv4Prefix', fallback=32),
+        srvConfig.getint('server', 'rateLimitIPv6Prefix', fallback=64)
+    )
+    if rate_limiter.burst < 1 or rate_limiter.size < 1:
+        logging.error('rateLimitBurst and rateLimitClients must be at least 1')
+        sys.exit(1)
+    if not 0 <= rate_limiter.prefixes[32] <= 32 or \
+            not 0 <= rate_limiter.prefixes[128] <= 128:
+        logging.error('Invalid rateLimitIPv4Prefix or rateLimitIPv6Prefix')
+        sys.exit(1)
+    # Seconds until a client has a token again
+    rate_limit_retry_after = str(math.ceil(1 / rate_limit))
+request_metrics = None
+if srvConfig.getboolean('server', 'metrics', fallback=False):
+    request_metrics = region_metrics.RequestMetrics()
+request_timing = srvConfig.getboolean(
+    'server', 'requestTiming', fallback=False
+)
+request_profiler = None
+profile_sample_rate = srvConfig.getint(
+    'server', 'profileSampleRate', fallback=0
+)
+if profile_sample_rate > 0:
+    profile_file = srvConfig.get(
+        'server', 'profileFile',
+        fallback='/var/log/regionService/regionInfo.prof'
+    )
+    request_profiler = region_profile.RequestProfiler(
+        profile_sample_rate,
+        profile_file,
+        srvConfig.get(
+            'server', 'profileTrigger', fallback=profile_file + '.trigger'
+        )
+    )
+    request_profiler.start()
+    if region_profile.PROFILES_ALL_THREADS:
+        logging.warning(
+            'profileSampleRate: this Python profiles all threads, the '
+            'statistics include concurrent requests and all requests are '
+            'slower while a request is profiled'
+        )
 app = Flask(__name__)
+if request_timing:
+    # Take the time the request is received such that the time spent
+    # routing it to the view function can be measured
+    untimed_wsgi_app = app.wsgi_app
+
+    def timed_wsgi_app(environ, start_response):
+        environ['regionsrv.received_ns'] = time.perf_counter_ns()
+        return untimed_wsgi_app(environ, start_response)
+
+    app.wsgi_app = timed_wsgi_app
+
+
+def get_region_info(
+        requester_ip, args, accept_mimetypes, accept_encodings,
+        if_none_match, received_ns=None
+):
+    """Answer a /regionInfo request independent of the web framework, args
+       are the query arguments and the Accept, Accept-Encoding, and
+       If-None-Match headers are given parsed by werkzeug. Returns the
+       body, the status, and optionally the headers of the response. With
+       request_timing the durations of the request stages are returned
+       in the Server-Timing header, the route stage if the time the
+       request was received is given in received_ns."""
+    start = time.perf_counter_ns()
+    region_hint = args.get('regionHint')
+    if rate_limiter is not None and \
+            not rate_limiter.allow(requester_ip):
+        if log_format == 'access':
+            logging.info('%s %s - 429 %d' % (
+                requester_ip,
+                region_hint or '-',
+                (time.perf_counter_ns() - start) // 1000
+            ))
+        else:
+            logging.info('Rate limited request from: %s' % requester_ip)
+        return 'Too many requests', 429, {
+            'Retry-After': rate_limit_retry_after
+        }
+
+    parse_start = time.perf_counter_ns()
+    response_format = args.get('format')
+    if not response_format:
+        response_format = ACCEPT_FORMATS.get(
+            accept_mimetypes.best_match(ACCEPT_FORMATS), 'xml'
+        )
+    elif response_format not in region_srv.RESPONSE_FORMATS:
+        return 'Unknown format', 400
+
+    # Use one map for the whole request, a reload replaces it
+    region_map = region_map_reloader.region_map
+    if region_hint:
+        region_hint = region_hint.lower()
+    resolve_start = time.perf_counter_ns()
+    region_name = region_srv.resolve_region_hint(
+        region_hint,
+        region_map.region_name_to_smt_data_map,
+        region_map.region_aliases
+    )
+    hint_hit = region_name in region_map.region_name_to_smt_data_map
+    # The client address is only parsed if the lookup needs it, with a
+    # lookup cache on a cache miss during the lookup
+    requester_address = None
+    if not hint_hit and region_map.lookup_cache is None:
+        requester_address = region_srv.parse_address(requester_ip)
+
+    lookup_start = time.perf_counter_ns()
+    smt_server_data = region_srv.get_smt_server_data(
+        requester_ip,
+        region_name,
+        region_map.region_name_to_smt_data_map,
+        region_map.ipv4_ranges_map,
+        region_map.ipv6_ranges_map,
+        region_map.lookup_cache,
+        requester_address=requester_address
+    )
+    lookup_end = time.perf_counter_ns()
+
+    if smt_server_data:
+        weighted_responses = region_map.weighted_responses
+        headers = {'Vary': 'Accept'}
+        if response_format != 'xml':
+            headers['Content-Type'] = \
+                region_srv.RESPONSE_FORMATS[response_format].content_type
+        encoding = None
+        if region_map.compressed_responses:
+            headers['Vary'] = 'Accept, Accept-Encoding'
+            encoding = accept_encodings.best_match(
+                region_map.compressed_responses
+            )
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        etag = None
+        if region_map.response_etags:
+            etag = region_map.response_etags.get(smt_server_data[0][5])
+        if etag and response_format != 'xml':
+            etag = '%s-%s' % (etag, response_format)
+        if etag and encoding:
+            etag = '%s-%s' % (etag, encoding)
+        if etag:
+            headers['ETag'] = '"%s"' % etag
+        if cache_max_age:
+            # Responses based on the client IP must not be shared
+            headers['Cache-Control'] = '%s, max-age=%d' % (
+                'public' if hint_hit else 'private', cache_max_age
+            )
+        if etag and if_none_match.contains_weak(etag):
+            response = '', 304, headers
+        elif encoding:
+            response_body = region_srv.get_compressed_response(
+                smt_server_data,
+                region_map.compressed_responses,
+                encoding,
+                response_format,
+                weighted_responses
+            )
+            response = response_body, 200, headers
+        else:
+            response_caches = region_map.response_caches or \
+                {'xml': region_map.response_cache}
+            response_body = region_srv.get_smt_server_response(
+                smt_server_data,
+                response_format,
+                response_caches.get(response_format),
+                weighted_responses
+            )
+            response = response_body, 200, headers
+    else:
+        response = 'Not found', 404
+    render_end = time.perf_counter_ns()
+
+    if request_metrics:
+        if not smt_server_data:
+            request_metrics.observe('not_found', lookup_end - resolve_start)
+        else:
+            if hint_hit:
+                outcome = 'hint_hit'
+            elif '.' in requester_ip:
+                # IPv4 and IPv4-mapped IPv6 addresses
+                outcome = 'ipv4_hit'
+            else:
+                outcome = 'ipv6_hit'
+            # The lookup latency includes resolving the region hint and
+            # parsing the client address
+            request_metrics.observe(
+                outcome,
+                lookup_end - resolve_start,
+                render_end - lookup_end
+            )
+
+    timings = None
+    if request_timing:
+        timings = [
+            ('parse', lookup_start - parse_start),
+            ('lookup', lookup_end - lookup_start),
+            ('render', render_end - lookup_end)
+        ]
+        if rate_limiter is not None:
+            timings.insert(0, ('limit', parse_start - start))
+        if received_ns:
+            timings.insert(0, ('route', start - received_ns))
+    log_start = time.perf_counter_ns()
+    if log_format == 'verbose':
+        logging.info('Data request from: %s' % requester_ip)
+        if region_hint:
+            logging.info('\tRegion hint: %s' % region_hint)
+    if log_format == 'access':
+        logging.info('%s %s %s %d %d%s' % (
+            requester_ip,
+            region_hint or '-',
+            smt_server_data[0][5] if smt_server_data else '-',
+            response[1],
+            (log_start - start) // 1000,
+            region_metrics.format_timings_log(timings) if timings else ''
+        ))
+    elif response[1] == 304:
+        logging.info('\tNot modified')
+    elif smt_server_data and response_format == 'xml' and not encoding:
+        logging.info('Provided: %s' % response_body.decode('utf-8'))
+    elif smt_server_data:
+        logging.info('Provided %s%s: %s' % (
+            response_format,
+            ' %s' % encoding if encoding else '',
+            smt_server_data[0][5]
+        ))
+    else:
+        logging.info('\tDenied')
+
+    if timings:
+        timings.append(('log', time.perf_counter_ns() - log_start))
+        headers = response[2] if len(response) > 2 else {}
+        headers['Server-Timing'] = \
+            region_metrics.format_server_timing(timings)
+        response = response[:2] + (headers,)
+
+    return response
+
+
+def get_batch_results(requester_ip, body, mimetype):
+    """Answer a /regionInfo/batch request with the given body of at most
+       batch_max_body_size bytes independent of the web framework. Returns
+       the body, for status 200 an iterator over the NDJSON result lines,
+       and the status of the response. With a rate limit every query
+       takes a token, a batch may hold at most rateLimitBurst queries."""
+    if rate_limiter is not None and \
+            not rate_limiter.allow(requester_ip):
+        logging.info('Rate limited batch request from: %s' % requester_ip)
+        return 'Too many requests', 429
+
+    try:
+        queries = region_srv.parse_batch_queries(body, mimetype)
+    except ValueError as e:
+        return 'Bad request: %s' % e, 400
+    if len(queries) > batch_max_queries or (
+            rate_limiter is not None and len(queries) > rate_limiter.burst
+    ):
+        return 'Request too large', 413
+    # The token taken above pays for the first query
+    if rate_limiter is not None and len(queries) > 1 and \
+            not rate_limiter.allow(requester_ip, len(queries) - 1):
+        logging.info('Rate limited batch request from: %s' % requester_ip)
+        return 'Too many requests', 429
+
+    logging.info(
+        'Batch request from: %s, %d queries' % (requester_ip, len(queries))
+    )
+
+    # Resolve all queries against the same map, a reload replaces it
+    region_map = region_map_reloader.region_map
+
+    def results():
+        for result in region_srv.get_batch_results(
+                queries,
+                region_map.region_name_to_smt_data_map,
+                region_map.ipv4_ranges_map,
+                region_map.ipv6_ranges_map,
+                region_map.region_aliases
+        ):
+            yield json.dumps(result) + '\n'
+
+    return results(), 200
 
 
 @app.route('/regionInfo')
 def index():
-    requester_ip = request.remote_addr
-    region_hint = request.args.get('regionHint')
+    if request_profiler is not None and request_profiler.sample():
+        return request_profiler.runcall(
+            get_region_info,
+            request.remote_addr,
+            request.args,
+            request.accept_mimetypes,
+            request.accept_encodings,
+            request.if_none_match,
+            request.environ.get('regionsrv.received_ns')
+        )
+    return get_region_info(
+        request.remote_addr,
+        request.args,
+        request.accept_mimetypes,
+        request.accept_encodings,
+        request.if_none_match,
+        request.environ.get('regionsrv.received_ns')
+    )
 
-    logging.info('Data request from: %s' % requester_ip)
 
-    if region_hint:
-        region_hint = region_hint.lower()
-        logging.info('\tRegion hint: %s' % region_hint)
+@app.route('/regionInfo/batch', methods=['POST'])
+def batch():
+    if not batch_max_queries:
+        return 'Not found', 404
 
-    response_xml = region_srv.get_response_xml(
-        requester_ip,
-        region_hint,
-        region_name_to_smt_data_map,
-        ipv4_ranges_map,
-        ipv6_ranges_map
+    if (request.content_length or 0) > batch_max_body_size:
+        return 'Request too large', 413
+    body = request.stream.read(batch_max_body_size + 1)
+    if len(body) > batch_max_body_size:
+        return 'Request too large', 413
+
+    response_body, status = get_batch_results(
+        request.remote_addr, body, request.mimetype
     )
+    if status != 200:
+        return response_body, status
+    return Response(response_body, mimetype='application/x-ndjson')
 
-    if response_xml:
-        logging.info('Provided: %s' % response_xml)
-        return response_xml, 200
-    else:
-        logging.info('\tDenied')
+
+@app.route('/metrics')
+def metrics():
+    if not request_metrics:
         return 'Not found', 404
 
+    return Response(
+        region_metrics.render_metrics(
+            request_metrics, region_map_reloader, rate_limiter
+        ),
+        content_type=region_metrics.CONTENT_TYPE
+    )
+
+
+startup_timings['application'] = time.perf_counter() - startup_start
+
 # Run the service
 if __name__ == '__main__':
     app.run(debug=True)
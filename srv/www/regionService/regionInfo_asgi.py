@@ -0,0 +1,197 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+ASGI entry point of the region service for asynchronous servers, e.g.
+
+  REGIONSRV_CONFIG=/etc/regionService/regionInfo.cfg \
+      uvicorn --app-dir /srv/www/regionService regionInfo_asgi:application
+
+Under mod_wsgi every connection holds one of the daemon threads until the
+response is sent, slow clients limit the number of concurrent requests. An
+asynchronous server holds a connection without a thread, the requests are
+answered by the same code as the WSGI application in regionInfo.py with
+the same configuration, logging, and region data reload. The service
+configuration file is taken from the REGIONSRV_CONFIG environment variable
+and defaults to /etc/regionService/regionInfo.cfg. The request handling
+does not block except for writing log records, use logMode async.
+"""
+
+import os
+import sys
+import urllib.parse
+
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+from werkzeug.http import parse_etags
+from werkzeug.http import parse_options_header
+
+# The service reads its options from the command line when loaded
+argv = sys.argv
+sys.argv = ['regionInfo.py']
+if os.environ.get('REGIONSRV_CONFIG'):
+    sys.argv += ['-f', os.environ['REGIONSRV_CONFIG']]
+try:
+    import regionInfo
+finally:
+    sys.argv = argv
+
+import region_metrics
+
+
+def _get_headers(scope):
+    return dict(
+        (name.decode('latin-1'), value.decode('latin-1'))
+        for name, value in scope['headers']
+    )
+
+
+async def _send_response(send, status, body, headers=None):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    headers = dict(headers or {})
+    # Flask's default as returned by the WSGI application
+    headers.setdefault('Content-Type', 'text/html; charset=utf-8')
+    headers['Content-Length'] = str(len(body))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (name.encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers.items()
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive, max_size):
+    """Return the request body, None if it is larger than max_size"""
+    body = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return b''
+        body.append(message.get('body', b''))
+        size += len(body[-1])
+        if size > max_size:
+            return None
+        more_body = message.get('more_body', False)
+    return b''.join(body)
+
+
+async def _region_info(scope, receive, send):
+    headers = _get_headers(scope)
+    response = regionInfo.get_region_info(
+        scope['client'][0] if scope.get('client') else None,
+        MultiDict(urllib.parse.parse_qsl(
+            scope['query_string'].decode('latin-1')
+        )),
+        parse_accept_header(headers.get('accept'), MIMEAccept),
+        parse_accept_header(headers.get('accept-encoding')),
+        parse_etags(headers.get('if-none-match'))
+    )
+    await _send_response(send, response[1], response[0], *response[2:])
+
+
+async def _batch(scope, receive, send):
+    if not regionInfo.batch_max_queries:
+        await _send_response(send, 404, 'Not found')
+        return
+
+    headers = _get_headers(scope)
+    max_body_size = regionInfo.batch_max_body_size
+    if int(headers.get('content-length') or 0) > max_body_size:
+        await _send_response(send, 413, 'Request too large')
+        return
+    body = await _read_body(receive, max_body_size)
+    if body is None:
+        await _send_response(send, 413, 'Request too large')
+        return
+
+    response_body, status = regionInfo.get_batch_results(
+        scope['client'][0] if scope.get('client') else None,
+        body,
+        parse_options_header(headers.get('content-type'))[0]
+    )
+    if status != 200:
+        await _send_response(send, status, response_body)
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/x-ndjson')]
+    })
+    for line in response_body:
+        await send({
+            'type': 'http.response.body',
+            'body': line.encode('utf-8'),
+            'more_body': True
+        })
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _metrics(scope, receive, send):
+    if not regionInfo.request_metrics:
+        await _send_response(send, 404, 'Not found')
+        return
+
+    await _send_response(
+        send,
+        200,
+        region_metrics.render_metrics(
+            regionInfo.request_metrics, regionInfo.region_map_reloader,
+            regionInfo.rate_limiter
+        ),
+        {'Content-Type': region_metrics.CONTENT_TYPE}
+    )
+
+
+async def _lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            regionInfo.warm_up()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+ROUTES = {
+    ('GET', '/regionInfo'): _region_info,
+    ('POST', '/regionInfo/batch'): _batch,
+    ('GET', '/metrics'): _metrics
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(scope, receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    route = ROUTES.get((scope['method'], scope['path']))
+    if route:
+        await route(scope, receive, send)
+    elif any(path == scope['path'] for _, path in ROUTES):
+        await _send_response(send, 405, 'Method not allowed')
+    else:
+        await _send_response(send, 404, 'Not found')
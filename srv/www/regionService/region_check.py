@@ -0,0 +1,362 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validation of the region data configuration.
+
+The service stops at the first section it cannot process and skips
+malformed client IP ranges with a log message. check_region_data()
+validates the whole configuration in one pass instead and reports every
+problem with the file, line, and section it was found in, along with
+duplicate and overlapping client IP ranges and statistics of the region
+map the service would build. The update server options are parsed with
+region_srv.parse_region_info(), client IP ranges are accepted or rejected
+as region_srv.insert_ip_ranges() does.
+
+Errors are problems that stop the service or make it skip a part of the
+configuration, warnings are duplicate and overlapping client IP ranges
+that are resolved by longest prefix match.
+"""
+
+import configparser
+import ipaddress
+import os
+import time
+
+from collections import namedtuple
+
+import region_srv
+
+ERROR = 'error'
+WARNING = 'warning'
+
+Message = namedtuple(
+    'Message', ['severity', 'path', 'line', 'section', 'text']
+)
+
+CheckResult = namedtuple('CheckResult', ['messages', 'statistics'])
+
+# Client IP range options: (option, file option, address bits)
+_RANGE_OPTIONS = (
+    ('public-ips', 'public-ips-file', 32),
+    ('public-ipsv6', 'public-ipsv6-file', 128)
+)
+
+# Update server address options: (option, address type)
+_ADDRESS_OPTIONS = (
+    ('smt-server-ip', ipaddress.IPv4Address),
+    ('smt-server-ipv6', ipaddress.IPv6Address)
+)
+
+
+def format_message(message):
+    """Return the message as path:line: severity: [section] text"""
+    location = message.path
+    if message.line:
+        location += ':%d' % message.line
+    text = message.text
+    if message.section:
+        text = '[%s] %s' % (message.section, text)
+    return '%s: %s: %s' % (location, message.severity, text)
+
+
+def _index_lines(path, report):
+    """Return the line numbers of the sections and options of the region
+       data configuration as {section: (line, {option: [(line, value)]})},
+       an option continued on the following lines has an entry per line.
+       Duplicate sections and options, which the service rejects, are
+       reported."""
+    sections = {}
+    options = None
+    option_lines = None
+    with open(path) as region_data:
+        for line_number, line in enumerate(region_data, 1):
+            value = line.strip()
+            if not value or value[0] in '#;':
+                continue
+            if line[0].isspace() and option_lines is not None:
+                option_lines.append((line_number, value))
+                continue
+
+            option_lines = None
+            match = configparser.RawConfigParser.SECTCRE.match(value)
+            if match:
+                section = match.group('header')
+                if section in sections:
+                    report(
+                        ERROR, path, line_number, section,
+                        'Duplicate section, first defined in line %d'
+                        % sections[section][0]
+                    )
+                else:
+                    sections[section] = (line_number, {})
+                options = sections[section][1]
+                continue
+
+            match = configparser.RawConfigParser.OPTCRE.match(value)
+            if match and options is not None:
+                option = match.group('option').rstrip().lower()
+                if option in options:
+                    report(
+                        ERROR, path, line_number, section,
+                        'Duplicate option %s, first defined in line %d'
+                        % (option, options[option][0][0])
+                    )
+                option_lines = options[option] = [
+                    (line_number, match.group('value').strip())
+                ]
+
+    return sections
+
+
+def _get_option_lines(region_data_cfg, section, option_lines, option):
+    """Return the (line, value) of every line of the option in the section,
+       a single entry without line for options inherited from the DEFAULT
+       section"""
+    if option_lines.get(option):
+        return option_lines[option]
+    if region_data_cfg.has_option(section, option):
+        return [(None, region_data_cfg.get(section, option))]
+    return []
+
+
+def check_region_data(conf):
+    """Validate the region data configuration file and the IP range files
+       it references, return a CheckResult with the list of Message found
+       and a dict of statistics"""
+    start = time.perf_counter()
+    messages = []
+
+    def report(severity, path, line, section, text):
+        messages.append(Message(severity, path, line, section, text))
+
+    region_data_cfg = configparser.RawConfigParser(strict=False)
+    try:
+        with open(conf) as region_data:
+            region_data_cfg.read_file(region_data)
+        sections = _index_lines(conf, report)
+    except OSError as e:
+        report(ERROR, conf, None, None, 'Could not read file: %s' % e)
+        return CheckResult(messages, {})
+    except configparser.MissingSectionHeaderError as e:
+        report(ERROR, conf, e.lineno, None, 'Missing section header')
+        return CheckResult(messages, {})
+    except configparser.ParsingError as e:
+        # The lines that cannot be parsed are skipped, like the service
+        # the other lines are still checked
+        for line_number, _ in e.errors:
+            report(
+                ERROR, conf, line_number, None,
+                'Expected a section header or an option'
+            )
+        sections = _index_lines(conf, report)
+
+    conf_dir = os.path.dirname(os.path.abspath(conf))
+    strings = {}
+    regions = {}
+    configured_aliases = []
+    update_servers = 0
+    range_files = 0
+    ranges = dict((bits, []) for _, _, bits in _RANGE_OPTIONS)
+    locations = {}
+    duplicates = 0
+    for section in region_data_cfg.sections():
+        section_line, option_lines = sections.get(section, (None, {}))
+
+        def get_lines(option):
+            return _get_option_lines(
+                region_data_cfg, section, option_lines, option
+            )
+
+        def get_line(option):
+            lines = get_lines(option)
+            return lines[0][0] if lines else section_line
+
+        region = section.lower()
+        if region in regions:
+            report(
+                ERROR, conf, section_line, section,
+                'Region %s is already defined by section %s'
+                % (region, regions[region])
+            )
+        regions[region] = section
+        configured_aliases.extend(
+            (alias.strip().lower(), region, section, get_line('aliases'))
+            for alias in region_data_cfg.get(
+                section, 'aliases', fallback=''
+            ).split(',') if alias.strip()
+        )
+
+        # Update servers
+        server_options = dict(
+            (option, region_data_cfg.get(section, option, fallback=None))
+            for option in (
+                'smt-server-ip', 'smt-server-ipv6', 'smt-server-name',
+                'smt-registry-name', 'smt-fingerprint', 'smt-server-weight'
+            )
+        )
+        missing = [
+            option for option in (
+                'smt-server-name', 'smt-registry-name', 'smt-fingerprint'
+            ) if not server_options[option]
+        ]
+        if not server_options['smt-server-ip'] and \
+                not server_options['smt-server-ipv6']:
+            missing.append('smt-server-ip or smt-server-ipv6')
+        for option in missing:
+            report(
+                ERROR, conf, section_line, section, 'Missing %s' % option
+            )
+        for option, address_type in _ADDRESS_OPTIONS:
+            if not server_options[option]:
+                continue
+            for address in server_options[option].split(','):
+                try:
+                    address_type(address)
+                except ValueError as e:
+                    report(
+                        ERROR, conf, get_line(option), section,
+                        'Invalid update server address: %s' % e
+                    )
+        if not missing:
+            try:
+                smt_info = region_srv.parse_region_info(
+                    server_options['smt-server-ip'],
+                    server_options['smt-server-ipv6'],
+                    server_options['smt-server-name'],
+                    server_options['smt-registry-name'],
+                    server_options['smt-fingerprint'],
+                    region,
+                    strings
+                )
+                update_servers += len(smt_info)
+            except ValueError as e:
+                report(ERROR, conf, section_line, section, str(e))
+            else:
+                if server_options['smt-server-weight']:
+                    try:
+                        region_srv.parse_server_weights(
+                            server_options['smt-server-weight'],
+                            len(smt_info)
+                        )
+                    except ValueError as e:
+                        report(
+                            ERROR, conf, get_line('smt-server-weight'),
+                            section, str(e)
+                        )
+
+        # Client IP ranges
+        for option, file_option, bits in _RANGE_OPTIONS:
+            label = 'IPv4' if bits == 32 else 'IPv6'
+            numbered_ranges = [
+                (conf, line_number, ip_range)
+                for line_number, value in get_lines(option)
+                for ip_range in region_srv.iter_ip_ranges(value)
+            ]
+            ranges_file = region_data_cfg.get(
+                section, file_option, fallback=None
+            )
+            if ranges_file:
+                range_files += 1
+                path = os.path.join(conf_dir, ranges_file)
+                try:
+                    numbered_ranges.extend(
+                        (path, line_number, ip_range)
+                        for line_number, ip_range in
+                        region_srv.iter_numbered_ip_ranges_file(path)
+                    )
+                except OSError as e:
+                    report(
+                        ERROR, conf, get_line(file_option), section,
+                        'Could not read IP ranges: %s' % e
+                    )
+
+            family_ranges = ranges[bits]
+            for path, line_number, ip_range in numbered_ranges:
+                try:
+                    key = region_srv.parse_network(ip_range, bits) + (
+                        region,
+                    )
+                except ValueError as e:
+                    report(
+                        ERROR, path, line_number, section,
+                        'Invalid %s range: %s' % (label, e)
+                    )
+                    continue
+                if key in locations:
+                    duplicates += 1
+                    report(
+                        WARNING, path, line_number, section,
+                        'Duplicate %s range %s, also at %s:%s'
+                        % (label, ip_range, *locations[key])
+                    )
+                else:
+                    locations[key] = (path, line_number)
+                family_ranges.append(key)
+
+    # Region aliases, checked once all region names are known
+    alias_regions = {}
+    for alias, region, section, line in configured_aliases:
+        if alias in regions:
+            report(
+                ERROR, conf, line, section,
+                'Alias %s is the name of region %s' % (alias, alias)
+            )
+        elif alias_regions.get(alias, region) != region:
+            report(
+                ERROR, conf, line, section,
+                'Alias %s is also an alias of region %s'
+                % (alias, alias_regions[alias])
+            )
+        else:
+            alias_regions[alias] = region
+
+    statistics = {
+        'regions': len(regions),
+        'aliases': len(alias_regions),
+        'update_servers': update_servers,
+        'range_files': range_files
+    }
+    overlaps = 0
+    for _, _, bits in _RANGE_OPTIONS:
+        label = 'IPv4' if bits == 32 else 'IPv6'
+        aggregated, conflicts = region_srv.aggregate_ranges(
+            ranges[bits], bits
+        )
+        for conflict, other in conflicts:
+            overlaps += 1
+            report(
+                WARNING, *locations[conflict], regions[conflict[2]],
+                '%s range %s of region %s overlaps range %s of region %s '
+                'at %s:%s' % (
+                    label, region_srv.format_network(*conflict[:2], bits),
+                    conflict[2],
+                    region_srv.format_network(*other[:2], bits),
+                    other[2], *locations[other]
+                )
+            )
+        statistics['%s_ranges' % label.lower()] = len(ranges[bits])
+        statistics['%s_aggregated_ranges' % label.lower()] = len(aggregated)
+    statistics['duplicate_ranges'] = duplicates
+    statistics['overlapping_ranges'] = overlaps
+    statistics['errors'] = sum(
+        1 for message in messages if message.severity == ERROR
+    )
+    statistics['warnings'] = len(messages) - statistics['errors']
+    statistics['check_seconds'] = round(time.perf_counter() - start, 3)
+
+    return CheckResult(messages, statistics)
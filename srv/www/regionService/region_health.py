@@ -0,0 +1,296 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Weighted and health-aware order of the update servers of a region.
+
+The update server returned first is picked with a probability
+proportional to its weight, the configured weight, see
+region_srv.parse_server_weights(), multiplied with the factor of its
+health state read from a local health file. The responses starting with
+every update server with a weight are rendered, and pre-compressed if the
+region map holds compressed responses, once per region map and health
+state, such that a request picks one of them in constant time with an
+AliasTable, see region_srv.get_weighted_response().
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+from collections import namedtuple
+
+import region_srv
+
+# The alias table picking the update server returned first by weight, the
+# responses starting with every update server with a weight by response
+# format, and the same responses pre-compressed by content coding and
+# response format
+WeightedResponses = namedtuple(
+    'WeightedResponses', ['alias_table', 'responses', 'compressed_responses']
+)
+
+# Factors of the update server weights by health state
+HEALTH_STATES = {'up': 1.0, 'down': 0.0}
+
+
+class AliasTable:
+    """Pick the index of one of the given non-negative weights at random
+       with a probability proportional to the weight in constant time,
+       Walker's alias method. The table is built in linear time with
+       Vose's algorithm, at least one weight must be greater than 0."""
+
+    def __init__(self, weights):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.probabilities = [1.0] * count
+        self.aliases = list(range(count))
+        small = [i for i, probability in enumerate(scaled) if probability < 1]
+        large = [i for i, probability in enumerate(scaled) if probability >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        # The probabilities of the indices left are 1 up to rounding errors
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def pick(self):
+        index = int(random.random() * len(self.probabilities))
+        if random.random() < self.probabilities[index]:
+            return index
+        return self.aliases[index]
+
+
+class UpdateServerHealth:
+    """Keep the health state of the update servers current with the health
+       file, see read_health_file().
+
+       The health file is checked every interval seconds by a background
+       thread, detected by its modification time, inode, and size, and
+       the new health state is published by replacing the health
+       attribute. The current health state is kept if the file cannot be
+       read. Without health file every update server is up and only the
+       configured weights are applied. apply() returns a region map with
+       the weighted responses for the current health state, the optional
+       on_change callable is called after the health state changed, for
+       example RegionMapReloader.refresh(), such that the weighted
+       responses are created once per region map and health state outside
+       of the requests."""
+
+    def __init__(self, path=None, interval=0, on_change=None):
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self.health = {}
+        self._file_state = None
+        self._thread = None
+
+    def _get_file_state(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def load(self):
+        """Read the health file, the current health state is kept if the
+           file cannot be read"""
+        file_state = self._get_file_state()
+        try:
+            health = read_health_file(self.path)
+        except OSError as e:
+            logging.error('Could not read health file: %s' % e)
+            return False
+        self._file_state = file_state
+        self.health = health
+        logging.info('Loaded update server health from %s' % self.path)
+        if self.on_change:
+            self.on_change()
+        return True
+
+    def check(self):
+        """Read the health file if it changed"""
+        file_state = self._get_file_state()
+        if file_state and file_state != self._file_state:
+            return self.load()
+        return False
+
+    def start(self):
+        """Start the background thread watching for changes"""
+        if self._thread or not self.path or not self.interval:
+            return
+        self._thread = threading.Thread(
+            target=self._watch, name='update-server-health', daemon=True
+        )
+        self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                logging.error('Update server health check failed: %s' % e)
+
+    def apply(self, region_map):
+        """Return the region map with the weighted responses for the
+           current health state, see create_weighted_responses()"""
+        return region_map._replace(
+            weighted_responses=create_weighted_responses(
+                region_map, self.health
+            )
+        )
+
+
+def read_health_file(path):
+    """Return the health state in the health file as dict mapping update
+       server IP addresses and names to the factor their weight is
+       multiplied with. Every line of the file holds an update server IP
+       address, IPv6 address, or name followed by its state, up, down, or
+       a factor between 0 and 1. Empty lines and lines starting with # are
+       skipped, invalid lines are logged and skipped."""
+    health = {}
+    with open(path) as health_file:
+        for line_number, line in enumerate(health_file, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            factor = None
+            if len(fields) == 2:
+                factor = HEALTH_STATES.get(fields[1].lower())
+                if factor is None:
+                    try:
+                        factor = float(fields[1])
+                    except ValueError:
+                        pass
+            if factor is None or not 0 <= factor <= 1:
+                logging.warning(
+                    'Invalid health state in line %d of %s: %s'
+                    % (line_number, path, line.strip())
+                )
+                continue
+            health[fields[0]] = factor
+
+    return health
+
+
+def get_server_health(update_server, health):
+    """Return the factor of the update server weight in the health state,
+       the lowest factor of its IP address, IPv6 address, and name, 1 if
+       none of them is listed"""
+    return min(
+        (
+            health[key] for key in update_server[:3]
+            if key and key in health
+        ),
+        default=1.0
+    )
+
+
+def get_weighted_orders(weights):
+    """Return the order of the update servers in the response starting
+       with each update server with a weight greater than 0, as lists of
+       indices of the weights. The update server returned first is
+       followed by the other update servers with a weight, then by those
+       without, both in configuration order wrapping around at the last
+       one, such that a client falling back to the next update server
+       reaches a down update server last."""
+    count = len(weights)
+    orders = []
+    for first, weight in enumerate(weights):
+        if not weight:
+            continue
+        others = [(first + i) % count for i in range(1, count)]
+        orders.append(
+            [first] +
+            [i for i in others if weights[i]] +
+            [i for i in others if not weights[i]]
+        )
+
+    return orders
+
+
+def create_weighted_responses(region_map, health=None):
+    """Return the WeightedResponses of every region whose update servers
+       are not all equally likely to be returned first, keyed by region
+       name. The weight of an update server is its configured weight, see
+       region_srv.parse_server_weights(), multiplied with the factor of
+       its health state, see get_server_health(). A response starts with an
+       update server picked by weight, the update servers without weight
+       come last, see get_weighted_orders(). If the region map holds
+       pre-compressed responses the weighted responses are compressed as
+       well. Regions without configured weights and with all update
+       servers up, or with all update servers down, are not included,
+       their update servers are returned in uniformly random order."""
+    response_caches = region_map.response_caches or \
+        {'xml': region_map.response_cache or {}}
+    encodings = region_map.compressed_responses or {}
+    server_weights = region_map.server_weights or {}
+    weighted_responses = {}
+    for region, smt_server_data in \
+            region_map.region_name_to_smt_data_map.items():
+        weights = server_weights.get(region) or (1.0,) * len(smt_server_data)
+        if health:
+            weights = tuple(
+                weight * get_server_health(update_server, health)
+                for weight, update_server in zip(weights, smt_server_data)
+            )
+        if not any(weights):
+            logging.warning(
+                'All update servers of region %s are down' % region
+            )
+            continue
+        if len(set(weights)) == 1:
+            continue
+        orders = get_weighted_orders(weights)
+        responses = {}
+        for response_format, response_cache in response_caches.items():
+            smt_info_elems = response_cache.get(region)
+            if smt_info_elems:
+                join = region_srv.RESPONSE_FORMATS[response_format].join
+                responses[response_format] = tuple(
+                    join([smt_info_elems[i] for i in order])
+                    for order in orders
+                )
+        compressed_responses = dict(
+            (encoding, dict(
+                (response_format, tuple(
+                    region_srv.RESPONSE_ENCODINGS[encoding](response)
+                    for response in format_responses
+                ))
+                for response_format, format_responses in responses.items()
+            ))
+            for encoding in encodings
+        )
+        weighted_responses[region] = WeightedResponses(
+            AliasTable([weight for weight in weights if weight]),
+            responses,
+            compressed_responses
+        )
+
+    return weighted_responses
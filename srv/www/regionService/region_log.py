@@ -0,0 +1,111 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Logging setup for the region service.
+
+In the default sync mode records are written to the log file by the
+request threads. In async mode the request threads only put the records
+on a queue, a QueueListener thread writes them to the log file in batches
+such that the request threads do not wait for the file handler lock or
+the disk.
+"""
+
+import atexit
+import logging
+import queue
+
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s %(levelname)s:%(message)s'
+
+
+class BatchingFileHandler(logging.FileHandler):
+    """File handler that collects records while more records are waiting in
+       the given queue and writes them with a single write, at most
+       batch_size records at a time"""
+
+    def __init__(self, filename, record_queue, batch_size=512):
+        super().__init__(filename)
+        self.record_queue = record_queue
+        self.batch_size = batch_size
+        self._batch = []
+
+    def emit(self, record):
+        try:
+            self._batch.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._batch) >= self.batch_size or self.record_queue.empty():
+            self.write_batch(record)
+
+    def write_batch(self, record=None):
+        if not self._batch:
+            return
+        batch = ''.join(self._batch)
+        self._batch = []
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(batch)
+            self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.write_batch()
+        finally:
+            self.release()
+        super().flush()
+
+
+def _stop_listener(listener):
+    """Write the queued records and stop the listener, a listener that was
+       never started writes the records queued so far"""
+    if listener._thread is None:
+        listener.start()
+    listener.stop()
+
+
+def setup_logging(log_name, mode='sync', start=True):
+    """Log to the given file, mode is sync or async. Raises IOError if the
+       log file cannot be opened. In async mode the QueueListener is
+       returned, with start False it is not started and records are queued
+       until it is, for example while a pool of processes is forked."""
+    if mode == 'sync':
+        logging.basicConfig(
+            filename=log_name,
+            level=logging.INFO,
+            format=LOG_FORMAT
+        )
+        return
+
+    record_queue = queue.SimpleQueue()
+    handler = BatchingFileHandler(log_name, record_queue)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(record_queue, handler)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(record_queue))
+    if start:
+        listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
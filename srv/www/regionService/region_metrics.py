@@ -0,0 +1,254 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Request metrics of the region service in Prometheus text format.
+
+Every request thread records into its own shard of counters without taking
+a lock, the shards are only summed when the metrics are rendered. Shards
+of threads that ended are folded into a single shard such that thread
+churn does not grow the number of shards.
+"""
+
+import bisect
+import threading
+
+OUTCOMES = ('hint_hit', 'ipv4_hit', 'ipv6_hit', 'not_found')
+STAGES = ('lookup', 'render')
+
+# Upper bounds of the latency histogram buckets in ns
+BUCKETS = (
+    1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000,
+    1000000, 2500000, 5000000, 10000000
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shard:
+    def __init__(self):
+        self.requests = dict((outcome, 0) for outcome in OUTCOMES)
+        # Per stage bucket counts, the last bucket is +Inf, and sum in ns
+        self.buckets = dict(
+            (stage, [0] * (len(BUCKETS) + 1)) for stage in STAGES
+        )
+        self.sums = dict((stage, 0) for stage in STAGES)
+
+    def add(self, other):
+        for outcome, count in other.requests.items():
+            self.requests[outcome] += count
+        for stage in STAGES:
+            self.sums[stage] += other.sums[stage]
+            buckets = self.buckets[stage]
+            for i, count in enumerate(other.buckets[stage]):
+                buckets[i] += count
+
+
+class RequestMetrics:
+    """Request counts by outcome and latency histograms of the lookup and
+       the render stage of a request"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    def _get_shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def observe(self, outcome, lookup_ns, render_ns=None):
+        """Count a request with the given outcome, see OUTCOMES, and the
+           duration of its stages, a request without response has no
+           render stage"""
+        shard = self._get_shard()
+        shard.requests[outcome] += 1
+        shard.buckets['lookup'][bisect.bisect_left(BUCKETS, lookup_ns)] += 1
+        shard.sums['lookup'] += lookup_ns
+        if render_ns is not None:
+            shard.buckets['render'][
+                bisect.bisect_left(BUCKETS, render_ns)
+            ] += 1
+            shard.sums['render'] += render_ns
+
+    def collect(self):
+        """Return the sum of all shards"""
+        total = _Shard()
+        with self._lock:
+            shards = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    shards.append((thread, shard))
+                else:
+                    self._retired.add(shard)
+            self._shards = shards
+            total.add(self._retired)
+        for _, shard in shards:
+            total.add(shard)
+        return total
+
+
+def format_server_timing(timings):
+    """Return the (stage, duration in ns) timings of a request as value of
+       the Server-Timing response header, durations in milliseconds"""
+    return ', '.join(
+        '%s;dur=%.3f' % (stage, duration / 1e6)
+        for stage, duration in timings
+    )
+
+
+def format_timings_log(timings):
+    """Return the (stage, duration in ns) timings of a request as log
+       fields, durations in microseconds"""
+    return ''.join(
+        ' %s=%d' % (stage, duration // 1000) for stage, duration in timings
+    )
+
+
+def _format_seconds(ns):
+    return repr(ns / 1e9)
+
+
+def _metric(lines, name, metric_type, help_text, samples):
+    lines.append('# HELP %s %s' % (name, help_text))
+    lines.append('# TYPE %s %s' % (name, metric_type))
+    for labels, value in samples:
+        lines.append('%s%s %s' % (name, labels, value))
+
+
+def render_metrics(request_metrics, region_map_reloader, rate_limiter=None):
+    """Return the request metrics, the state of the region map of the
+       given RegionMapReloader, and the state of the optional RateLimiter
+       in Prometheus text format"""
+    totals = request_metrics.collect()
+    lines = []
+    _metric(
+        lines, 'regionsrv_requests_total', 'counter',
+        'Requests to /regionInfo by outcome',
+        [
+            ('{outcome="%s"}' % outcome, count)
+            for outcome, count in totals.requests.items()
+        ]
+    )
+    for stage in STAGES:
+        samples = []
+        count = 0
+        for bound, bucket_count in zip(
+                BUCKETS + (None,), totals.buckets[stage]
+        ):
+            count += bucket_count
+            samples.append((
+                '_bucket{le="%s"}' % (
+                    _format_seconds(bound) if bound else '+Inf'
+                ),
+                count
+            ))
+        samples.append(('_sum', _format_seconds(totals.sums[stage])))
+        samples.append(('_count', count))
+        _metric(
+            lines, 'regionsrv_%s_duration_seconds' % stage, 'histogram',
+            'Duration of the %s stage of /regionInfo requests' % stage,
+            samples
+        )
+
+    region_map = region_map_reloader.region_map
+    _metric(
+        lines, 'regionsrv_prefixes', 'gauge',
+        'Client IP ranges in the lookup tree by address family',
+        [
+            ('{family="ipv4"}', len(region_map.ipv4_ranges_map)),
+            ('{family="ipv6"}', len(region_map.ipv6_ranges_map))
+        ]
+    )
+    _metric(
+        lines, 'regionsrv_regions', 'gauge', 'Configured regions',
+        [('', len(region_map.region_name_to_smt_data_map))]
+    )
+    _metric(
+        lines, 'regionsrv_region_map_load_timestamp_seconds', 'gauge',
+        'Time of the last successful region data load',
+        [('', region_map_reloader.last_load_time)]
+    )
+    _metric(
+        lines, 'regionsrv_region_map_load_duration_seconds', 'gauge',
+        'Duration of the last successful region data load',
+        [('', region_map_reloader.last_load_duration)]
+    )
+
+    if region_map.generation is not None:
+        _metric(
+            lines, 'regionsrv_region_map_generation', 'gauge',
+            'Generation of the mapped region map snapshot',
+            [('', region_map.generation)]
+        )
+
+    lookup_cache = region_map.lookup_cache
+    if lookup_cache is not None:
+        for name, value in (
+                ('hits', lookup_cache.hits),
+                ('misses', lookup_cache.misses),
+                ('evictions', lookup_cache.evictions)
+        ):
+            _metric(
+                lines, 'regionsrv_lookup_cache_%s_total' % name, 'counter',
+                'Lookup cache %s since the region data was loaded' % name,
+                [('', value)]
+            )
+        _metric(
+            lines, 'regionsrv_lookup_cache_entries', 'gauge',
+            'Client addresses in the lookup cache',
+            [('', len(lookup_cache))]
+        )
+
+    region_aliases = region_map.region_aliases
+    if region_aliases is not None:
+        _metric(
+            lines, 'regionsrv_region_alias_hits_total', 'counter',
+            'Region hints matched by region alias since the region data '
+            'was loaded',
+            [
+                ('{alias="%s",region="%s"}' % (
+                    alias, region_aliases.regions[alias]
+                ), count)
+                for alias, count in sorted(region_aliases.uses.items())
+            ]
+        )
+
+    if rate_limiter is not None:
+        _metric(
+            lines, 'regionsrv_rate_limited_total', 'counter',
+            'Requests rejected by the per client rate limit',
+            [('', rate_limiter.rejected)]
+        )
+        _metric(
+            lines, 'regionsrv_rate_limiter_clients', 'gauge',
+            'Clients whose request rate is tracked',
+            [('', len(rate_limiter))]
+        )
+        _metric(
+            lines, 'regionsrv_rate_limiter_evictions_total', 'counter',
+            'Clients no longer tracked to make room for other clients',
+            [('', rate_limiter.evictions)]
+        )
+
+    return '\n'.join(lines) + '\n'
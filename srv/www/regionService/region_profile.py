@@ -0,0 +1,145 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Sampling profiler of the region service request handling.
+
+One in every sample_rate requests is run under cProfile and its profile
+is added to the aggregated statistics of all sampled requests. The
+statistics are written to a file in the pstats format, readable with
+python3 -m pstats, when a trigger file is created or touched. A trigger
+file works in every server, unlike a signal handler, which mod_wsgi does
+not install in its daemon processes by default. Only one request
+is profiled at a time, a request due for sampling while another request
+is profiled is not profiled, such that the request threads never wait
+for each other to be profiled. Up to Python 3.11 cProfile only records
+the calls of the thread running the profiled request. From Python 3.12
+cProfile records the calls of all threads, the statistics then include
+parts of the requests handled concurrently and every request thread runs
+slower while a request is profiled.
+"""
+
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+# From Python 3.12 cProfile uses sys.monitoring, which is process wide
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class RequestProfiler:
+    """Profile one in sample_rate requests and write the aggregated
+       statistics to path on request. A background thread checks the
+       trigger file every interval seconds, detected by its modification
+       time and inode, and writes the statistics when the file was
+       created or touched since the thread started."""
+
+    def __init__(self, sample_rate, path, trigger=None, interval=1):
+        self.sample_rate = sample_rate
+        self.path = path
+        self.trigger = trigger
+        self.interval = interval
+        self.samples = 0
+        self._requests = itertools.count()
+        self._stats = None
+        self._profiling = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._trigger_state = None
+        self._thread = None
+
+    def sample(self):
+        """Return whether the current request is due for sampling"""
+        return next(self._requests) % self.sample_rate == 0
+
+    def runcall(self, func, *args, **kwargs):
+        """Call func with the given arguments and return its result, under
+           cProfile unless another request is profiled"""
+        if not self._profiling.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+                    self.samples += 1
+        finally:
+            self._profiling.release()
+
+    def dump(self):
+        """Write the aggregated statistics of all sampled requests to
+           path, returns False if no request was sampled yet. The file is
+           replaced atomically."""
+        with self._stats_lock:
+            if self._stats is None:
+                logging.info('No profiled requests to write')
+                return False
+            path_tmp = '%s.%d.tmp' % (self.path, os.getpid())
+            self._stats.dump_stats(path_tmp)
+            os.replace(path_tmp, self.path)
+            samples = self.samples
+        logging.info(
+            'Wrote profile of %d requests to %s' % (samples, self.path)
+        )
+        return True
+
+    def _get_trigger_state(self):
+        try:
+            stat = os.stat(self.trigger)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino)
+
+    def check(self):
+        """Write the statistics if the trigger file was created or touched
+           since the last check"""
+        trigger_state = self._get_trigger_state()
+        if trigger_state == self._trigger_state:
+            return False
+        self._trigger_state = trigger_state
+        if trigger_state is None:
+            return False
+        return self.dump()
+
+    def start(self):
+        """Start the background thread watching the trigger file, a
+           trigger file that already exists does not write the
+           statistics"""
+        if self._thread or not self.trigger or not self.interval:
+            return
+        self._trigger_state = self._get_trigger_state()
+        self._thread = threading.Thread(
+            target=self._watch, name='request-profiler', daemon=True
+        )
+        self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                logging.error('Could not write profile: %s' % e)
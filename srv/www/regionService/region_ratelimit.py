@@ -0,0 +1,98 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Per client request rate limit of the region service.
+
+A client calling the service in a loop can occupy all request threads of
+the WSGI daemon process. RateLimiter keeps a token bucket per client
+network and rejects requests over the configured rate before the update
+server information is looked up. The number of tracked clients is bounded,
+the least recently seen client is forgotten first.
+"""
+
+import threading
+import time
+
+from collections import OrderedDict
+
+import region_srv
+
+
+class RateLimiter:
+    """Token bucket rate limit of the requests per client. Every client
+       may send burst requests at once and rate requests per second on
+       average. Clients are identified by the network of their address
+       with the given IPv4 and IPv6 prefix lengths, such that a client
+       cycling through the addresses of its network shares one bucket.
+       The buckets of at most size clients are kept, the least recently
+       seen client is evicted when the limit is reached and starts with a
+       full bucket when it is seen again."""
+
+    def __init__(
+            self, rate, burst, size, ipv4_prefix=32, ipv6_prefix=64,
+            clock=time.monotonic
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.size = size
+        self.prefixes = {32: ipv4_prefix, 128: ipv6_prefix}
+        self.clock = clock
+        self.rejected = 0
+        self.evictions = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def get_client(self, address):
+        """Return the key of the bucket of the given client address"""
+        try:
+            bits, packed_address = region_srv.parse_address(address)
+        except (TypeError, ValueError):
+            # No or an invalid client address, limited on its own
+            return address
+        return bits, int.from_bytes(packed_address, 'big') >> (
+            bits - self.prefixes[bits]
+        )
+
+    def allow(self, address, cost=1):
+        """Take cost tokens from the bucket of the client, return False and
+           count the request as rejected if the bucket holds fewer"""
+        client = self.get_client(address)
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                self._buckets.move_to_end(client)
+                tokens = min(
+                    self.burst, bucket[0] + (now - bucket[1]) * self.rate
+                )
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            else:
+                self.rejected += 1
+            self._buckets[client] = (tokens, now)
+            # Rejected clients are kept as well, the limit holds for both
+            while len(self._buckets) > self.size:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return allowed
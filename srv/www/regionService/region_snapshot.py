@@ -0,0 +1,388 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compiled binary snapshot of the region map.
+
+Parsing the region data configuration and building the trees is slow for
+large lists of client IP ranges. The snapshot contains the client IP ranges
+flattened into sorted, non-overlapping intervals together with the region
+table and is memory mapped by the service, the lookup is a binary search
+over the mapped file. The region data configuration remains the source of
+truth, a snapshot is only used if it was compiled from the current
+configuration file.
+
+With several WSGI daemon processes the snapshot is the shared region map:
+load_shared_region_map() lets one process compile a stale snapshot while
+holding a lock on SNAPSHOT.lock, the other processes wait for the lock and
+map the new snapshot. The mapped pages are shared by all processes through
+the page cache. Every compiled snapshot has the generation of the snapshot
+it replaces incremented by one.
+
+Snapshot layout, integers are little endian unless noted:
+
+header:  magic, format version, generation, latest modification time in
+         ns and total size of the compiled configuration file and the IP
+         range files it references, number of IPv4 intervals, number of
+         IPv6 intervals, size of the region table
+IPv4:    interval start addresses, 4 bytes big endian each
+         interval end addresses, 4 bytes big endian each
+         interval region indices, 4 bytes each
+IPv6:    as IPv4 with 16 byte addresses
+regions: JSON object with the list of source files, the configuration
+         file followed by the IP range files, the list of [region name,
+         list of update server info] pairs, the object of update server
+         weights by region name, and the object of configured region
+         aliases by region name
+"""
+
+import configparser
+import contextlib
+import fcntl
+import ipaddress
+import json
+import logging
+import mmap
+import os
+import struct
+
+import region_srv
+
+MAGIC = b'RGNSNAP\0'
+VERSION = 5
+
+_HEADER = struct.Struct('<8sIQQQIII')
+_INDEX = struct.Struct('<I')
+
+
+class _PackedAddresses:
+    """Sequence view of fixed width big endian addresses in the snapshot,
+       bytes of equal length compare like the integers they encode"""
+
+    def __init__(self, snapshot, offset, count, width):
+        self._snapshot = snapshot
+        self._offset = offset
+        self._count = count
+        self._width = width
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = self._offset + index * self._width
+        return self._snapshot[start:start + self._width]
+
+
+class _PackedIndices:
+    """Sequence view of the region indices in the snapshot"""
+
+    def __init__(self, snapshot, offset, count):
+        self._snapshot = snapshot
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return _INDEX.unpack_from(
+            self._snapshot, self._offset + index * _INDEX.size
+        )[0]
+
+
+def _get_snapshot_ranges(snapshot, offset, count, bits, regions):
+    """Return the interval lookup on the memory mapped snapshot, a drop-in
+       for the trees of the lookup engines in the region map"""
+    width = bits // 8
+    return region_srv.IntervalRanges(
+        bits,
+        _PackedAddresses(snapshot, offset, count, width),
+        _PackedAddresses(snapshot, offset + count * width, count, width),
+        _PackedIndices(snapshot, offset + 2 * count * width, count),
+        regions
+    )
+
+
+def _get_intervals(ranges_map, region_index):
+    """Flatten the ranges in the given tree to intervals of region indices"""
+    if isinstance(ranges_map, region_srv.IntervalRanges):
+        return [
+            (start, end, region_index[value[0][5]])
+            for start, end, value in ranges_map.intervals()
+        ]
+
+    ranges = []
+    for prefix in ranges_map:
+        network = ipaddress.ip_network(prefix)
+        ranges.append((
+            int(network.network_address),
+            int(network.broadcast_address),
+            region_index[ranges_map[prefix][0][5]]
+        ))
+
+    return region_srv.flatten_ranges(ranges)
+
+
+def _pack_intervals(intervals, width):
+    return b''.join((
+        b''.join(start.to_bytes(width, 'big') for start, _, _ in intervals),
+        b''.join(end.to_bytes(width, 'big') for _, end, _ in intervals),
+        struct.pack(
+            '<%dI' % len(intervals), *(index for _, _, index in intervals)
+        )
+    ))
+
+
+def _get_source_state(stats):
+    """Return the latest modification time and the total size of the files
+       with the given stat results"""
+    return (
+        max(stat.st_mtime_ns for stat in stats),
+        sum(stat.st_size for stat in stats)
+    )
+
+
+def write_snapshot(region_map, path, source_state=(0, 0), generation=None):
+    """Write the given region map as snapshot to path. The file is replaced
+       atomically such that readers see either the old or the new
+       snapshot. The generation defaults to the generation of the replaced
+       snapshot incremented by one."""
+    if generation is None:
+        generation = read_generation(path) + 1
+    regions = sorted(region_map.region_name_to_smt_data_map)
+    region_index = dict((region, i) for i, region in enumerate(regions))
+    ipv4_intervals = _get_intervals(region_map.ipv4_ranges_map, region_index)
+    ipv6_intervals = _get_intervals(region_map.ipv6_ranges_map, region_index)
+    region_table = json.dumps({
+        'sources': [
+            os.path.abspath(source_file)
+            for source_file in region_map.source_files
+        ],
+        'regions': [
+            (region, region_map.region_name_to_smt_data_map[region])
+            for region in regions
+        ],
+        'weights': region_map.server_weights or {},
+        'aliases': region_map.region_aliases.configured
+        if region_map.region_aliases is not None else {}
+    }).encode('utf-8')
+
+    snapshot_tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(snapshot_tmp, 'wb') as snapshot:
+        snapshot.write(_HEADER.pack(
+            MAGIC, VERSION, generation, source_state[0], source_state[1],
+            len(ipv4_intervals), len(ipv6_intervals), len(region_table)
+        ))
+        snapshot.write(_pack_intervals(ipv4_intervals, 4))
+        snapshot.write(_pack_intervals(ipv6_intervals, 16))
+        snapshot.write(region_table)
+    os.replace(snapshot_tmp, path)
+
+
+def compile_region_map(conf, path, processes=1):
+    """Compile the region data configuration file to a snapshot, returns
+       False if the configuration cannot be processed. The IP ranges are
+       parsed in a pool of processes if processes is more than one."""
+    # Take the state of the source files before they are read, a change
+    # while compiling makes the snapshot stale rather than wrongly current
+    conf_stat = os.stat(conf)
+    try:
+        source_files = region_srv.get_source_files(conf)
+        stats = [conf_stat] + [
+            os.stat(ranges_file) for ranges_file in source_files[1:]
+        ]
+    except (OSError, configparser.Error):
+        # Reported by create_smt_region_map
+        source_files = stats = None
+    region_map = region_srv.create_smt_region_map(
+        conf, engine='bisect', processes=processes
+    )
+    if not region_map:
+        return False
+    source_state = (0, 0)
+    if region_map.source_files == source_files:
+        source_state = _get_source_state(stats)
+    # Otherwise the configuration changed while it was read, the snapshot
+    # is written stale
+    write_snapshot(region_map, path, source_state)
+    return True
+
+
+def _read_header(snapshot):
+    if len(snapshot) < _HEADER.size:
+        raise ValueError('Truncated region map snapshot')
+    header = _HEADER.unpack_from(snapshot)
+    if header[0] != MAGIC:
+        raise ValueError('Not a region map snapshot')
+    if header[1] != VERSION:
+        raise ValueError(
+            'Unsupported region map snapshot version %d' % header[1]
+        )
+    return header
+
+
+def _read_region_table(snapshot, header):
+    num_ipv4, num_ipv6, table_size = header[5:8]
+    table_offset = _HEADER.size + num_ipv4 * (2 * 4 + _INDEX.size) + \
+        num_ipv6 * (2 * 16 + _INDEX.size)
+    if table_offset + table_size != len(snapshot):
+        raise ValueError('Truncated region map snapshot')
+    return json.loads(snapshot[table_offset:].decode('utf-8'))
+
+
+def is_current(path, conf):
+    """Check whether the snapshot was compiled from the current version of
+       the configuration file and the IP range files it references"""
+    try:
+        with open(path, 'rb') as snapshot_file, mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as snapshot:
+            header = _read_header(snapshot)
+            sources = _read_region_table(snapshot, header)['sources']
+        stats = [os.stat(conf)] + [
+            os.stat(source_file) for source_file in sources[1:]
+        ]
+        return header[3:5] == _get_source_state(stats)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def read_generation(path):
+    """Return the generation of the snapshot, 0 if there is no valid
+       snapshot"""
+    try:
+        with open(path, 'rb') as snapshot_file:
+            return _read_header(snapshot_file.read(_HEADER.size))[2]
+    except (OSError, ValueError):
+        return 0
+
+
+def load_snapshot(path, compress=False):
+    """Memory map the snapshot and return the RegionMap it contains, with
+       pre-compressed responses if compress is set"""
+    with open(path, 'rb') as snapshot_file:
+        snapshot = mmap.mmap(
+            snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+        )
+    header = _read_header(snapshot)
+    region_table = _read_region_table(snapshot, header)
+    num_ipv4, num_ipv6 = header[5:7]
+    ipv4_offset = _HEADER.size
+    ipv6_offset = ipv4_offset + num_ipv4 * (2 * 4 + _INDEX.size)
+
+    region_name_to_smt_data_map = {}
+    regions = []
+    strings = {}
+    for region, smt_info in region_table['regions']:
+        smt_info = tuple(
+            region_srv.create_update_server(update_server, strings)
+            for update_server in smt_info
+        )
+        region_name_to_smt_data_map[region] = smt_info
+        regions.append(smt_info)
+
+    response_caches = region_srv.create_response_caches(
+        region_name_to_smt_data_map
+    )
+    return region_srv.RegionMap(
+        _get_snapshot_ranges(snapshot, ipv4_offset, num_ipv4, 32, regions),
+        _get_snapshot_ranges(snapshot, ipv6_offset, num_ipv6, 128, regions),
+        region_name_to_smt_data_map,
+        response_caches['xml'],
+        source_files=tuple(region_table['sources']),
+        generation=header[2],
+        response_etags=region_srv.create_response_etags(
+            response_caches['xml']
+        ),
+        response_caches=response_caches,
+        compressed_responses=region_srv.create_compressed_responses(
+            response_caches
+        ) if compress else None,
+        server_weights=dict(
+            (region, tuple(weights))
+            for region, weights in region_table['weights'].items()
+        ),
+        region_aliases=region_srv.RegionAliases(
+            region_name_to_smt_data_map,
+            dict(
+                (region, tuple(aliases))
+                for region, aliases in region_table['aliases'].items()
+            )
+        )
+    )
+
+
+@contextlib.contextmanager
+def _lock_snapshot(path):
+    """Hold an exclusive lock on the lock file of the snapshot"""
+    with open('%s.lock' % path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_shared_region_map(conf, snapshot, compress=False, processes=1):
+    """Load the region map from the snapshot shared by all processes,
+       compile it first if it is not current. Only one process compiles,
+       the others wait and map the snapshot it wrote. The snapshot is added
+       to the source files such that every process reloads when it is
+       replaced."""
+    if not is_current(snapshot, conf):
+        with _lock_snapshot(snapshot):
+            # Another process may have compiled it while we waited
+            if not is_current(snapshot, conf):
+                logging.info('Compiling %s to %s' % (conf, snapshot))
+                if not compile_region_map(conf, snapshot, processes):
+                    return
+    try:
+        region_map = load_snapshot(snapshot, compress)
+    except (OSError, ValueError) as e:
+        logging.error('Could not load snapshot %s: %s' % (snapshot, e))
+        return
+    logging.info('Mapped region map generation %d from %s' % (
+        region_map.generation, snapshot
+    ))
+
+    return region_map._replace(
+        source_files=region_map.source_files + (snapshot,)
+    )
+
+
+def load_region_map(
+        conf, snapshot=None, engine='pytricia', aggregate=False,
+        compress=False, processes=1
+):
+    """Load the region map from the snapshot if it is current, otherwise
+       from the region data configuration file with the given lookup
+       engine, aggregating the IP ranges if aggregate is set and parsing
+       them in a pool of processes if processes is more than one. With
+       compress the responses are pre-compressed."""
+    if snapshot and is_current(snapshot, conf):
+        try:
+            return load_snapshot(snapshot, compress)
+        except (OSError, ValueError) as e:
+            logging.error('Could not load snapshot %s: %s' % (snapshot, e))
+    elif snapshot:
+        logging.info(
+            'Snapshot %s is not current, loading %s' % (snapshot, conf)
+        )
+
+    return region_srv.create_smt_region_map(
+        conf, engine, aggregate, compress, processes
+    )
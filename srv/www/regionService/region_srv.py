@@ -1,26 +1,360 @@
-import random
+import bisect
+import concurrent.futures
+import configparser
+import hashlib
 import ipaddress
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import pytricia
+import random
+import re
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
 
+from array import array
+from collections import namedtuple, OrderedDict
 
-def get_response_xml(
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+_IPV4_MAPPED_PREFIX = bytes(10) + b'\xff\xff'
+_MISSING = object()
+_IP_RANGE = re.compile(r'[^,\s]+')
+# Availability zone suffixes of region names, us-east-1a or us-central1-a
+_ZONE_SUFFIXES = tuple(
+    separator + zone
+    for separator in ('', '-') for zone in 'abcdefghijklmnopqrstuvwxyz'
+)
+
+RegionMap = namedtuple(
+    'RegionMap',
+    [
+        'ipv4_ranges_map',
+        'ipv6_ranges_map',
+        'region_name_to_smt_data_map',
+        'response_cache',
+        'lookup_cache',
+        'source_files',
+        'response_etags',
+        'response_caches',
+        'compressed_responses',
+        'generation',
+        'server_weights',
+        'region_aliases',
+        'weighted_responses'
+    ],
+    defaults=(None, (), None, None, None, None, None, None, None)
+)
+
+ResponseFormat = namedtuple(
+    'ResponseFormat', ['content_type', 'render', 'join']
+)
+
+# The fields in the order of the <smtInfo> attributes, code indexing the
+# record by position works on plain tuples as well
+UpdateServer = namedtuple(
+    'UpdateServer',
+    ['ip', 'ipv6', 'name', 'registry_name', 'fingerprint', 'region']
+)
+
+
+class LookupCache:
+    """Bounded cache of client address lookup results with least recently
+       used eviction. Results for addresses not in any range are cached as
+       well. A cache belongs to one region map, a rebuilt map starts with a
+       new, empty cache."""
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, address, default=None):
+        with self._lock:
+            try:
+                value = self._entries[address]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(address)
+            self.hits += 1
+            return value
+
+    def put(self, address, value):
+        with self._lock:
+            self._entries[address] = value
+            self._entries.move_to_end(address)
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+class RegionAliases:
+    """Index of the region hints naming a region other than by its name:
+       the aliases configured with the aliases option of the region, the
+       names of the availability zones of the region and of its aliases,
+       the region name followed by a letter, optionally separated by a
+       dash, and the spelling of the region name and aliases with
+       underscores instead of dashes. Generated hints never replace a
+       region name or configured alias, hints generated for several
+       regions are dropped. The regions attribute maps every hint to its
+       region name, the uses attribute counts the requests with the hint.
+       Raises ValueError if a configured alias is a region name or the
+       alias of another region."""
+
+    def __init__(self, regions, configured=None):
+        self.configured = configured or {}
+        self.regions = {}
+        self.uses = {}
+        self._lock = threading.Lock()
+        region_names = set(regions)
+        for region, aliases in self.configured.items():
+            for alias in aliases:
+                if alias in region_names:
+                    raise ValueError(
+                        'Alias %s of region %s is a region name'
+                        % (alias, region)
+                    )
+                if self.regions.get(alias, region) != region:
+                    raise ValueError(
+                        'Alias %s of region %s is an alias of region %s'
+                        % (alias, region, self.regions[alias])
+                    )
+                self.regions[alias] = region
+
+        generated = {}
+        for region in regions:
+            for name in (region,) + tuple(self.configured.get(region, ())):
+                hints = [name + suffix for suffix in _ZONE_SUFFIXES]
+                hints.append(name.replace('-', '_'))
+                for hint in hints:
+                    if hint in region_names or hint in self.regions:
+                        continue
+                    if generated.get(hint, region) != region:
+                        # Ambiguous
+                        generated[hint] = None
+                    else:
+                        generated[hint] = region
+        for hint, region in generated.items():
+            if region:
+                self.regions[hint] = region
+
+    def __len__(self):
+        return len(self.regions)
+
+    def get(self, region_hint, default=None):
+        """Return the name of the region the hint is an alias of, the
+           default if it is none"""
+        region = self.regions.get(region_hint)
+        if region is None:
+            return default
+        with self._lock:
+            self.uses[region_hint] = self.uses.get(region_hint, 0) + 1
+        return region
+
+
+def resolve_region_hint(
+        region_hint, region_name_to_smt_data_map, region_aliases=None
+):
+    """Return the name of the region the hint names or is an alias of, see
+       RegionAliases, the hint itself if it is neither"""
+    if region_hint and region_aliases is not None and \
+            region_hint not in region_name_to_smt_data_map:
+        return region_aliases.get(region_hint, region_hint)
+    return region_hint
+
+
+def get_rotated_responses(smt_info_elems, join):
+    """Return the responses of every rotation of the pre-rendered update
+       servers, the response at index i starts with update server i"""
+    return tuple(
+        join(smt_info_elems[i:] + smt_info_elems[:i])
+        for i in range(len(smt_info_elems))
+    )
+
+
+def create_response_cache(
+        region_name_to_smt_data_map, response_format='xml'
+):
+    """Pre-render the <smtInfo> element, or its equivalent in the given
+       response format, see RESPONSE_FORMATS, of every update server, keyed
+       by region name. The elements are stored encoded such that a request
+       only has to shuffle and join them."""
+    render = RESPONSE_FORMATS[response_format].render
+    response_cache = {}
+    for region, smt_server_data in region_name_to_smt_data_map.items():
+        response_cache[region] = tuple(
+            render(update_server) for update_server in smt_server_data
+        )
+
+    return response_cache
+
+
+def create_response_caches(region_name_to_smt_data_map):
+    """Return the response caches of all RESPONSE_FORMATS keyed by format
+       name"""
+    return dict(
+        (response_format, create_response_cache(
+            region_name_to_smt_data_map, response_format
+        ))
+        for response_format in RESPONSE_FORMATS
+    )
+
+
+def create_compressed_responses(response_caches):
+    """Pre-compress the responses of every region in every response format
+       with every content coding in RESPONSE_ENCODINGS, keyed by content
+       coding, format, and region name. A compressed response cannot be
+       shuffled per request, instead every rotation of the update servers
+       is compressed such that every update server comes first in the same
+       share of the responses, or in the share of its weight, see
+       get_compressed_response()."""
+    compressed_responses = {}
+    for encoding, compress in RESPONSE_ENCODINGS.items():
+        compressed_responses[encoding] = {}
+        for response_format, response_cache in response_caches.items():
+            join = RESPONSE_FORMATS[response_format].join
+            compressed_responses[encoding][response_format] = dict(
+                (region, tuple(
+                    compress(response) for response in
+                    get_rotated_responses(smt_info_elems, join)
+                ))
+                for region, smt_info_elems in response_cache.items()
+            )
+
+    return compressed_responses
+
+
+def create_response_etags(response_cache):
+    """Return the entity tag of the update server set of every region in
+       the response cache, keyed by region name. The tag covers the set of
+       update servers, not the random order they are returned in, and
+       only changes when the update server info of the region changes."""
+    response_etags = {}
+    for region, smt_info_elems in response_cache.items():
+        digest = hashlib.blake2b(digest_size=12)
+        for smt_info_elem in sorted(smt_info_elems):
+            digest.update(smt_info_elem)
+        response_etags[region] = digest.hexdigest()
+
+    return response_etags
+
+
+def parse_address(address):
+    """Parse the given IP address once, return the number of address bits,
+       32 or 128, and the packed address accepted by all lookup engines.
+       IPv4-mapped IPv6 addresses, as reported for IPv4 clients by servers
+       listening on dual stack sockets, are returned as IPv4 address."""
+    try:
+        if ':' in address:
+            packed_address = socket.inet_pton(socket.AF_INET6, address)
+            if packed_address[:12] == _IPV4_MAPPED_PREFIX:
+                return 32, packed_address[12:]
+            return 128, packed_address
+        return 32, socket.inet_pton(socket.AF_INET, address)
+    except OSError:
+        # Forms inet_pton does not handle, e.g. scoped IPv6 addresses,
+        # ipaddress raises ValueError for invalid addresses
+        parsed_address = ipaddress.ip_address(address)
+        if parsed_address.version == 6 and parsed_address.ipv4_mapped:
+            return 32, parsed_address.ipv4_mapped.packed
+        return parsed_address.max_prefixlen, parsed_address.packed
+
+
+def lookup_address(
+        requester_ip, ipv4_ranges_map, ipv6_ranges_map,
+        requester_address=None
+):
+    """Return the update server information for the range containing the
+       requester IP, None if the IP is not in any range. The requester IP
+       is parsed unless its requester_address as returned by
+       parse_address() is given."""
+    bits, packed_address = requester_address or parse_address(requester_ip)
+
+    if bits == 32:
+        return ipv4_ranges_map.get(packed_address)
+    return ipv6_ranges_map.get(packed_address)
+
+
+def get_smt_server_data(
         requester_ip, region_hint, region_name_to_smt_data_map,
-        ipv4_ranges_map, ipv6_ranges_map
+        ipv4_ranges_map, ipv6_ranges_map, lookup_cache=None,
+        region_aliases=None, requester_address=None
 ):
+    """Return the update server information for the region matching the
+       hint or, as a fallback, the requester IP, None if neither matches.
+       The hint matches a region by name or by one of the optional
+       region_aliases. The result of the requester IP lookup is cached in
+       the optional lookup_cache. The requester IP is parsed for the
+       lookup unless its requester_address, see parse_address(), is
+       given."""
     smt_server_data = None
 
     if region_hint:
+        region_hint = resolve_region_hint(
+            region_hint, region_name_to_smt_data_map, region_aliases
+        )
         smt_server_data = region_name_to_smt_data_map.get(region_hint, None)
 
     if not smt_server_data:
-        parsed_address = ipaddress.ip_address(requester_ip)
-
-        if type(parsed_address) == ipaddress.IPv4Address:
-            smt_server_data = ipv4_ranges_map.get(requester_ip)
+        if lookup_cache is None:
+            smt_server_data = lookup_address(
+                requester_ip, ipv4_ranges_map, ipv6_ranges_map,
+                requester_address
+            )
         else:
-            smt_server_data = ipv6_ranges_map.get(requester_ip)
+            smt_server_data = lookup_cache.get(requester_ip, _MISSING)
+            if smt_server_data is _MISSING:
+                smt_server_data = lookup_address(
+                    requester_ip, ipv4_ranges_map, ipv6_ranges_map,
+                    requester_address
+                )
+                lookup_cache.put(requester_ip, smt_server_data)
 
-    if not smt_server_data:
-        return
+    return smt_server_data
+
+
+def get_smt_server_xml(
+        smt_server_data, response_cache=None, weighted_responses=None
+):
+    """Return the XML for the given update server information in random
+       order, as str, or as bytes if a response_cache holds the region.
+       The order is weighted if weighted_responses holds the region, see
+       region_health.create_weighted_responses()."""
+    weighted_response = get_weighted_response(
+        smt_server_data, 'xml', weighted_responses
+    )
+    if weighted_response:
+        return weighted_response
+
+    if response_cache:
+        smt_info_elems = response_cache.get(smt_server_data[0][5])
+        if smt_info_elems:
+            # Randomize the order of the update server information
+            # provided to the client
+            return b''.join((
+                b'<regionSMTdata>\n',
+                *random.sample(smt_info_elems, len(smt_info_elems)),
+                b'</regionSMTdata>'
+            ))
 
     # Randomize the order of the update server information
     # provided to the client
@@ -28,22 +362,318 @@ def get_response_xml(
 
     smt_info_xml = '<regionSMTdata>\n'
     for update_server in smt_server_data:
-        smt_info_xml += '<smtInfo SMTserverIP="%s" ' % update_server[0]
-        if update_server[1]:
-            smt_info_xml += 'SMTserverIPv6="%s" ' % update_server[1]
-        smt_info_xml += 'SMTserverName="%s" ' % update_server[2]
-        smt_info_xml += 'SMTregistryName="%s" ' % update_server[3]
-        smt_info_xml += 'fingerprint="%s" ' % update_server[4]
-        smt_info_xml += 'region="%s"/>\n' % update_server[5]
+        smt_info_xml += get_smt_info_xml(update_server)
 
     smt_info_xml += '</regionSMTdata>'
     return smt_info_xml
 
 
+def get_weighted_response(
+        smt_server_data, response_format, weighted_responses
+):
+    """Return the response in the given response format starting with an
+       update server picked by weight, None if the weighted_responses do
+       not hold the region"""
+    if not weighted_responses:
+        return None
+    weighted = weighted_responses.get(smt_server_data[0][5])
+    if weighted:
+        responses = weighted.responses.get(response_format)
+        if responses:
+            return responses[weighted.alias_table.pick()]
+
+
+def get_smt_server_response(
+        smt_server_data, response_format='xml', response_cache=None,
+        weighted_responses=None
+):
+    """Return the update server information in random order in the given
+       response format, see RESPONSE_FORMATS, as bytes. The elements are
+       taken from the response_cache of the format if it holds the
+       region. The order is weighted if weighted_responses holds the
+       region, see region_health.create_weighted_responses()."""
+    weighted_response = get_weighted_response(
+        smt_server_data, response_format, weighted_responses
+    )
+    if weighted_response:
+        return weighted_response
+
+    smt_info_elems = None
+    if response_cache:
+        smt_info_elems = response_cache.get(smt_server_data[0][5])
+    if not smt_info_elems:
+        render = RESPONSE_FORMATS[response_format].render
+        smt_info_elems = [
+            render(update_server) for update_server in smt_server_data
+        ]
+
+    # Randomize the order of the update server information
+    # provided to the client
+    return RESPONSE_FORMATS[response_format].join(
+        random.sample(smt_info_elems, len(smt_info_elems))
+    )
+
+
+def get_compressed_response(
+        smt_server_data, compressed_responses, encoding, response_format='xml',
+        weighted_responses=None
+):
+    """Return one of the pre-compressed responses with the given content
+       coding and response format for the given update server information
+       at random, None if the compressed_responses do not hold the region.
+       If weighted_responses holds the region the update server the
+       response starts with is picked by weight."""
+    region = smt_server_data[0][5]
+    weighted = weighted_responses.get(region) \
+        if weighted_responses else None
+    if weighted:
+        responses = weighted.compressed_responses.get(encoding, {}).get(
+            response_format
+        )
+        if responses:
+            return responses[weighted.alias_table.pick()]
+    responses = compressed_responses[encoding][response_format].get(region)
+    if responses:
+        return random.choice(responses)
+
+
+def get_response_xml(
+        requester_ip, region_hint, region_name_to_smt_data_map,
+        ipv4_ranges_map, ipv6_ranges_map, response_cache=None,
+        lookup_cache=None, weighted_responses=None, region_aliases=None
+):
+    """Return the update server information for the region matching the
+       hint, by name or one of the optional region_aliases, or, as a
+       fallback, the requester IP. The XML is returned as str, or as
+       bytes if a response_cache holds the region. The result of the
+       requester IP lookup is cached in the optional lookup_cache. The
+       order of the update servers is weighted if weighted_responses
+       holds the region."""
+    smt_server_data = get_smt_server_data(
+        requester_ip, region_hint, region_name_to_smt_data_map,
+        ipv4_ranges_map, ipv6_ranges_map, lookup_cache, region_aliases
+    )
+
+    if not smt_server_data:
+        return
+
+    return get_smt_server_xml(
+        smt_server_data, response_cache, weighted_responses
+    )
+
+
+def get_smt_info_xml(update_server):
+    """Return the <smtInfo> element for the given update server"""
+    smt_info_xml = '<smtInfo SMTserverIP="%s" ' % update_server[0]
+    if update_server[1]:
+        smt_info_xml += 'SMTserverIPv6="%s" ' % update_server[1]
+    smt_info_xml += 'SMTserverName="%s" ' % update_server[2]
+    smt_info_xml += 'SMTregistryName="%s" ' % update_server[3]
+    smt_info_xml += 'fingerprint="%s" ' % update_server[4]
+    smt_info_xml += 'region="%s"/>\n' % update_server[5]
+
+    return smt_info_xml
+
+
+def get_smt_info_dict(update_server):
+    """Return the attributes of the <smtInfo> element for the given update
+       server as dict"""
+    smt_info = {'SMTserverIP': update_server[0]}
+    if update_server[1]:
+        smt_info['SMTserverIPv6'] = update_server[1]
+    smt_info['SMTserverName'] = update_server[2]
+    smt_info['SMTregistryName'] = update_server[3]
+    smt_info['fingerprint'] = update_server[4]
+    smt_info['region'] = update_server[5]
+
+    return smt_info
+
+
+def get_smt_info_json(update_server):
+    """Return the attributes of the <smtInfo> element for the given update
+       server as UTF-8 encoded JSON object"""
+    return json.dumps(
+        get_smt_info_dict(update_server), separators=(',', ':')
+    ).encode('utf-8')
+
+
+def _get_cbor_head(major_type, length):
+    """Return the head of a CBOR data item of the given major type and
+       length, RFC 8949 section 3"""
+    if length < 24:
+        return struct.pack('>B', major_type << 5 | length)
+    if length < 0x100:
+        return struct.pack('>BB', major_type << 5 | 24, length)
+    if length < 0x10000:
+        return struct.pack('>BH', major_type << 5 | 25, length)
+    return struct.pack('>BI', major_type << 5 | 26, length)
+
+
+def _get_cbor_text(text):
+    text = text.encode('utf-8')
+    return _get_cbor_head(3, len(text)) + text
+
+
+def get_smt_info_cbor(update_server):
+    """Return the attributes of the <smtInfo> element for the given update
+       server as CBOR map of text strings"""
+    smt_info = get_smt_info_dict(update_server)
+    return b''.join((
+        _get_cbor_head(5, len(smt_info)),
+        *(
+            _get_cbor_text(name) + _get_cbor_text(value)
+            for name, value in smt_info.items()
+        )
+    ))
+
+
+RESPONSE_FORMATS = {
+    'xml': ResponseFormat(
+        'application/xml',
+        lambda update_server: get_smt_info_xml(update_server).encode('utf-8'),
+        lambda smt_info_elems: b''.join((
+            b'<regionSMTdata>\n', *smt_info_elems, b'</regionSMTdata>'
+        ))
+    ),
+    'json': ResponseFormat(
+        'application/json',
+        get_smt_info_json,
+        lambda smt_info_elems: b'[%s]' % b','.join(smt_info_elems)
+    ),
+    'cbor': ResponseFormat(
+        'application/cbor',
+        get_smt_info_cbor,
+        lambda smt_info_elems: b''.join((
+            _get_cbor_head(4, len(smt_info_elems)), *smt_info_elems
+        ))
+    )
+}
+
+
+# Content codings of the pre-compressed responses in order of preference,
+# brotli if the module is available
+RESPONSE_ENCODINGS = {}
+if brotli:
+    RESPONSE_ENCODINGS['br'] = brotli.compress
+
+
+def _gzip_compress(body):
+    """Return the body in gzip format, the header written by zlib has no
+       modification time such that the output only depends on the body"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+RESPONSE_ENCODINGS['gzip'] = _gzip_compress
+
+
+def parse_batch_queries(body, content_type):
+    """Parse the body of a batch request into a list of (requester_ip,
+       region_hint) queries. A JSON body is a list whose entries are an
+       object with ip and/or regionHint or a string, otherwise every line
+       of the body holds a query of whitespace separated strings. Strings
+       that are IP addresses are the requester IP, others the region hint.
+       Raises ValueError for malformed bodies."""
+    if content_type == 'application/json':
+        try:
+            entries = json.loads(body)
+        except ValueError as e:
+            raise ValueError('Invalid JSON: %s' % e)
+        if not isinstance(entries, list):
+            raise ValueError('Expected a JSON list of queries')
+    else:
+        try:
+            entries = [
+                line.split() for line in body.decode('utf-8').splitlines()
+            ]
+        except UnicodeDecodeError:
+            raise ValueError('Body is not UTF-8 encoded')
+        entries = [entry for entry in entries if entry]
+
+    queries = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            requester_ip = entry.get('ip')
+            region_hint = entry.get('regionHint')
+        else:
+            if isinstance(entry, str):
+                entry = [entry]
+            if not isinstance(entry, list) or len(entry) > 2 or not all(
+                    isinstance(value, str) for value in entry
+            ):
+                raise ValueError('Invalid query: %s' % entry)
+            requester_ip = None
+            region_hint = None
+            for value in entry:
+                try:
+                    parse_address(value)
+                    requester_ip = value
+                except ValueError:
+                    region_hint = value
+        if not isinstance(requester_ip, (str, type(None))) or \
+                not isinstance(region_hint, (str, type(None))):
+            raise ValueError('Invalid query: %s' % entry)
+        queries.append(
+            (requester_ip, region_hint.lower() if region_hint else None)
+        )
+
+    return queries
+
+
+def get_batch_results(
+        queries, region_name_to_smt_data_map, ipv4_ranges_map,
+        ipv6_ranges_map, region_aliases=None
+):
+    """Yield the result of every (requester_ip, region_hint) query as dict
+       with the query, the HTTP status the query would get from the
+       regionInfo endpoint, and for status 200 the matched region and the
+       update servers in configuration order. Region hints match regions
+       by name or by one of the optional region_aliases."""
+    for requester_ip, region_hint in queries:
+        result = {'ip': requester_ip, 'regionHint': region_hint}
+        smt_server_data = None
+        try:
+            if region_hint:
+                smt_server_data = region_name_to_smt_data_map.get(
+                    resolve_region_hint(
+                        region_hint, region_name_to_smt_data_map,
+                        region_aliases
+                    )
+                )
+            if not smt_server_data and requester_ip:
+                smt_server_data = lookup_address(
+                    requester_ip, ipv4_ranges_map, ipv6_ranges_map
+                )
+        except ValueError:
+            result['status'] = 400
+            yield result
+            continue
+
+        if smt_server_data:
+            result['status'] = 200
+            result['region'] = smt_server_data[0][5]
+            result['servers'] = [
+                get_smt_info_dict(update_server)
+                for update_server in smt_server_data
+            ]
+        else:
+            result['status'] = 404
+        yield result
+
+
 def parse_region_info(
         region_smt_ips, region_smt_ipsv6, region_smt_names,
-        region_smt_registry_names, region_smt_cert_fingerprints, region
+        region_smt_registry_names, region_smt_cert_fingerprints, region,
+        strings=None
 ):
+    """Return the update servers of the region as tuple of UpdateServer
+       records. Equal strings are stored once in the optional strings
+       dict, passing the same dict for all regions shares the addresses,
+       names, and fingerprints of update servers serving several
+       regions."""
+    if strings is None:
+        strings = {}
+
     num_ips_v4 = None
     ipsv4 = []
     if region_smt_ips:
@@ -92,11 +722,927 @@ def parse_region_info(
     if len(fingerprints) == 1 and len(fingerprints) != num_ips:
         fingerprints = [fingerprints[0]] * num_ips
 
-    region_info = [
-        (
+    region_info = tuple(
+        create_update_server((
             ipsv4[i], ipsv6[i], fqdns[i], registry_fqdns[i],
             fingerprints[i], region
-        ) for i in range(0, len(ipsv4))
-    ]
+        ), strings) for i in range(0, len(ipsv4))
+    )
 
     return region_info
+
+
+def parse_server_weights(region_smt_weights, num_servers):
+    """Return the weights of the update servers of a region as tuple of
+       floats. The weights are configured with the smt-server-weight option
+       as comma separated list in the order of the update servers or as
+       single weight of all update servers. An update server with weight 0
+       is returned after the update servers with a weight."""
+    weights = region_smt_weights.split(',')
+    if len(weights) > 1 and len(weights) != num_servers:
+        raise ValueError('Ambiguous update server weight and IP pairings')
+
+    if len(weights) == 1 and len(weights) != num_servers:
+        weights = [weights[0]] * num_servers
+
+    try:
+        weights = tuple(float(weight) for weight in weights)
+    except ValueError:
+        raise ValueError(
+            'Invalid update server weight in "%s"' % region_smt_weights
+        )
+    if not all(0 <= weight and math.isfinite(weight) for weight in weights):
+        raise ValueError('Update server weights must not be negative')
+    if not any(weights):
+        raise ValueError('Update server weights must not all be 0')
+
+    return weights
+
+
+def create_update_server(fields, strings):
+    """Return the UpdateServer record of the given fields, every string is
+       replaced by the equal string already in the strings dict, if any"""
+    return UpdateServer._make(
+        strings.setdefault(field, field) if field else field
+        for field in fields
+    )
+
+
+def flatten_ranges(ranges):
+    """Flatten (start, end, value) address ranges, as covered by CIDR
+       networks, into sorted, non-overlapping (start, end, value) intervals
+       with longest prefix match semantics: an address maps to the value of
+       the most specific range containing it. For duplicate ranges the last
+       value wins, adjacent intervals with the same value are merged."""
+    unique_ranges = {}
+    for start, end, value in ranges:
+        unique_ranges[(start, end)] = value
+
+    intervals = []
+
+    def add_interval(start, end, value):
+        if start > end:
+            return
+        if intervals and intervals[-1][1] + 1 == start and \
+                intervals[-1][2] == value:
+            intervals[-1] = (intervals[-1][0], end, value)
+        else:
+            intervals.append((start, end, value))
+
+    # CIDR ranges nest or are disjoint, sorting enclosing ranges before the
+    # ranges they contain allows a single pass with a stack of open ranges
+    open_ranges = []
+    position = 0
+    for (start, end), value in sorted(
+            unique_ranges.items(), key=lambda item: (item[0][0], -item[0][1])
+    ):
+        while open_ranges and open_ranges[-1][0] < start:
+            open_end, open_value = open_ranges.pop()
+            add_interval(position, open_end, open_value)
+            position = open_end + 1
+        if open_ranges:
+            add_interval(position, start - 1, open_ranges[-1][1])
+        open_ranges.append((end, value))
+        position = start
+    while open_ranges:
+        open_end, open_value = open_ranges.pop()
+        add_interval(position, open_end, open_value)
+        position = open_end + 1
+
+    return intervals
+
+
+def aggregate_ranges(ranges, bits):
+    """Aggregate (network, prefix length, value) ranges, network as integer,
+       into fewer ranges with the same longest prefix match result for every
+       address. Sibling networks with the same value are merged into their
+       parent network and networks with the same value as the closest
+       network enclosing them are dropped. For duplicate networks the last
+       value wins.
+
+       Returns the aggregated ranges sorted by network and the conflicts, a
+       list of (range, other range) pairs of the same network configured
+       with different values or of a network nested in the closest
+       enclosing network with a different value."""
+    networks = {}
+    conflicts = []
+    for network, prefix_len, value in ranges:
+        key = (network, prefix_len)
+        other_value = networks.get(key, value)
+        if other_value is not value:
+            conflicts.append((
+                (network, prefix_len, value),
+                (network, prefix_len, other_value)
+            ))
+        networks[key] = value
+
+    def nested(networks):
+        # Networks nest or are disjoint, sorted enclosing networks first
+        # the closest enclosing network is on top of a stack of open ones
+        open_networks = []
+        for network, prefix_len in sorted(networks):
+            end = network | ((1 << (bits - prefix_len)) - 1)
+            while open_networks and open_networks[-1][1] < network:
+                open_networks.pop()
+            enclosing = open_networks[-1] if open_networks else None
+            yield (network, prefix_len), enclosing
+            open_networks.append((network, end, prefix_len))
+
+    for key, enclosing in nested(networks):
+        if enclosing:
+            enclosing_key = (enclosing[0], enclosing[2])
+            if networks[enclosing_key] is not networks[key]:
+                conflicts.append((
+                    key + (networks[key],),
+                    enclosing_key + (networks[enclosing_key],)
+                ))
+
+    # Merge siblings level by level from the most specific networks, merged
+    # networks may in turn merge with their siblings. The parent network
+    # of two siblings is fully covered by them, a value configured for the
+    # parent network itself is never matched and is replaced.
+    levels = [dict() for _ in range(bits + 1)]
+    for (network, prefix_len), value in networks.items():
+        levels[prefix_len][network] = value
+    for prefix_len in range(bits, 0, -1):
+        level = levels[prefix_len]
+        sibling_bit = 1 << (bits - prefix_len)
+        for network in sorted(level):
+            if network & sibling_bit or network not in level:
+                continue
+            value = level[network]
+            if level.get(network | sibling_bit, None) is value:
+                del level[network]
+                del level[network | sibling_bit]
+                levels[prefix_len - 1][network] = value
+
+    # Drop networks with the same value as their closest enclosing network,
+    # a dropped network has the value of its own enclosing network, such
+    # that the networks nested in it can still compare against it
+    networks = {}
+    for prefix_len, level in enumerate(levels):
+        for network, value in level.items():
+            networks[(network, prefix_len)] = value
+    aggregated = []
+    for key, enclosing in nested(networks):
+        value = networks[key]
+        if enclosing and networks[(enclosing[0], enclosing[2])] is value:
+            continue
+        aggregated.append(key + (value,))
+
+    return aggregated, conflicts
+
+
+class IntervalRanges:
+    """Longest prefix match lookup on sorted, non-overlapping address
+       intervals as created by flatten_ranges(). Addresses are compared in
+       their packed, big endian form which orders like the integers they
+       encode. starts and ends are sequences of packed addresses, indices a
+       sequence of positions in values, the value of each interval."""
+
+    def __init__(self, bits, starts, ends, indices, values):
+        self._family = socket.AF_INET if bits == 32 else socket.AF_INET6
+        self._width = bits // 8
+        self._starts = starts
+        self._ends = ends
+        self._indices = indices
+        self._values = values
+
+    def __len__(self):
+        return len(self._starts)
+
+    def get(self, address):
+        """Return the value for the given packed or textual address"""
+        if isinstance(address, bytes):
+            key = address
+        else:
+            key = socket.inet_pton(self._family, address)
+        index = bisect.bisect_right(self._starts, key) - 1
+        if index < 0 or key > self._ends[index]:
+            return None
+        return self._values[self._indices[index]]
+
+    def intervals(self):
+        """Yield the (start, end, value) intervals with integer addresses"""
+        for index in range(len(self._starts)):
+            yield (
+                int.from_bytes(self._starts[index], 'big'),
+                int.from_bytes(self._ends[index], 'big'),
+                self._values[self._indices[index]]
+            )
+
+
+class PyTriciaEngine:
+    """Lookup engine storing the client IP ranges in PyTricia trees"""
+
+    @staticmethod
+    def create(bits):
+        return pytricia.PyTricia(bits)
+
+    @staticmethod
+    def finalize(ranges_map):
+        return ranges_map
+
+
+class BisectEngine:
+    """Pure Python lookup engine, the client IP ranges are flattened into
+       sorted, non-overlapping intervals searched with bisect"""
+
+    class Builder:
+        def __init__(self, bits):
+            self.bits = bits
+            self.ranges = []
+
+        def insert(self, prefix, value):
+            network = ipaddress.ip_network(prefix)
+            self.ranges.append((
+                int(network.network_address),
+                int(network.broadcast_address),
+                value
+            ))
+
+        def insert_network(self, network, prefix_len, value):
+            self.ranges.append((
+                network,
+                network | ((1 << (self.bits - prefix_len)) - 1),
+                value
+            ))
+
+    @staticmethod
+    def create(bits):
+        return BisectEngine.Builder(bits)
+
+    @staticmethod
+    def finalize(builder):
+        width = builder.bits // 8
+        values = []
+        value_index = {}
+        starts = []
+        ends = []
+        indices = array('I')
+        for start, end, value in flatten_ranges(builder.ranges):
+            if id(value) not in value_index:
+                value_index[id(value)] = len(values)
+                values.append(value)
+            starts.append(start.to_bytes(width, 'big'))
+            ends.append(end.to_bytes(width, 'big'))
+            indices.append(value_index[id(value)])
+
+        return IntervalRanges(builder.bits, starts, ends, indices, values)
+
+
+class RangesCollector:
+    """Collects the IP ranges inserted into it as (network, prefix length,
+       value), network as integer, for aggregate_ranges()"""
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.ranges = []
+
+    def insert(self, prefix, value):
+        network = ipaddress.ip_network(prefix)
+        self.ranges.append(
+            (int(network.network_address), network.prefixlen, value)
+        )
+
+    def insert_network(self, network, prefix_len, value):
+        self.ranges.append((network, prefix_len, value))
+
+
+LOOKUP_ENGINES = {
+    'pytricia': PyTriciaEngine,
+    'bisect': BisectEngine
+}
+
+
+def iter_ip_ranges(ip_ranges):
+    """Yield the ranges in a comma separated list of IP ranges without
+       creating a list of all ranges"""
+    for match in _IP_RANGE.finditer(ip_ranges):
+        yield match.group()
+
+
+def iter_ip_ranges_file(path):
+    """Yield the IP ranges in the given file line by line. A line holds one
+       or more comma separated ranges, # starts a comment."""
+    for _, ip_range in iter_numbered_ip_ranges_file(path):
+        yield ip_range
+
+
+def iter_numbered_ip_ranges_file(path):
+    """Yield the IP ranges in the given file as (line number, IP range),
+       see iter_ip_ranges_file()"""
+    with open(path) as ranges_file:
+        for line_number, line in enumerate(ranges_file, 1):
+            if '#' in line:
+                line = line.split('#', 1)[0]
+            if ',' in line:
+                for ip_range in iter_ip_ranges(line):
+                    yield line_number, ip_range
+                continue
+            line = line.strip()
+            if line:
+                yield line_number, line
+
+
+def insert_ip_ranges(ranges_map, ip_ranges, network_type, smt_info):
+    """Insert the given IP ranges of the region with the given update
+       server info into the ranges map, ranges that are not networks of the
+       network_type are logged and skipped"""
+    for ip_range in ip_ranges:
+        try:
+            network_type(ip_range)
+        except ValueError:
+            msg = 'Could not process %s range, improper format: %s'
+            logging.error(msg % (
+                'IPv4' if network_type is ipaddress.IPv4Network else 'IPv6',
+                ip_range
+            ))
+            continue
+
+        ranges_map.insert(ip_range, smt_info)
+
+
+def parse_network(ip_range, bits):
+    """Return the (network, prefix length) of the IP range in the address
+       family with the given number of address bits, network as integer.
+       Raises ValueError for ranges that are not networks of the family as
+       ipaddress.ip_network() does. The common network/prefix length form
+       is parsed with inet_pton, other forms with ipaddress."""
+    address, _, prefix_len = ip_range.partition('/')
+    if prefix_len.isdigit() and prefix_len.isascii():
+        try:
+            network = int.from_bytes(socket.inet_pton(
+                socket.AF_INET if bits == 32 else socket.AF_INET6, address
+            ), 'big')
+        except OSError:
+            pass
+        else:
+            prefix_len = int(prefix_len)
+            if prefix_len <= bits and \
+                    not network & ((1 << (bits - prefix_len)) - 1):
+                return network, prefix_len
+
+    network = (
+        ipaddress.IPv4Network if bits == 32 else ipaddress.IPv6Network
+    )(ip_range)
+    return int(network.network_address), network.prefixlen
+
+
+def parse_ip_ranges(ip_ranges, ranges_file, bits):
+    """Parse the comma separated IP ranges and the IP ranges in the optional
+       ranges file of the address family with the given number of address
+       bits, run in a process pool by insert_ip_ranges_parallel(). Returns
+       the networks in configuration order packed into bytes, their prefix
+       lengths as bytes, and the list of invalid ranges."""
+    width = bits // 8
+    networks = []
+    prefix_lens = array('B')
+    invalid = []
+    ip_ranges = iter_ip_ranges(ip_ranges or '')
+    if ranges_file:
+        ip_ranges = itertools.chain(
+            ip_ranges, iter_ip_ranges_file(ranges_file)
+        )
+    for ip_range in ip_ranges:
+        try:
+            network, prefix_len = parse_network(ip_range, bits)
+        except ValueError:
+            invalid.append(ip_range)
+            continue
+        networks.append(network.to_bytes(width, 'big'))
+        prefix_lens.append(prefix_len)
+
+    return b''.join(networks), prefix_lens.tobytes(), invalid
+
+
+def insert_packed_networks(ranges_map, packed_networks, prefix_lens, value):
+    """Insert the networks as returned by parse_ip_ranges() with the given
+       value into the ranges map"""
+    if not prefix_lens:
+        return
+    width = len(packed_networks) // len(prefix_lens)
+    if isinstance(ranges_map, pytricia.PyTricia):
+        for i, prefix_len in enumerate(prefix_lens):
+            ranges_map.insert(
+                packed_networks[i * width:(i + 1) * width], prefix_len, value
+            )
+        return
+    for i, prefix_len in enumerate(prefix_lens):
+        ranges_map.insert_network(
+            int.from_bytes(packed_networks[i * width:(i + 1) * width], 'big'),
+            prefix_len,
+            value
+        )
+
+
+def insert_ip_ranges_parallel(range_tasks, processes):
+    """Parse the IP ranges of the (ranges map, (IP ranges, ranges file,
+       bits), update server info, section) tasks in a pool of processes and
+       insert them into the ranges maps in task order, the ranges maps are
+       the same as with insert_ip_ranges() for every task in turn. The
+       workers are forked, the service may run in an embedded interpreter
+       that cannot be started as a new process. Forking a process running
+       other threads may deadlock the workers, call this only before the
+       process starts its threads."""
+    with concurrent.futures.ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('fork')
+    ) as executor:
+        futures = [
+            executor.submit(parse_ip_ranges, *task[1])
+            for task in range_tasks
+        ]
+        for (ranges_map, (_, _, bits), smt_info, section), future in zip(
+                range_tasks, futures
+        ):
+            try:
+                packed_networks, prefix_lens, invalid = future.result()
+            except OSError as e:
+                logging.error(
+                    'Could not read IP ranges in section "%s": %s'
+                    % (section, e)
+                )
+                sys.exit(1)
+            for ip_range in invalid:
+                logging.error(
+                    'Could not process %s range, improper format: %s' % (
+                        'IPv4' if bits == 32 else 'IPv6', ip_range
+                    )
+                )
+            insert_packed_networks(
+                ranges_map, packed_networks, prefix_lens, smt_info
+            )
+
+
+def format_network(network, prefix_len, bits):
+    """Return the network given as integer in CIDR notation"""
+    return '%s/%d' % (
+        socket.inet_ntop(
+            socket.AF_INET if bits == 32 else socket.AF_INET6,
+            network.to_bytes(bits // 8, 'big')
+        ),
+        prefix_len
+    )
+
+
+def create_aggregated_ranges_map(collector, lookup_engine):
+    """Aggregate the ranges in the given RangesCollector and insert them
+       into a tree of the given lookup engine, log the conflicts between
+       regions and the number of ranges saved"""
+    bits = collector.bits
+    label = 'IPv4' if bits == 32 else 'IPv6'
+
+    aggregated, conflicts = aggregate_ranges(collector.ranges, bits)
+    for (network, prefix_len, value), (
+            other_network, other_prefix_len, other_value
+    ) in conflicts:
+        logging.warning(
+            '%s range %s of region %s overlaps range %s of region %s' % (
+                label,
+                format_network(network, prefix_len, bits), value[0][5],
+                format_network(other_network, other_prefix_len, bits),
+                other_value[0][5]
+            )
+        )
+    ranges_map = lookup_engine.create(bits)
+    for network, prefix_len, value in aggregated:
+        ranges_map.insert(format_network(network, prefix_len, bits), value)
+    logging.info(
+        '%s ranges: %d configured, aggregated to %d, %d conflicts' % (
+            label, len(collector.ranges), len(aggregated), len(conflicts)
+        )
+    )
+    return ranges_map
+
+
+def get_source_files(conf):
+    """Return the configuration file followed by the IP range files it
+       references, in the order of RegionMap.source_files, without
+       building the region map"""
+    region_data_cfg = configparser.RawConfigParser()
+    with open(conf) as region_data:
+        region_data_cfg.read_file(region_data)
+    conf_dir = os.path.dirname(os.path.abspath(conf))
+    source_files = [conf]
+    for section in region_data_cfg.sections():
+        for file_option in ('public-ips-file', 'public-ipsv6-file'):
+            ranges_file = region_data_cfg.get(
+                section, file_option, fallback=None
+            )
+            if ranges_file:
+                source_files.append(os.path.join(conf_dir, ranges_file))
+
+    return tuple(source_files)
+
+
+def create_smt_region_map(
+        conf, engine='pytricia', aggregate=False, compress=False,
+        processes=1
+):
+    """Create the region map, a RegionMap containing:
+         ipv4_ranges_map, ipv6_ranges_map:
+             map all IP ranges to their respective update server info in a
+             tree structure of the given lookup engine, see LOOKUP_ENGINES
+         region_name_to_smt_data_map:
+             maps all region names to their respective update server info,
+             a tuple of UpdateServer records. The trees reference the same
+             tuple for every range of the region.
+         response_cache:
+             maps all region names to the pre-rendered update server info,
+             see create_response_cache()
+         response_caches:
+             maps all RESPONSE_FORMATS to the response cache of the format,
+             see create_response_caches()
+         compressed_responses:
+             with compress, maps all RESPONSE_ENCODINGS to the
+             pre-compressed responses of every format and region, see
+             create_compressed_responses()
+         response_etags:
+             maps all region names to the entity tag of their update server
+             info, see create_response_etags()
+         server_weights:
+             maps the region names with the smt-server-weight option to
+             the weights of their update servers, see
+             parse_server_weights()
+         region_aliases:
+             the RegionAliases of the regions, with the aliases configured
+             with the comma separated aliases option
+         source_files:
+             the configuration file and the files with IP ranges it
+             references with the public-ips-file and public-ipsv6-file
+             options. The ranges in these files are streamed into the
+             trees line by line.
+       With aggregate the IP ranges are collected first and aggregated
+       before they are inserted into the trees, see aggregate_ranges().
+       With more than one process the IP ranges of every section and
+       address family are parsed in a pool of that many processes and
+       inserted in configuration order, the region map is the same as
+       without, see insert_ip_ranges_parallel()."""
+    lookup_engine = LOOKUP_ENGINES[engine]
+    create_ranges_map = RangesCollector if aggregate else lookup_engine.create
+    ipv4_ranges_map = create_ranges_map(32)
+    ipv6_ranges_map = create_ranges_map(128)
+    region_name_to_smt_data_map = {}
+    region_data_cfg = configparser.RawConfigParser()
+    try:
+        parsed = region_data_cfg.read(conf)
+    except Exception as e:
+        logging.error('Could not parse configuration file %s.' % conf)
+        logging.error(str(e))
+        return
+    if not parsed:
+        logging.error('Error parsing config file: %s' % conf)
+        return
+
+    conf_dir = os.path.dirname(os.path.abspath(conf))
+    source_files = [conf]
+    strings = {}
+    server_weights = {}
+    configured_aliases = {}
+    range_tasks = []
+    for section in region_data_cfg.sections():
+        region_public_ip_ranges = region_data_cfg.get(
+            section, 'public-ips', fallback=''
+        )
+        region_public_ip_ranges_file = region_data_cfg.get(
+            section, 'public-ips-file', fallback=None
+        )
+        if not region_public_ip_ranges and not region_public_ip_ranges_file:
+            info_msg = 'public-ips data not configured in section %s.' % section
+            info_msg += ' No IPv4 address based fallback possible.'
+            logging.info(info_msg)
+        region_public_ipv6_ranges = region_data_cfg.get(
+            section, 'public-ipsv6', fallback=''
+        )
+        region_public_ipv6_ranges_file = region_data_cfg.get(
+            section, 'public-ipsv6-file', fallback=None
+        )
+        if not region_public_ipv6_ranges and \
+                not region_public_ipv6_ranges_file:
+            info_msg = 'public-ipsv6 data not configured in section '
+            info_msg += '%s. No IPv6 address based fallback possible.' % section
+            logging.info(info_msg)
+        try:
+            region_smt_ips = None
+            region_smt_ips = region_data_cfg.get(section, 'smt-server-ip')
+        except Exception:
+            info_msg = 'smt-server-ip data in section %s not ' % section
+            info_msg += 'configured. Update servers cannot be reached over IPv4'
+            logging.info(info_msg)
+        try:
+            region_smt_ipsv6 = None
+            region_smt_ipsv6 = region_data_cfg.get(section, 'smt-server-ipv6')
+        except Exception:
+            info_msg = 'smt-server-ipv6 data in section %s not ' % section
+            info_msg += 'configured. Update servers cannot be reached over IPv6'
+            logging.info(info_msg)
+        try:
+            region_smt_names = region_data_cfg.get(section, 'smt-server-name')
+        except Exception:
+            logging.error(
+                'Missing smt-server-name data in section %s.' % section
+            )
+            sys.exit(1)
+        try:
+            region_smt_registry_names = region_data_cfg.get(
+                section,
+                'smt-registry-name'
+            )
+        except Exception:
+            logging.info(
+                'Missing smt-registry-name data in section %s.' % section
+            )
+        try:
+            region_smt_cert_fingerprints = region_data_cfg.get(
+                section,
+                'smt-fingerprint'
+            )
+        except Exception:
+            logging.error(
+                'Missing smt-fingerprint data in section %s' % section
+            )
+            sys.exit(1)
+
+        if not region_smt_ips and not region_smt_ipsv6:
+            err_msg = 'Missing update server IPs for either protocol at '
+            err_msg += 'least one of smt-server-ip and smt-server-ipv6 '
+            err_msg += 'must be configured'
+            logging.error(err_msg)
+            sys.exit(1)
+
+        try:
+            smt_info = parse_region_info(
+                region_smt_ips,
+                region_smt_ipsv6,
+                region_smt_names,
+                region_smt_registry_names,
+                region_smt_cert_fingerprints,
+                section.lower(),
+                strings
+            )
+        except ValueError as e:
+            logging.error(
+                '%s in section "%s"' % (e, section)
+            )
+            sys.exit(1)
+
+        region_name_to_smt_data_map[section.lower()] = smt_info
+        aliases = [
+            alias.strip().lower() for alias in region_data_cfg.get(
+                section, 'aliases', fallback=''
+            ).split(',') if alias.strip()
+        ]
+        if aliases:
+            configured_aliases[section.lower()] = tuple(aliases)
+        region_smt_weights = region_data_cfg.get(
+            section, 'smt-server-weight', fallback=None
+        )
+        if region_smt_weights:
+            try:
+                server_weights[section.lower()] = parse_server_weights(
+                    region_smt_weights, len(smt_info)
+                )
+            except ValueError as e:
+                logging.error(
+                    '%s in section "%s"' % (e, section)
+                )
+                sys.exit(1)
+        if processes > 1:
+            for ranges_map, ip_ranges, ranges_file, bits in (
+                    (ipv4_ranges_map, region_public_ip_ranges,
+                     region_public_ip_ranges_file, 32),
+                    (ipv6_ranges_map, region_public_ipv6_ranges,
+                     region_public_ipv6_ranges_file, 128)
+            ):
+                if ranges_file:
+                    ranges_file = os.path.join(conf_dir, ranges_file)
+                    source_files.append(ranges_file)
+                if ip_ranges or ranges_file:
+                    range_tasks.append((
+                        ranges_map, (ip_ranges, ranges_file, bits),
+                        smt_info, section
+                    ))
+            continue
+        insert_ip_ranges(
+            ipv4_ranges_map,
+            iter_ip_ranges(region_public_ip_ranges),
+            ipaddress.IPv4Network,
+            smt_info
+        )
+        insert_ip_ranges(
+            ipv6_ranges_map,
+            iter_ip_ranges(region_public_ipv6_ranges),
+            ipaddress.IPv6Network,
+            smt_info
+        )
+        for ranges_map, ranges_file, network_type in (
+                (ipv4_ranges_map, region_public_ip_ranges_file,
+                 ipaddress.IPv4Network),
+                (ipv6_ranges_map, region_public_ipv6_ranges_file,
+                 ipaddress.IPv6Network)
+        ):
+            if not ranges_file:
+                continue
+            ranges_file = os.path.join(conf_dir, ranges_file)
+            source_files.append(ranges_file)
+            try:
+                insert_ip_ranges(
+                    ranges_map,
+                    iter_ip_ranges_file(ranges_file),
+                    network_type,
+                    smt_info
+                )
+            except OSError as e:
+                logging.error(
+                    'Could not read IP ranges in section "%s": %s'
+                    % (section, e)
+                )
+                sys.exit(1)
+
+    if range_tasks:
+        insert_ip_ranges_parallel(range_tasks, processes)
+
+    if aggregate:
+        ipv4_ranges_map = create_aggregated_ranges_map(
+            ipv4_ranges_map, lookup_engine
+        )
+        ipv6_ranges_map = create_aggregated_ranges_map(
+            ipv6_ranges_map, lookup_engine
+        )
+
+    try:
+        region_aliases = RegionAliases(
+            region_name_to_smt_data_map, configured_aliases
+        )
+    except ValueError as e:
+        logging.error(str(e))
+        sys.exit(1)
+
+    response_caches = create_response_caches(region_name_to_smt_data_map)
+    return RegionMap(
+        lookup_engine.finalize(ipv4_ranges_map),
+        lookup_engine.finalize(ipv6_ranges_map),
+        region_name_to_smt_data_map,
+        response_caches['xml'],
+        source_files=tuple(source_files),
+        response_etags=create_response_etags(response_caches['xml']),
+        response_caches=response_caches,
+        compressed_responses=create_compressed_responses(response_caches)
+        if compress else None,
+        server_weights=server_weights,
+        region_aliases=region_aliases
+    )
+
+
+class RegionMapReloader:
+    """Keep a region map current with its region data configuration file.
+
+       The map is rebuilt when the file, or an IP range file it references,
+       changes, detected by polling their modification time, inode, and
+       size every interval seconds, or when a reload is requested, for
+       example with SIGHUP. The new map is built in a background thread
+       and published by replacing the region_map attribute, readers take
+       a reference to the attribute once per request and never see a
+       partially built map. The loader is called with the configuration
+       file name and defaults to create_smt_region_map. With a
+       lookup_cache_size every loaded map gets a LookupCache of that size.
+       The optional prepare callable returns the map to publish for a
+       loaded map, for example with the weighted responses of the current
+       update server health, and is applied again to the published map by
+       refresh(). The time of the last successful load and its duration
+       in seconds are kept in last_load_time and last_load_duration."""
+
+    def __init__(
+            self, conf, interval=0, loader=None, lookup_cache_size=0,
+            prepare=None
+    ):
+        self.conf = conf
+        self.interval = interval
+        self.loader = loader or create_smt_region_map
+        self.lookup_cache_size = lookup_cache_size
+        self.prepare = prepare
+        self.region_map = None
+        self.last_load_time = None
+        self.last_load_duration = None
+        self._source_files = (conf,)
+        self._file_state = None
+        self._reload_requested = threading.Event()
+        self._publish_lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _get_file_state(source_files):
+        file_state = []
+        for source_file in source_files:
+            try:
+                stat = os.stat(source_file)
+            except OSError:
+                file_state.append(None)
+                continue
+            file_state.append((stat.st_mtime_ns, stat.st_ino, stat.st_size))
+        return tuple(file_state)
+
+    def load(self, loader=None):
+        """Build the region map from the configuration file, the current
+           map is kept if the configuration cannot be processed. The given
+           loader is used instead of the configured loader for this load
+           only, for example to parse the client IP ranges in a pool of
+           processes before the service starts its threads."""
+        file_state = self._get_file_state(self._source_files)
+        start = time.perf_counter()
+        try:
+            region_map = (loader or self.loader)(self.conf)
+        except SystemExit:
+            # create_smt_region_map exits on invalid region data
+            region_map = None
+        if not region_map:
+            if self.region_map:
+                logging.error(
+                    'Region data %s not reloaded, keeping current data'
+                    % self.conf
+                )
+            return False
+        if self.lookup_cache_size:
+            region_map = region_map._replace(
+                lookup_cache=LookupCache(self.lookup_cache_size)
+            )
+        # Also watch the IP range files referenced by the configuration
+        source_files = region_map.source_files or (self.conf,)
+        if source_files != self._source_files:
+            self._source_files = source_files
+            file_state = self._get_file_state(source_files)
+        self._file_state = file_state
+        self._publish(region_map)
+        self.last_load_time = time.time()
+        self.last_load_duration = time.perf_counter() - start
+        logging.info('Loaded region data from %s' % self.conf)
+        return True
+
+    def _publish(self, region_map):
+        # The lock keeps a refresh() from publishing a prepared copy of the
+        # replaced map
+        with self._publish_lock:
+            if self.prepare:
+                region_map = self.prepare(region_map)
+            self.region_map = region_map
+
+    def refresh(self):
+        """Apply prepare to the published region map again and publish the
+           result, when the state prepare depends on changed"""
+        with self._publish_lock:
+            if self.region_map is not None and self.prepare:
+                self.region_map = self.prepare(self.region_map)
+
+    def check(self):
+        """Reload the region map if the configuration file or the IP range
+           files it references changed"""
+        file_state = self._get_file_state(self._source_files)
+        if file_state[0] and file_state != self._file_state:
+            return self.load()
+        return False
+
+    def request_reload(self):
+        """Request a reload from the background thread, safe to call from
+           a signal handler"""
+        self._reload_requested.set()
+
+    def install_signal_handler(self, signum=signal.SIGHUP):
+        """Request a reload when the process receives the given signal,
+           returns False if the handler could not be installed"""
+        def handler(signum, frame):
+            self.request_reload()
+        try:
+            signal.signal(signum, handler)
+        except ValueError as e:
+            # Signal handlers can only be installed from the main thread
+            logging.error('Could not install reload signal handler: %s' % e)
+            return False
+        # mod_wsgi ignores the registration unless WSGIRestrictSignal Off
+        if signal.getsignal(signum) is not handler:
+            logging.error(
+                'Reload signal handler was not installed, with mod_wsgi '
+                'set WSGIRestrictSignal Off'
+            )
+            return False
+        return True
+
+    def start(self):
+        """Start the background thread watching for changes"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(
+            target=self._watch, name='region-map-reloader', daemon=True
+        )
+        self._thread.start()
+
+    def _watch(self):
+        while True:
+            requested = self._reload_requested.wait(self.interval or None)
+            self._reload_requested.clear()
+            try:
+                if requested:
+                    self.load()
+                else:
+                    self.check()
+            except Exception as e:
+                logging.error('Region data reload failed: %s' % e)
@@ -0,0 +1,50 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+# Decoder for the subset of CBOR the service produces: arrays, maps, and
+# text strings
+def decode(data):
+    value, offset = _decode(data, 0)
+    assert offset == len(data)
+    return value
+
+
+def _decode(data, offset):
+    major_type, info = data[offset] >> 5, data[offset] & 0x1f
+    offset += 1
+    if info < 24:
+        length = info
+    else:
+        size = {24: 1, 25: 2, 26: 4}[info]
+        length = int.from_bytes(data[offset:offset + size], 'big')
+        offset += size
+
+    if major_type == 3:
+        return data[offset:offset + length].decode('utf-8'), offset + length
+    if major_type == 4:
+        items = []
+        for _ in range(length):
+            item, offset = _decode(data, offset)
+            items.append(item)
+        return items, offset
+    if major_type == 5:
+        items = {}
+        for _ in range(length):
+            key, offset = _decode(data, offset)
+            items[key], offset = _decode(data, offset)
+        return items, offset
+    raise ValueError('Unsupported CBOR major type %d' % major_type)
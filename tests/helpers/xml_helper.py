@@ -32,7 +32,7 @@ def assert_xml_validity(smt_info_elems, region_data):
         ) for i in range(0, len(ipv4s))
     ]
 
-    region_data.sort(key=lambda tup: tup[0])
+    region_data = sorted(region_data, key=lambda tup: tup[0])
     xml_tuples.sort(key=lambda tup: tup[0])
 
     assert xml_tuples == region_data
@@ -37,14 +37,14 @@ def test_with_implicit_names_and_fps():
         'region': 'test'
     }
 
-    expected_output = [
+    expected_output = (
         ('10.10.10.10', None, 'example.susecloud.net',
          'registry_1.net','00:00:00:00', 'test'),
         ('20.20.20.20', None, 'example.susecloud.net',
          'registry_2.net', '00:00:00:00', 'test'),
         ('30.30.30.30', None, 'example.susecloud.net',
          'registry_3.net', '00:00:00:00', 'test')
-    ]
+    )
 
     output = region_srv.parse_region_info(*input.values())
 
@@ -61,12 +61,12 @@ def test_with_explicit_names_and_fps():
         'region': 'test'
     }
 
-    expected_output = [
+    expected_output = (
         ('10.10.10.10', None, 'one.susecloud.net',
          'registry_one.susecloud.net', '0a:0a:0a:0a', 'test'),
         ('20.20.20.20', None, 'two.susecloud.net',
          'registry_two.susecloud.net', '0b:0b:0b:0b', 'test')
-    ]
+    )
 
     output = region_srv.parse_region_info(*input.values())
 
@@ -83,12 +83,12 @@ def test_with_ipsv6():
         'region': 'test'
     }
 
-    expected_output = [
+    expected_output = (
         ('10.10.10.10', '::0001', 'one.susecloud.net',
          'registry_one.susecloud.net', '0a:0a:0a:0a', 'test'),
         ('20.20.20.20', '::0002', 'two.susecloud.net',
          'registry_two.susecloud.net', '0b:0b:0b:0b', 'test')
-    ]
+    )
 
     output = region_srv.parse_region_info(*input.values())
 
@@ -99,3 +99,18 @@ def test_with_unknown_ip():
 
     assert xml is None
 
+
+
+def test_with_ipv4_mapped_ipv6():
+    xml = region_srv.get_response_xml(
+        '::ffff:123.123.1.1',
+        None,
+        region_map,
+        ipv4_ranges_map,
+        ipv6_ranges_map
+    )
+
+    assert type(xml) is str
+
+    smt_info_elems = etree.fromstring(xml).findall('.//smtInfo')
+    xml_helper.assert_xml_validity(smt_info_elems, region_data)
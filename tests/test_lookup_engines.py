@@ -0,0 +1,171 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import ipaddress
+import os
+import random
+import sys
+import pytest
+import pytricia
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+
+import region_srv
+
+
+def random_prefixes(rng, bits, count):
+    """Random networks below a few common roots such that nesting and
+       duplicates are frequent"""
+    roots = [rng.getrandbits(bits) for _ in range(4)]
+    prefixes = []
+    for _ in range(count):
+        prefix_len = rng.randint(4, bits)
+        address = rng.choice(roots) ^ rng.getrandbits(bits - 4)
+        network = ipaddress.ip_network((address, prefix_len), strict=False)
+        prefixes.append(str(network))
+    return prefixes
+
+
+def random_addresses(rng, bits, prefixes):
+    """Random addresses, the boundaries of all networks and their
+       neighbours"""
+    addresses = [rng.getrandbits(bits) for _ in range(200)]
+    for prefix in prefixes:
+        network = ipaddress.ip_network(prefix)
+        for address in (
+                int(network.network_address) - 1,
+                int(network.network_address),
+                int(network.broadcast_address),
+                int(network.broadcast_address) + 1
+        ):
+            if 0 <= address < 2 ** bits:
+                addresses.append(address)
+    address_type = ipaddress.IPv4Address if bits == 32 else \
+        ipaddress.IPv6Address
+    return [str(address_type(address)) for address in addresses]
+
+
+@pytest.mark.parametrize('bits', [32, 128])
+@pytest.mark.parametrize('seed', range(20))
+def test_bisect_engine_matches_pytricia(bits, seed):
+    rng = random.Random(seed)
+    prefixes = random_prefixes(rng, bits, rng.randint(1, 60))
+    values = [['region-%d' % i] for i in range(5)]
+    prefix_values = [rng.choice(values) for _ in prefixes]
+
+    ranges_maps = {}
+    for name, engine in region_srv.LOOKUP_ENGINES.items():
+        ranges_map = engine.create(bits)
+        for prefix, value in zip(prefixes, prefix_values):
+            ranges_map.insert(prefix, value)
+        ranges_maps[name] = engine.finalize(ranges_map)
+
+    for address in random_addresses(rng, bits, prefixes):
+        assert ranges_maps['bisect'].get(address) is \
+            ranges_maps['pytricia'].get(address), address
+
+
+@pytest.mark.parametrize('bits', [32, 128])
+@pytest.mark.parametrize('seed', range(20))
+def test_aggregated_ranges_match_configured_ranges(bits, seed):
+    rng = random.Random(seed)
+    prefixes = random_prefixes(rng, bits, rng.randint(1, 60))
+    # Include the halves of some networks, they aggregate
+    for prefix in prefixes[:10]:
+        network = ipaddress.ip_network(prefix)
+        if network.prefixlen < bits:
+            prefixes.extend(str(half) for half in network.subnets())
+    values = [['region-%d' % i] for i in range(3)]
+    prefix_values = [rng.choice(values) for _ in prefixes]
+
+    configured = pytricia.PyTricia(bits)
+    collector = region_srv.RangesCollector(bits)
+    for prefix, value in zip(prefixes, prefix_values):
+        configured.insert(prefix, value)
+        collector.insert(prefix, value)
+    aggregated = region_srv.create_aggregated_ranges_map(
+        collector, region_srv.PyTriciaEngine
+    )
+
+    assert len(aggregated) <= len(configured)
+    for address in random_addresses(rng, bits, prefixes):
+        assert aggregated.get(address) is configured.get(address), address
+
+
+def test_create_smt_region_map_with_bisect_engine():
+    conf = os.path.join(config_path, 'regionData_client_ips.cfg')
+    region_map = region_srv.create_smt_region_map(conf, engine='bisect')
+
+    assert isinstance(region_map.ipv4_ranges_map, region_srv.IntervalRanges)
+    assert region_map.ipv4_ranges_map.get('10.2.0.1')[0][5] == 'region-1'
+    assert region_map.ipv6_ranges_map.get('2001:db8:2::1')[0][5] == \
+        'region-2'
+    assert region_map.ipv4_ranges_map.get('10.4.0.1') is None
+
+
+@pytest.mark.parametrize('engine', sorted(region_srv.LOOKUP_ENGINES))
+@pytest.mark.parametrize('aggregate', [False, True])
+def test_parallel_build_matches_serial_build(engine, aggregate, tmp_path):
+    rng = random.Random(0)
+    region_data = tmp_path / 'regionData.cfg'
+    prefixes = {}
+    with open(str(region_data), 'w') as region_data_file:
+        for region in range(1, 6):
+            prefixes[region] = {
+                bits: random_prefixes(rng, bits, 40) for bits in (32, 128)
+            }
+            ranges_file = tmp_path / ('region-%d.txt' % region)
+            ranges_file.write_text(
+                '\n'.join(prefixes[region][32][20:] + ['not-a-range'])
+            )
+            region_data_file.write(
+                '[region-%d]\n'
+                'public-ips = %s\n'
+                'public-ips-file = %s\n'
+                'public-ipsv6 = %s\n'
+                'smt-server-ip = 10.0.0.%d\n'
+                'smt-server-name = smt-%d.susecloud.net\n'
+                'smt-registry-name = registry-%d.susecloud.net\n'
+                'smt-fingerprint = aa:bb:cc\n\n' % (
+                    region, ','.join(prefixes[region][32][:20]),
+                    ranges_file.name, ','.join(prefixes[region][128]),
+                    region, region, region
+                )
+            )
+
+    serial = region_srv.create_smt_region_map(
+        str(region_data), engine, aggregate
+    )
+    parallel = region_srv.create_smt_region_map(
+        str(region_data), engine, aggregate, processes=3
+    )
+
+    assert parallel.source_files == serial.source_files
+    for bits, ranges_map in ((32, 'ipv4_ranges_map'),
+                             (128, 'ipv6_ranges_map')):
+        assert len(getattr(parallel, ranges_map)) == \
+            len(getattr(serial, ranges_map))
+        all_prefixes = [
+            prefix for region in prefixes for prefix in prefixes[region][bits]
+        ]
+        for address in random_addresses(rng, bits, all_prefixes):
+            assert getattr(parallel, ranges_map).get(address) == \
+                getattr(serial, ranges_map).get(address), address
@@ -0,0 +1,160 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+
+import region_check
+
+broken_region_data = '''[region-1]
+public-ips = 10.1.0.0/16,10.2.0.0/16,
+    10.1.0.0/16, 10.1.5.0/24
+    10.300.0.0/8
+public-ipsv6 = 2001:db8:1::/48
+smt-server-ip = 1.2.3.4,5.6.7.8
+smt-server-name = test-r1.susecloud.net
+smt-registry-name = registry-r1.susecloud.net
+smt-fingerprint = aa:bb:cc
+
+[Region-2]
+public-ips = 10.1.5.0/24, 10.3.0.1/16
+smt-server-ip = 10.20.30.40,1.2.3
+smt-server-name = a.susecloud.net,b.susecloud.net,c.susecloud.net
+smt-registry-name = registry-r2.susecloud.net
+smt-fingerprint = dd:ee:ff
+smt-fingerprint = dd:ee:ff
+
+[region-3]
+public-ipsv6-file = missing.txt
+smt-server-name = test-r3.susecloud.net
+smt-registry-name = registry-r3.susecloud.net
+smt-fingerprint = aa:bb:cc
+not an option
+'''
+
+
+def test_check_region_data():
+    result = region_check.check_region_data(
+        os.path.join(config_path, 'regionData_client_ips.cfg')
+    )
+
+    assert result.messages == []
+    assert result.statistics['regions'] == 2
+    assert result.statistics['update_servers'] == 4
+    assert result.statistics['ipv4_ranges'] == 3
+    assert result.statistics['ipv4_aggregated_ranges'] == 3
+    assert result.statistics['ipv6_ranges'] == 2
+    assert result.statistics['errors'] == 0
+
+
+def test_check_region_data_with_range_files():
+    result = region_check.check_region_data(
+        os.path.join(config_path, 'regionData_client_ips_files.cfg')
+    )
+
+    assert result.statistics['range_files'] == 2
+    assert [
+        (message.severity, message.path, message.line, message.section)
+        for message in result.messages
+    ] == [(
+        region_check.ERROR,
+        os.path.join(config_path, 'ranges', 'region-1-ipv4.txt'),
+        5,
+        'region-1'
+    )]
+
+
+def test_check_region_data_reports_every_problem(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    with open(region_data, 'w') as region_data_file:
+        region_data_file.write(broken_region_data)
+
+    result = region_check.check_region_data(region_data)
+
+    assert [
+        (message.severity, message.line, message.section)
+        for message in result.messages
+    ] == [
+        ('error', 24, None),
+        ('error', 17, 'Region-2'),
+        ('warning', 3, 'region-1'),
+        ('error', 4, 'region-1'),
+        ('error', 13, 'Region-2'),
+        ('error', 11, 'Region-2'),
+        ('error', 12, 'Region-2'),
+        ('error', 19, 'region-3'),
+        ('error', 20, 'region-3'),
+        ('warning', 12, 'Region-2'),
+        ('warning', 12, 'Region-2')
+    ]
+    assert result.messages[1].text == \
+        'Duplicate option smt-fingerprint, first defined in line 16'
+    assert result.messages[2].text == \
+        'Duplicate IPv4 range 10.1.0.0/16, also at %s:2' % region_data
+    assert result.messages[5].text == \
+        'Ambiguous update server name and IP pairings'
+    assert result.messages[7].text == \
+        'Missing smt-server-ip or smt-server-ipv6'
+    assert result.messages[10].text == (
+        'IPv4 range 10.1.5.0/24 of region region-2 overlaps range '
+        '10.1.0.0/16 of region region-1 at %s:2' % region_data
+    )
+    assert result.statistics['errors'] == 8
+    assert result.statistics['warnings'] == 3
+    assert result.statistics['duplicate_ranges'] == 1
+    assert result.statistics['overlapping_ranges'] == 2
+    assert region_check.format_message(result.messages[3]) == (
+        "%s:4: error: [region-1] Invalid IPv4 range: Octet 300 (> 255) "
+        "not permitted in '10.300.0.0'" % region_data
+    )
+
+
+def test_check_region_aliases(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    with open(region_data, 'w') as region_data_file:
+        for region, aliases in (
+                ('region-1', 'one, first'),
+                ('region-2', 'region-1'),
+                ('region-3', 'first')
+        ):
+            region_data_file.write('[%s]\n' % region)
+            region_data_file.write('aliases = %s\n' % aliases)
+            region_data_file.write('smt-server-ip = 1.2.3.4\n')
+            region_data_file.write('smt-server-name = smt.susecloud.net\n')
+            region_data_file.write(
+                'smt-registry-name = registry.susecloud.net\n'
+            )
+            region_data_file.write('smt-fingerprint = aa:bb:cc\n')
+
+    result = region_check.check_region_data(region_data)
+
+    assert [
+        (message.severity, message.line, message.section, message.text)
+        for message in result.messages
+    ] == [
+        ('error', 8, 'region-2', 'Alias region-1 is the name of region '
+         'region-1'),
+        ('error', 14, 'region-3', 'Alias first is also an alias of region '
+         'region-1')
+    ]
+    assert result.statistics['aliases'] == 2
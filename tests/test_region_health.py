@@ -0,0 +1,227 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import json
+import os
+import sys
+import pytest
+from lxml import etree
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+
+import region_health
+import region_srv
+
+region_2_data = (
+    ('10.20.30.40', None, 'test-r2-a.susecloud.net',
+     'registry-r2.susecloud.net', 'dd:ee:ff', 'region-2'),
+    ('50.60.70.80', None, 'test-r2-b.susecloud.net',
+     'registry-r2.susecloud.net', 'dd:ee:ff', 'region-2')
+)
+
+
+def get_region_map():
+    return region_srv.create_smt_region_map(
+        os.path.join(config_path, 'regionData_client_ips.cfg')
+    )
+
+
+def get_response(region_map, requester_ip, region_hint=None):
+    return region_srv.get_response_xml(
+        requester_ip,
+        region_hint,
+        region_map.region_name_to_smt_data_map,
+        region_map.ipv4_ranges_map,
+        region_map.ipv6_ranges_map,
+        region_map.response_cache
+    )
+
+
+def test_alias_table():
+    weights = (1.0, 3.0, 0.0, 4.0)
+    alias_table = region_health.AliasTable(weights)
+
+    # The probability of an index is its share of its own column and of
+    # the columns it is the alias of
+    probabilities = list(alias_table.probabilities)
+    for index, alias in enumerate(alias_table.aliases):
+        probabilities[alias] += 1 - alias_table.probabilities[index]
+    assert [
+        probability / len(weights) for probability in probabilities
+    ] == pytest.approx([weight / sum(weights) for weight in weights])
+    assert 2 not in set(alias_table.pick() for _ in range(1000))
+
+
+def get_first_servers(response_format, get_response):
+    first_servers = set()
+    for _ in range(100):
+        response = get_response()
+        if response_format == 'xml':
+            first_servers.add(etree.fromstring(response).find(
+                './/smtInfo'
+            ).attrib['SMTserverIP'])
+        else:
+            first_servers.add(json.loads(response)[0]['SMTserverIP'])
+    return first_servers
+
+
+def test_weighted_responses(tmp_path):
+    conf = tmp_path / 'regionData.cfg'
+    with open(conf, 'w') as region_data:
+        with open(
+                os.path.join(config_path, 'regionData_client_ips.cfg')
+        ) as template:
+            region_data.write(template.read())
+        region_data.write('smt-server-weight = 0,1\n')
+    region_map = region_srv.create_smt_region_map(str(conf), compress=True)
+
+    assert region_map.server_weights == {'region-2': (0.0, 1.0)}
+    weighted_responses = region_health.create_weighted_responses(region_map)
+    assert list(weighted_responses) == ['region-2']
+    assert weighted_responses['region-2'].responses['json'] == tuple(
+        json.dumps([
+            region_srv.get_smt_info_dict(update_server)
+            for update_server in rotation
+        ], separators=(',', ':')).encode('utf-8')
+        for rotation in (region_2_data[::-1],)
+    )
+
+    smt_server_data = region_map.region_name_to_smt_data_map['region-2']
+    assert get_first_servers('xml', lambda: get_response(
+        region_map, '10.3.0.1'
+    )) == {'10.20.30.40', '50.60.70.80'}
+    assert get_first_servers('xml', lambda: region_srv.get_response_xml(
+        '10.3.0.1', None, region_map.region_name_to_smt_data_map,
+        region_map.ipv4_ranges_map, region_map.ipv6_ranges_map,
+        region_map.response_cache, weighted_responses=weighted_responses
+    )) == {'50.60.70.80'}
+    assert get_first_servers(
+        'json', lambda: region_srv.get_smt_server_response(
+            smt_server_data, 'json', region_map.response_caches['json'],
+            weighted_responses
+        )
+    ) == {'50.60.70.80'}
+    assert get_first_servers('json', lambda: gzip.decompress(
+        region_srv.get_compressed_response(
+            smt_server_data, region_map.compressed_responses, 'gzip', 'json',
+            weighted_responses
+        )
+    )) == {'50.60.70.80'}
+
+    # Down update servers are never returned first, with all update
+    # servers down the order is uniformly random
+    weighted_responses = region_health.create_weighted_responses(
+        region_map, {'test-r1.susecloud.net': 0.5, '::2': 0.0}
+    )
+    assert sorted(weighted_responses) == ['region-1', 'region-2']
+    assert get_first_servers('xml', lambda: region_srv.get_smt_server_xml(
+        region_map.region_name_to_smt_data_map['region-1'],
+        region_map.response_cache, weighted_responses
+    )) == {'1.2.3.4'}
+    assert region_health.create_weighted_responses(
+        region_map, {'50.60.70.80': 0.0}
+    ) == {}
+
+
+def test_get_weighted_orders():
+    assert region_health.get_weighted_orders((1.0, 0.0, 2.0, 1.0)) == [
+        [0, 2, 3, 1], [2, 3, 0, 1], [3, 0, 2, 1]
+    ]
+    assert region_health.get_weighted_orders((0.0, 1.0, 0.0)) == [[1, 2, 0]]
+
+
+def test_down_update_server_returned_last(tmp_path):
+    conf = tmp_path / 'regionData.cfg'
+    with open(conf, 'w') as region_data:
+        region_data.write('[region-1]\n')
+        region_data.write('public-ips = 10.1.0.0/16\n')
+        region_data.write('smt-server-ip = 1.1.1.1,2.2.2.2,3.3.3.3\n')
+        region_data.write('smt-server-name = a.susecloud.net,'
+                          'b.susecloud.net,c.susecloud.net\n')
+        region_data.write('smt-registry-name = registry.susecloud.net\n')
+        region_data.write('smt-fingerprint = aa:bb:cc\n')
+    region_map = region_srv.create_smt_region_map(str(conf), compress=True)
+    smt_server_data = region_map.region_name_to_smt_data_map['region-1']
+    weighted_responses = region_health.create_weighted_responses(
+        region_map, {'2.2.2.2': 0.0}
+    )
+
+    orders = set()
+    for _ in range(100):
+        for response in (
+                region_srv.get_smt_server_response(
+                    smt_server_data, 'json',
+                    region_map.response_caches['json'], weighted_responses
+                ),
+                gzip.decompress(region_srv.get_compressed_response(
+                    smt_server_data, region_map.compressed_responses,
+                    'gzip', 'json', weighted_responses
+                ))
+        ):
+            orders.add(tuple(
+                smt_info['SMTserverIP'] for smt_info in json.loads(response)
+            ))
+    assert orders == {
+        ('1.1.1.1', '3.3.3.3', '2.2.2.2'), ('3.3.3.3', '1.1.1.1', '2.2.2.2')
+    }
+
+
+def test_update_server_health(tmp_path, caplog):
+    health_file = tmp_path / 'health'
+    with open(health_file, 'w') as health:
+        health.write('# Update server health\n')
+        health.write('1.2.3.4 down\n')
+        health.write('test-r2-a.susecloud.net 0.25\n')
+        health.write('50.60.70.80 UP\n')
+        health.write('5.6.7.8 sick\n')
+        health.write('\n')
+
+    assert region_health.read_health_file(str(health_file)) == {
+        '1.2.3.4': 0.0,
+        'test-r2-a.susecloud.net': 0.25,
+        '50.60.70.80': 1.0
+    }
+    assert 'Invalid health state in line 5' in caplog.text
+
+    changes = []
+    server_health = region_health.UpdateServerHealth(
+        str(health_file), on_change=lambda: changes.append(True)
+    )
+    assert server_health.load()
+    assert not server_health.check()
+    assert changes == [True]
+    region_map = get_region_map()
+    weighted_region_map = server_health.apply(region_map)
+    assert sorted(weighted_region_map.weighted_responses) == \
+        ['region-1', 'region-2']
+    assert weighted_region_map.ipv4_ranges_map is region_map.ipv4_ranges_map
+
+    with open(health_file, 'w') as health:
+        health.write('1.2.3.4 up\n')
+    os.utime(health_file, ns=(0, 0))
+    assert server_health.check()
+    assert changes == [True, True]
+    assert server_health.apply(region_map).weighted_responses == {}
+
+    os.remove(health_file)
+    assert not server_health.load()
+    assert server_health.health == {'1.2.3.4': 1.0}
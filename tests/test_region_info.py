@@ -0,0 +1,532 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import importlib
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+import pytest
+from lxml import etree
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'helpers'))
+
+import region_log
+import region_profile
+import region_srv
+from helpers import xml_helper
+
+
+def load_region_info(tmp_path, **server_options):
+    """Load the service with a regionInfo.cfg containing the given options
+       in the [server] section"""
+    server_options.setdefault('logFile', str(tmp_path / 'regionInfo.log'))
+    server_options.setdefault(
+        'regionConfig', os.path.join(config_path, 'regionData_client_ips.cfg')
+    )
+    region_info_cfg = tmp_path / 'regionInfo.cfg'
+    with open(region_info_cfg, 'w') as cfg:
+        cfg.write('[server]\n')
+        for option, value in server_options.items():
+            cfg.write('%s = %s\n' % (option, value))
+
+    # The service configures the root logger when loaded
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+
+    argv = sys.argv
+    sys.argv = ['regionInfo.py', '-f', str(region_info_cfg)]
+    try:
+        if 'regionInfo' in sys.modules:
+            return importlib.reload(sys.modules['regionInfo'])
+        return importlib.import_module('regionInfo')
+    finally:
+        sys.argv = argv
+
+
+def read_log(tmp_path):
+    logging.shutdown()
+    with open(tmp_path / 'regionInfo.log') as log:
+        return log.read()
+
+
+def request(region_info, query='', requester_ip='10.1.1.1', **kwargs):
+    return region_info.app.test_client().get(
+        '/regionInfo%s' % query,
+        environ_base={'REMOTE_ADDR': requester_ip},
+        **kwargs
+    )
+
+
+def test_region_info_with_known_ip(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    response = request(region_info)
+
+    assert response.status_code == 200
+    smt_info_elems = etree.fromstring(response.data).findall('.//smtInfo')
+    assert [elem.attrib['region'] for elem in smt_info_elems] == \
+        ['region-1', 'region-1']
+    assert 'Provided: <regionSMTdata>' in read_log(tmp_path)
+
+
+def test_region_info_with_region_hint(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    response = request(region_info, '?regionHint=Region-2', '1.1.1.1')
+
+    assert response.status_code == 200
+    smt_info_elems = etree.fromstring(response.data).findall('.//smtInfo')
+    assert set(elem.attrib['region'] for elem in smt_info_elems) == \
+        {'region-2'}
+
+
+def test_region_info_not_found(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    response = request(region_info, requester_ip='1.1.1.1')
+
+    assert response.status_code == 404
+    assert '\tDenied' in read_log(tmp_path)
+
+
+def test_access_log_format(tmp_path):
+    region_info = load_region_info(tmp_path, logFormat='access')
+
+    request(region_info, '?regionHint=region-2')
+    request(region_info, requester_ip='1.1.1.1')
+
+    log_lines = read_log(tmp_path).splitlines()
+    assert log_lines[-2].split(':', 3)[-1].split()[:4] == \
+        ['10.1.1.1', 'region-2', 'region-2', '200']
+    assert log_lines[-1].split(':', 3)[-1].split()[:4] == \
+        ['1.1.1.1', '-', '-', '404']
+    assert 'Provided' not in '\n'.join(log_lines)
+
+
+def test_async_logging(tmp_path):
+    region_info = load_region_info(tmp_path, logMode='async')
+
+    for _ in range(10):
+        request(region_info)
+
+    # Records are written by the listener thread
+    end = time.monotonic() + 5
+    while read_log(tmp_path).count('Provided: <regionSMTdata>') < 10 and \
+            time.monotonic() < end:
+        time.sleep(0.01)
+    assert read_log(tmp_path).count('Provided: <regionSMTdata>') == 10
+
+
+def test_async_logging_starts_after_parallel_build(tmp_path, monkeypatch):
+    events = []
+    start_listener = region_log.QueueListener.start
+    insert_ip_ranges_parallel = region_srv.insert_ip_ranges_parallel
+
+    def start(listener):
+        events.append('listener')
+        start_listener(listener)
+
+    def insert_parallel(*args):
+        events.append('fork')
+        insert_ip_ranges_parallel(*args)
+
+    monkeypatch.setattr(region_log.QueueListener, 'start', start)
+    monkeypatch.setattr(
+        region_srv, 'insert_ip_ranges_parallel', insert_parallel
+    )
+    load_region_info(tmp_path, logMode='async', buildProcesses=2)
+
+    assert events == ['fork', 'listener']
+    assert 'Loaded region data' in read_log(tmp_path)
+
+
+def batch_request(region_info, data, content_type='text/plain'):
+    return region_info.app.test_client().post(
+        '/regionInfo/batch',
+        data=data,
+        content_type=content_type,
+        environ_base={'REMOTE_ADDR': '10.1.1.1'}
+    )
+
+
+def test_shared_region_map_watches_snapshot(tmp_path):
+    region_info = load_region_info(
+        tmp_path, sharedRegionMap='true',
+        regionSnapshot=str(tmp_path / 'regionData.snap')
+    )
+
+    assert region_info.region_map_reloader.interval == 10
+    assert region_info.region_map_reloader._thread is not None
+    assert str(tmp_path / 'regionData.snap') in \
+        region_info.region_map_reloader.region_map.source_files
+
+    with pytest.raises(SystemExit):
+        load_region_info(
+            tmp_path, sharedRegionMap='true', reloadInterval=0,
+            regionSnapshot=str(tmp_path / 'regionData.snap')
+        )
+    assert 'sharedRegionMap requires reloadInterval' in read_log(tmp_path)
+
+
+def test_batch_disabled(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    assert batch_request(region_info, '10.1.1.1').status_code == 404
+
+
+def test_batch_newline_delimited(tmp_path):
+    region_info = load_region_info(tmp_path, batchMaxQueries=10)
+
+    response = batch_request(
+        region_info, '10.1.1.1\nregion-2\n\n1.1.1.1 Region-1\n1.1.1.1\n'
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    results = [json.loads(line) for line in response.data.splitlines()]
+    assert [result['status'] for result in results] == [200, 200, 200, 404]
+    assert [result.get('region') for result in results] == \
+        ['region-1', 'region-2', 'region-1', None]
+    assert results[2]['regionHint'] == 'region-1'
+    assert results[0]['servers'][0] == {
+        'SMTserverIP': '1.2.3.4',
+        'SMTserverIPv6': '::1',
+        'SMTserverName': 'test-r1.susecloud.net',
+        'SMTregistryName': 'registry-r1.susecloud.net',
+        'fingerprint': 'aa:bb:cc',
+        'region': 'region-1'
+    }
+
+
+def test_batch_json(tmp_path):
+    region_info = load_region_info(tmp_path, batchMaxQueries=10)
+
+    response = batch_request(
+        region_info,
+        json.dumps([
+            {'ip': '2001:db8:2::1'},
+            {'regionHint': 'unknown', 'ip': '10.2.0.1'},
+            {'ip': 'not-an-ip'}
+        ]),
+        'application/json'
+    )
+
+    results = [json.loads(line) for line in response.data.splitlines()]
+    assert [result['status'] for result in results] == [200, 200, 400]
+    assert [result.get('region') for result in results] == \
+        ['region-2', 'region-1', None]
+
+
+def test_batch_limits(tmp_path):
+    region_info = load_region_info(tmp_path, batchMaxQueries=2)
+
+    assert batch_request(
+        region_info, '10.1.1.1\n10.1.1.2\n10.1.1.3'
+    ).status_code == 413
+    assert batch_request(region_info, 'x' * 1000).status_code == 413
+    assert batch_request(
+        region_info, '{"ip": "10.1.1.1"}', 'application/json'
+    ).status_code == 400
+
+
+def test_batch_rate_limit(tmp_path):
+    region_info = load_region_info(
+        tmp_path, batchMaxQueries=10, rateLimit='0.001', rateLimitBurst=3
+    )
+
+    # Every query takes a token, a batch larger than the burst never fits
+    assert batch_request(region_info, '10.1.1.1\n' * 4).status_code == 413
+    assert batch_request(region_info, '10.1.1.1\n10.1.1.2').status_code == \
+        200
+    assert batch_request(region_info, '10.1.1.1\n10.1.1.2').status_code == \
+        429
+    assert request(region_info).status_code == 429
+
+
+def get_metrics(region_info):
+    response = region_info.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics(tmp_path):
+    region_info = load_region_info(
+        tmp_path, metrics='true', lookupCacheSize=10
+    )
+
+    request(region_info, '?regionHint=region-2')
+    request(region_info)
+    request(region_info)
+    request(region_info, requester_ip='2001:db8:2::1')
+    request(region_info, requester_ip='1.1.1.1')
+
+    samples = get_metrics(region_info)
+    assert samples['regionsrv_requests_total{outcome="hint_hit"}'] == 1
+    assert samples['regionsrv_requests_total{outcome="ipv4_hit"}'] == 2
+    assert samples['regionsrv_requests_total{outcome="ipv6_hit"}'] == 1
+    assert samples['regionsrv_requests_total{outcome="not_found"}'] == 1
+    assert samples['regionsrv_lookup_duration_seconds_count'] == 5
+    assert samples['regionsrv_lookup_duration_seconds_bucket{le="+Inf"}'] \
+        == 5
+    assert samples['regionsrv_render_duration_seconds_count'] == 4
+    assert samples['regionsrv_prefixes{family="ipv4"}'] == 3
+    assert samples['regionsrv_prefixes{family="ipv6"}'] == 2
+    assert samples['regionsrv_regions'] == 2
+    assert samples['regionsrv_region_map_load_timestamp_seconds'] > 0
+    assert samples['regionsrv_lookup_cache_hits_total'] == 1
+    assert samples['regionsrv_lookup_cache_misses_total'] == 3
+
+
+def test_rate_limit(tmp_path):
+    region_info = load_region_info(
+        tmp_path, metrics='true', rateLimit='0.5', rateLimitBurst=2,
+        rateLimitIPv4Prefix=24, logFormat='access'
+    )
+
+    assert request(region_info).status_code == 200
+    assert request(region_info, requester_ip='10.1.1.2').status_code == 200
+    response = request(region_info, '?regionHint=region-2')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert request(region_info, requester_ip='10.1.2.1').status_code == 200
+
+    samples = get_metrics(region_info)
+    assert samples['regionsrv_rate_limited_total'] == 1
+    assert samples['regionsrv_rate_limiter_clients'] == 2
+    assert samples['regionsrv_requests_total{outcome="ipv4_hit"}'] == 3
+    assert '10.1.1.1 region-2 - 429 ' in read_log(tmp_path)
+
+
+@pytest.mark.parametrize('option', ['rateLimitBurst', 'rateLimitClients'])
+def test_rate_limit_invalid_size(tmp_path, option):
+    with pytest.raises(SystemExit):
+        load_region_info(tmp_path, rateLimit='1', **{option: 0})
+    assert 'rateLimitBurst and rateLimitClients must be at least 1' in \
+        read_log(tmp_path)
+
+
+def test_region_hint_alias(tmp_path):
+    region_info = load_region_info(tmp_path, metrics='true', cacheMaxAge=60)
+
+    response = request(region_info, '?regionHint=Region-2B', '1.1.1.1')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    xml_helper.assert_xml_validity(
+        etree.fromstring(response.data).findall('.//smtInfo'),
+        [
+            ('10.20.30.40', None, 'test-r2-a.susecloud.net',
+             'registry-r2.susecloud.net', 'dd:ee:ff', 'region-2'),
+            ('50.60.70.80', None, 'test-r2-b.susecloud.net',
+             'registry-r2.susecloud.net', 'dd:ee:ff', 'region-2')
+        ]
+    )
+
+    samples = get_metrics(region_info)
+    assert samples['regionsrv_requests_total{outcome="hint_hit"}'] == 1
+    assert samples[
+        'regionsrv_region_alias_hits_total'
+        '{alias="region-2b",region="region-2"}'
+    ] == 1
+
+
+def test_request_timing(tmp_path):
+    region_info = load_region_info(
+        tmp_path, requestTiming='true', logFormat='access'
+    )
+
+    for requester_ip, status in (('10.1.1.1', 200), ('1.1.1.1', 404)):
+        response = request(region_info, requester_ip=requester_ip)
+        assert response.status_code == status
+        timings = [
+            timing.split(';dur=')
+            for timing in response.headers['Server-Timing'].split(', ')
+        ]
+        assert [stage for stage, _ in timings] == [
+            'route', 'parse', 'lookup', 'render', 'log'
+        ]
+        assert all(float(duration) >= 0 for _, duration in timings)
+    assert ' route=' in read_log(tmp_path)
+    assert ' log=' not in read_log(tmp_path)
+
+    region_info = load_region_info(
+        tmp_path, requestTiming='true', rateLimit='100'
+    )
+    response = request(region_info)
+    assert [
+        timing.split(';')[0]
+        for timing in response.headers['Server-Timing'].split(', ')
+    ] == ['route', 'limit', 'parse', 'lookup', 'render', 'log']
+
+
+def test_request_timing_disabled(tmp_path):
+    region_info = load_region_info(tmp_path, logFormat='access')
+
+    assert 'Server-Timing' not in request(region_info).headers
+    assert ' route=' not in read_log(tmp_path)
+
+
+def test_request_profiler(tmp_path):
+    profile_file = tmp_path / 'regionInfo.prof'
+    region_info = load_region_info(
+        tmp_path, profileSampleRate=2, profileFile=profile_file
+    )
+
+    for _ in range(5):
+        assert request(region_info).status_code == 200
+    assert region_info.request_profiler.samples == 3
+
+    with open('%s.trigger' % profile_file, 'w'):
+        pass
+    for _ in range(100):
+        if os.path.exists(profile_file):
+            break
+        time.sleep(0.05)
+    stats = pstats.Stats(str(profile_file))
+    assert any(
+        function == 'get_region_info' for _, _, function in stats.stats
+    )
+
+
+def test_request_profiler_trigger(tmp_path):
+    profile_file = tmp_path / 'regionInfo.prof'
+    trigger = tmp_path / 'trigger'
+    request_profiler = region_profile.RequestProfiler(
+        1, str(profile_file), str(trigger)
+    )
+    request_profiler.runcall(len, 'abc')
+
+    assert not request_profiler.check()
+    trigger.write_text('')
+    assert request_profiler.check()
+    assert os.path.exists(profile_file)
+    assert not request_profiler.check()
+    os.utime(trigger, ns=(0, 0))
+    assert request_profiler.check()
+    os.remove(trigger)
+    assert not request_profiler.check()
+
+
+def test_request_profiler_warns_all_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(region_profile, 'PROFILES_ALL_THREADS', True)
+    load_region_info(tmp_path, profileSampleRate=2)
+
+    assert 'this Python profiles all threads' in read_log(tmp_path)
+
+
+def test_metrics_disabled(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    assert region_info.app.test_client().get('/metrics').status_code == 404
+
+
+def test_etag(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    responses = [request(region_info) for _ in range(10)]
+    etags = set(response.headers['ETag'] for response in responses)
+    # The tag does not depend on the order of the update servers
+    assert len(etags) == 1
+    assert 'Cache-Control' not in responses[0].headers
+
+    etag = etags.pop()
+    response = request(region_info, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert '\tNot modified' in read_log(tmp_path)
+
+    response = request(
+        region_info, '?regionHint=region-2', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_cache_control(tmp_path):
+    region_info = load_region_info(tmp_path, cacheMaxAge=300)
+
+    response = request(region_info, '?regionHint=region-2')
+    assert response.headers['Cache-Control'] == 'public, max-age=300'
+
+    response = request(region_info)
+    assert response.headers['Cache-Control'] == 'private, max-age=300'
+
+    response = request(region_info, requester_ip='1.1.1.1')
+    assert response.status_code == 404
+    assert 'Cache-Control' not in response.headers
+
+
+def test_response_format(tmp_path):
+    region_info = load_region_info(tmp_path)
+
+    response = request(
+        region_info, headers={'Accept': 'application/json'}
+    )
+    assert response.headers['Content-Type'] == 'application/json'
+    assert set(smt_info['region'] for smt_info in response.json) == \
+        {'region-1'}
+    assert response.headers['ETag'].endswith('-json"')
+    assert response.headers['Vary'] == 'Accept'
+
+    response = request(region_info, '?format=cbor')
+    assert response.headers['Content-Type'] == 'application/cbor'
+    assert response.headers['ETag'].endswith('-cbor"')
+
+    for accept in ('*/*', 'text/html', 'text/xml, application/json;q=0.5'):
+        response = request(region_info, headers={'Accept': accept})
+        assert etree.fromstring(response.data).tag == 'regionSMTdata'
+
+    assert request(region_info, '?format=yaml').status_code == 400
+
+
+def test_precompressed_responses(tmp_path):
+    region_info = load_region_info(tmp_path, precompressResponses='true')
+
+    response = request(region_info, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept, Accept-Encoding'
+    assert response.headers['ETag'].endswith('-gzip"')
+    smt_info_elems = etree.fromstring(
+        gzip.decompress(response.data)
+    ).findall('.//smtInfo')
+    assert [elem.attrib['region'] for elem in smt_info_elems] == \
+        ['region-1', 'region-1']
+
+    response = request(region_info, headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+    })
+    assert response.status_code == 304
+
+    response = request(region_info, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert etree.fromstring(response.data).tag == 'regionSMTdata'
@@ -0,0 +1,135 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import importlib
+import json
+import os
+import sys
+from lxml import etree
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+
+sys.path.insert(0, code_path)
+
+from test_region_info import load_region_info, read_log
+
+
+def load_application(tmp_path, **server_options):
+    """Load the service with the given options and return the ASGI
+       application, the ASGI module uses the loaded service module"""
+    load_region_info(tmp_path, **server_options)
+    return importlib.import_module('regionInfo_asgi').application
+
+
+def asgi_request(application, method, path, query='', headers=(),
+                 body=b'', requester_ip='10.1.1.1'):
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query.encode('latin-1'),
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ],
+        'client': (requester_ip, 12345)
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    response_headers = dict(
+        (name.decode('latin-1').lower(), value.decode('latin-1'))
+        for name, value in messages[0]['headers']
+    )
+    return (
+        messages[0]['status'],
+        response_headers,
+        b''.join(message.get('body', b'') for message in messages[1:])
+    )
+
+
+def test_region_info(tmp_path):
+    application = load_application(tmp_path)
+
+    status, headers, body = asgi_request(application, 'GET', '/regionInfo')
+    assert status == 200
+    smt_info_elems = etree.fromstring(body).findall('.//smtInfo')
+    assert [elem.attrib['region'] for elem in smt_info_elems] == \
+        ['region-1', 'region-1']
+    assert 'Provided: <regionSMTdata>' in read_log(tmp_path)
+
+    status, headers, body = asgi_request(
+        application, 'GET', '/regionInfo', 'regionHint=Region-2',
+        [('Accept', 'application/json')]
+    )
+    assert headers['content-type'] == 'application/json'
+    assert set(smt_info['region'] for smt_info in json.loads(body)) == \
+        {'region-2'}
+
+    status, _, _ = asgi_request(
+        application, 'GET', '/regionInfo', headers=[
+            ('If-None-Match', headers['etag'])
+        ], requester_ip='1.1.1.1'
+    )
+    assert status == 404
+
+
+def test_region_info_not_modified(tmp_path):
+    application = load_application(tmp_path)
+
+    _, headers, _ = asgi_request(application, 'GET', '/regionInfo')
+    status, _, body = asgi_request(
+        application, 'GET', '/regionInfo',
+        headers=[('If-None-Match', headers['etag'])]
+    )
+    assert (status, body) == (304, b'')
+
+
+def test_batch(tmp_path):
+    application = load_application(tmp_path, batchMaxQueries=2)
+
+    status, headers, body = asgi_request(
+        application, 'POST', '/regionInfo/batch',
+        headers=[('Content-Type', 'text/plain; charset=utf-8')],
+        body=b'10.1.1.1\nregion-2\n'
+    )
+    assert status == 200
+    assert headers['content-type'] == 'application/x-ndjson'
+    assert [
+        json.loads(line)['region'] for line in body.splitlines()
+    ] == ['region-1', 'region-2']
+
+    status, _, _ = asgi_request(
+        application, 'POST', '/regionInfo/batch', body=b'x\n' * 1000
+    )
+    assert status == 413
+
+
+def test_routes(tmp_path):
+    application = load_application(tmp_path)
+
+    assert asgi_request(application, 'GET', '/metrics')[0] == 404
+    assert asgi_request(application, 'GET', '/other')[0] == 404
+    assert asgi_request(application, 'POST', '/regionInfo')[0] == 405
@@ -0,0 +1,525 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import ipaddress
+import json
+import os
+import sys
+import pytest
+from lxml import etree
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'helpers'))
+
+import region_srv
+from helpers import cbor_helper, xml_helper
+
+region_1_data = (
+    ('1.2.3.4', '::1', 'test-r1.susecloud.net', 'registry-r1.susecloud.net',
+     'aa:bb:cc', 'region-1'),
+    ('5.6.7.8', '::2', 'test-r1.susecloud.net', 'registry-r1.susecloud.net',
+     'aa:bb:cc', 'region-1')
+)
+
+region_2_data = (
+    ('10.20.30.40', None, 'test-r2-a.susecloud.net',
+     'registry-r2.susecloud.net', 'dd:ee:ff', 'region-2'),
+    ('50.60.70.80', None, 'test-r2-b.susecloud.net',
+     'registry-r2.susecloud.net', 'dd:ee:ff', 'region-2')
+)
+
+
+def get_region_map():
+    return region_srv.create_smt_region_map(
+        os.path.join(config_path, 'regionData_client_ips.cfg')
+    )
+
+
+def get_response(region_map, requester_ip, region_hint=None):
+    return region_srv.get_response_xml(
+        requester_ip,
+        region_hint,
+        region_map.region_name_to_smt_data_map,
+        region_map.ipv4_ranges_map,
+        region_map.ipv6_ranges_map,
+        region_map.response_cache
+    )
+
+
+def test_create_smt_region_map():
+    region_map = get_region_map()
+
+    assert region_map.region_name_to_smt_data_map == {
+        'region-1': region_1_data,
+        'region-2': region_2_data
+    }
+    assert region_map.ipv4_ranges_map.get('10.2.3.4') == region_1_data
+    assert region_map.ipv4_ranges_map.get('10.3.3.4') == region_2_data
+    assert region_map.ipv6_ranges_map.get('2001:db8:2::1') == region_2_data
+    assert sorted(region_map.response_cache.keys()) == [
+        'region-1', 'region-2'
+    ]
+
+
+def test_response_cache_with_region_hint():
+    xml = get_response(get_region_map(), '0.0.0.0', 'region-2')
+
+    assert type(xml) is bytes
+
+    smt_info_elems = etree.fromstring(xml).findall('.//smtInfo')
+    xml_helper.assert_xml_validity(smt_info_elems, region_2_data)
+
+
+def test_response_cache_with_known_ip():
+    xml = get_response(get_region_map(), '2001:db8:1::1')
+
+    assert type(xml) is bytes
+
+    smt_info_elems = etree.fromstring(xml).findall('.//smtInfo')
+    xml_helper.assert_xml_validity(smt_info_elems, region_1_data)
+
+
+def test_response_cache_matches_uncached_rendering():
+    region_map = get_region_map()
+    cached = get_response(region_map, '10.1.1.1')
+    uncached = region_srv.get_response_xml(
+        '10.1.1.1',
+        None,
+        region_map.region_name_to_smt_data_map,
+        region_map.ipv4_ranges_map,
+        region_map.ipv6_ranges_map
+    )
+
+    assert sorted(cached.decode('utf-8').splitlines()) == \
+        sorted(uncached.splitlines())
+
+
+def test_response_cache_with_unknown_ip():
+    assert get_response(get_region_map(), '1.1.1.1') is None
+
+
+def test_response_etags():
+    region_map = get_region_map()
+    response_etags = region_map.response_etags
+
+    assert sorted(response_etags) == ['region-1', 'region-2']
+    assert response_etags['region-1'] != response_etags['region-2']
+    assert region_srv.create_response_etags({
+        'region-1': tuple(reversed(region_map.response_cache['region-1']))
+    })['region-1'] == response_etags['region-1']
+    assert region_srv.create_response_etags({
+        'region-1': region_map.response_cache['region-1'][:1]
+    })['region-1'] != response_etags['region-1']
+
+
+def test_response_formats():
+    region_map = get_region_map()
+    smt_server_data = region_map.region_name_to_smt_data_map['region-2']
+    smt_info_dicts = [
+        region_srv.get_smt_info_dict(update_server)
+        for update_server in smt_server_data
+    ]
+
+    for response_cache in (region_map.response_caches['json'], None):
+        response = region_srv.get_smt_server_response(
+            smt_server_data, 'json', response_cache
+        )
+        assert sorted(
+            json.loads(response), key=lambda smt_info: smt_info['SMTserverIP']
+        ) == smt_info_dicts
+
+    for response_cache in (region_map.response_caches['cbor'], None):
+        response = region_srv.get_smt_server_response(
+            smt_server_data, 'cbor', response_cache
+        )
+        assert sorted(
+            cbor_helper.decode(response),
+            key=lambda smt_info: smt_info['SMTserverIP']
+        ) == smt_info_dicts
+
+    response = region_srv.get_smt_server_response(
+        smt_server_data, 'xml', region_map.response_caches['xml']
+    )
+    xml_helper.assert_xml_validity(
+        etree.fromstring(response).findall('.//smtInfo'), region_2_data
+    )
+
+
+def test_compressed_responses():
+    region_map = region_srv.create_smt_region_map(
+        os.path.join(config_path, 'regionData_client_ips.cfg'),
+        compress=True
+    )
+    compressed_responses = region_map.compressed_responses['gzip']
+
+    assert sorted(compressed_responses) == ['cbor', 'json', 'xml']
+    responses = compressed_responses['xml']['region-2']
+    # One rotation per update server, each server comes first once
+    assert len(responses) == 2
+    first_servers = set()
+    for response in responses:
+        smt_info_elems = etree.fromstring(
+            gzip.decompress(response)
+        ).findall('.//smtInfo')
+        xml_helper.assert_xml_validity(smt_info_elems, list(region_2_data))
+        first_servers.add(smt_info_elems[0].attrib['SMTserverIP'])
+    assert first_servers == {'10.20.30.40', '50.60.70.80'}
+
+    smt_server_data = region_map.region_name_to_smt_data_map['region-1']
+    assert region_srv.get_compressed_response(
+        smt_server_data, region_map.compressed_responses, 'gzip', 'json'
+    ) in compressed_responses['json']['region-1']
+    assert get_region_map().compressed_responses is None
+
+
+def test_region_aliases():
+    region_aliases = region_srv.RegionAliases(
+        ['us-east-1', 'us-central1', 'us-east-1a'],
+        {'us-east-1': ('virginia', 'us-east')}
+    )
+
+    for region_hint, region in (
+            ('virginia', 'us-east-1'),
+            ('us-east', 'us-east-1'),
+            ('us-east-1b', 'us-east-1'),
+            ('us-east-1-b', 'us-east-1'),
+            ('us-easta', 'us-east-1'),
+            ('virginia-c', 'us-east-1'),
+            ('us_east_1', 'us-east-1'),
+            ('us-central1-a', 'us-central1'),
+            ('us-east-1a-b', 'us-east-1a'),
+            ('us-east-1', None),
+            ('us-east-1-ab', None),
+            ('europe', None)
+    ):
+        assert region_aliases.get(region_hint) == region
+    assert region_aliases.uses['us-east-1b'] == 1
+    assert 'europe' not in region_aliases.uses
+
+    with pytest.raises(ValueError, match='is a region name'):
+        region_srv.RegionAliases(
+            ['us-east-1', 'us-west-1'], {'us-east-1': ('us-west-1',)}
+        )
+    with pytest.raises(ValueError, match='is an alias of region us-east-1'):
+        region_srv.RegionAliases(
+            ['us-east-1', 'us-west-1'],
+            {'us-east-1': ('us',), 'us-west-1': ('us',)}
+        )
+
+
+def test_create_smt_region_map_with_aliases(tmp_path):
+    conf = tmp_path / 'regionData.cfg'
+    with open(conf, 'w') as region_data:
+        with open(
+                os.path.join(config_path, 'regionData_client_ips.cfg')
+        ) as template:
+            region_data.write(template.read())
+        region_data.write('aliases = Legacy-2, second\n')
+    region_map = region_srv.create_smt_region_map(str(conf))
+
+    assert region_map.region_aliases.configured == {
+        'region-2': ('legacy-2', 'second')
+    }
+    for region_hint in ('legacy-2', 'region-2c', 'second-a'):
+        xml = region_srv.get_response_xml(
+            '0.0.0.0', region_hint, region_map.region_name_to_smt_data_map,
+            region_map.ipv4_ranges_map, region_map.ipv6_ranges_map,
+            region_map.response_cache,
+            region_aliases=region_map.region_aliases
+        )
+        xml_helper.assert_xml_validity(
+            etree.fromstring(xml).findall('.//smtInfo'), region_2_data
+        )
+    assert region_map.region_aliases.uses == {
+        'legacy-2': 1, 'region-2c': 1, 'second-a': 1
+    }
+    assert [result['region'] for result in region_srv.get_batch_results(
+        [(None, 'region-1d'), (None, 'region-1')],
+        region_map.region_name_to_smt_data_map, region_map.ipv4_ranges_map,
+        region_map.ipv6_ranges_map, region_map.region_aliases
+    )] == ['region-1', 'region-1']
+
+    with open(conf, 'a') as region_data:
+        region_data.write('\n[region-3]\naliases = second\n')
+        region_data.write('smt-server-ip = 1.2.3.4\n')
+        region_data.write('smt-server-name = smt.susecloud.net\n')
+        region_data.write('smt-registry-name = registry.susecloud.net\n')
+        region_data.write('smt-fingerprint = aa:bb:cc\n')
+    with pytest.raises(SystemExit):
+        region_srv.create_smt_region_map(str(conf))
+
+
+@pytest.mark.parametrize('weights,expected', [
+    ('2', (2.0, 2.0, 2.0)),
+    ('1,0,2.5', (1.0, 0.0, 2.5)),
+    ('1,2', 'Ambiguous update server weight and IP pairings'),
+    ('1,x,2', 'Invalid update server weight'),
+    ('1,-1,2', 'must not be negative'),
+    ('inf', 'must not be negative'),
+    ('0,0,0', 'must not all be 0')
+])
+def test_parse_server_weights(weights, expected):
+    if isinstance(expected, tuple):
+        assert region_srv.parse_server_weights(weights, 3) == expected
+    else:
+        with pytest.raises(ValueError, match=expected):
+            region_srv.parse_server_weights(weights, 3)
+
+
+def test_cbor_long_strings():
+    update_server = ('1.2.3.4', None, 'a' * 300, 'b' * 70000, 'f', 'r')
+
+    assert cbor_helper.decode(region_srv.get_smt_info_cbor(update_server)) \
+        == region_srv.get_smt_info_dict(update_server)
+
+
+def test_update_server_records():
+    region_map = get_region_map()
+    smt_server_data = region_map.region_name_to_smt_data_map['region-1']
+
+    assert isinstance(smt_server_data, tuple)
+    assert smt_server_data[0].name == 'test-r1.susecloud.net'
+    assert smt_server_data[1].region == 'region-1'
+    assert region_map.ipv4_ranges_map.get('10.1.1.1') is smt_server_data
+    for _, render, _ in region_srv.RESPONSE_FORMATS.values():
+        for update_server in smt_server_data:
+            assert render(update_server) == render(tuple(update_server))
+
+    # Equal strings of different regions are shared
+    strings = {}
+    region_a = region_srv.parse_region_info(
+        '1.2.3.4,1.2.3.5', None, 'smt-a.susecloud.net,smt-b.susecloud.net',
+        'registry.susecloud.net', 'aa:bb:cc,aa:bb:cc', 'region-a', strings
+    )
+    region_b = region_srv.parse_region_info(
+        '1.2.3.5', None, 'smt-b.susecloud.net', 'registry.susecloud.net',
+        'aa:bb:cc', 'region-b', strings
+    )
+    assert region_a[1][:5] == region_b[0][:5]
+    for field_a, field_b in zip(region_a[1][:5], region_b[0][:5]):
+        assert field_a is field_b
+
+
+def test_flatten_ranges():
+    ranges = [
+        (0, 255, 'a'),
+        (16, 31, 'b'),
+        (20, 23, 'a'),
+        (64, 127, 'c'),
+        (128, 255, 'a'),
+        (300, 301, 'd'),
+        (300, 301, 'e')
+    ]
+
+    assert region_srv.flatten_ranges(ranges) == [
+        (0, 15, 'a'),
+        (16, 19, 'b'),
+        (20, 23, 'a'),
+        (24, 31, 'b'),
+        (32, 63, 'a'),
+        (64, 127, 'c'),
+        (128, 255, 'a'),
+        (300, 301, 'e')
+    ]
+
+
+def test_aggregate_ranges():
+    a = ['a']
+    b = ['b']
+    ranges = [
+        (0, 26, a),
+        (64, 26, a),
+        (128, 25, a),
+        (192, 27, a),
+        (0, 24, a),
+        (16, 28, a),
+        (32, 28, b),
+        (256, 24, a),
+        (512, 24, b)
+    ]
+
+    aggregated, conflicts = region_srv.aggregate_ranges(ranges, 32)
+    assert aggregated == [
+        (0, 23, a),
+        (32, 28, b),
+        (512, 24, b)
+    ]
+    assert conflicts == [((32, 28, b), (0, 26, a))]
+
+
+def test_aggregate_ranges_conflicts():
+    a = ['a']
+    b = ['b']
+    ranges = [
+        (0, 25, a),
+        (128, 25, a),
+        (0, 24, b)
+    ]
+
+    aggregated, conflicts = region_srv.aggregate_ranges(ranges, 32)
+    # The /24 of b is fully covered by the two /25 of a
+    assert aggregated == [(0, 24, a)]
+    assert conflicts == [((0, 25, a), (0, 24, b)), ((128, 25, a), (0, 24, b))]
+
+    aggregated, conflicts = region_srv.aggregate_ranges(
+        [(0, 24, a), (0, 24, b)], 32
+    )
+    assert aggregated == [(0, 24, b)]
+    assert conflicts == [((0, 24, b), (0, 24, a))]
+
+
+def test_parse_address():
+    assert region_srv.parse_address('10.1.2.3') == (32, b'\x0a\x01\x02\x03')
+    assert region_srv.parse_address('::ffff:10.1.2.3') == \
+        (32, b'\x0a\x01\x02\x03')
+    assert region_srv.parse_address('2001:db8::1') == \
+        (128, b'\x20\x01\x0d\xb8' + bytes(11) + b'\x01')
+    assert region_srv.parse_address('fe80::1%eth0') == \
+        (128, b'\xfe\x80' + bytes(13) + b'\x01')
+
+
+def test_parse_address_invalid():
+    with pytest.raises(ValueError):
+        region_srv.parse_address('10.1.2')
+
+
+@pytest.mark.parametrize('ip_range,bits', [
+    ('10.1.0.0/16', 32), ('10.1.0.0', 32), ('10.1.0.0/255.255.0.0', 32),
+    ('0.0.0.0/0', 32), ('10.1.0.1/16', 32), ('10.1.0.0/33', 32),
+    ('010.1.0.0/16', 32), ('10.1.0/16', 32), ('10.1.0.0/+16', 32),
+    ('10.1.0.0/', 32), ('2001:db8::/32', 32), ('2001:db8::/32', 128),
+    ('2001:DB8::/32', 128), ('::ffff:10.1.0.0/112', 128),
+    ('2001:db8::1/32', 128), ('2001:db8::/129', 128),
+    ('2001:00db8::/32', 128), ('fe80::%eth0/64', 128), ('::/0', 128)
+])
+def test_parse_network(ip_range, bits):
+    network_type = ipaddress.IPv4Network if bits == 32 \
+        else ipaddress.IPv6Network
+    try:
+        network = network_type(ip_range)
+    except ValueError:
+        with pytest.raises(ValueError):
+            region_srv.parse_network(ip_range, bits)
+    else:
+        assert region_srv.parse_network(ip_range, bits) == \
+            (int(network.network_address), network.prefixlen)
+
+
+def test_lookup_cache_eviction():
+    lookup_cache = region_srv.LookupCache(2)
+    lookup_cache.put('10.0.0.1', 'a')
+    lookup_cache.put('10.0.0.2', 'b')
+
+    assert lookup_cache.get('10.0.0.1') == 'a'
+
+    lookup_cache.put('10.0.0.3', 'c')
+
+    assert lookup_cache.get('10.0.0.2') is None
+    assert lookup_cache.get('10.0.0.3') == 'c'
+    assert (lookup_cache.hits, lookup_cache.misses) == (2, 1)
+    assert lookup_cache.evictions == 1
+    assert len(lookup_cache) == 2
+
+
+def test_lookup_cache_with_get_response_xml():
+    region_map = get_region_map()
+    lookup_cache = region_srv.LookupCache(10)
+
+    for _ in range(2):
+        for requester_ip in ('10.1.1.1', '1.1.1.1'):
+            region_srv.get_response_xml(
+                requester_ip,
+                None,
+                region_map.region_name_to_smt_data_map,
+                region_map.ipv4_ranges_map,
+                region_map.ipv6_ranges_map,
+                region_map.response_cache,
+                lookup_cache
+            )
+
+    assert (lookup_cache.hits, lookup_cache.misses) == (2, 2)
+    assert lookup_cache.get('10.1.1.1') == region_1_data
+    assert lookup_cache.get('1.1.1.1', 'missing') is None
+
+
+def test_create_smt_region_map_with_range_files():
+    conf = os.path.join(config_path, 'regionData_client_ips_files.cfg')
+    region_map = region_srv.create_smt_region_map(conf)
+
+    assert region_map.ipv4_ranges_map.get('10.2.3.4') == region_1_data
+    assert region_map.ipv4_ranges_map.get('10.5.3.4') == region_1_data
+    assert region_map.ipv4_ranges_map.get('10.3.3.4') == region_2_data
+    assert region_map.ipv6_ranges_map.get('2001:db8:1::1') == region_1_data
+    assert len(region_map.ipv4_ranges_map) == 4
+    assert region_map.source_files == (
+        conf,
+        os.path.join(config_path, 'ranges', 'region-1-ipv4.txt'),
+        os.path.join(config_path, 'ranges', 'region-1-ipv6.txt')
+    )
+
+
+def test_create_smt_region_map_with_missing_range_file(tmp_path):
+    conf = tmp_path / 'regionData.cfg'
+    with open(conf, 'w') as region_data:
+        region_data.write('[region-1]\n')
+        region_data.write('public-ips-file = missing.txt\n')
+        region_data.write('smt-server-ip = 1.2.3.4\n')
+        region_data.write('smt-server-name = smt.susecloud.net\n')
+        region_data.write('smt-registry-name = registry.susecloud.net\n')
+        region_data.write('smt-fingerprint = aa:bb:cc\n')
+
+    with pytest.raises(SystemExit):
+        region_srv.create_smt_region_map(str(conf))
+
+
+def test_create_smt_region_map_aggregated(tmp_path, caplog):
+    conf = tmp_path / 'regionData.cfg'
+    with open(conf, 'w') as region_data:
+        region_data.write('[region-1]\n')
+        region_data.write(
+            'public-ips = 10.1.0.0/17,10.1.128.0/17,10.1.2.0/24,10.2.0.0/16\n'
+        )
+        region_data.write('public-ipsv6 = 2001:db8::/33,2001:db8:8000::/33\n')
+        region_data.write('smt-server-ip = 1.2.3.4\n')
+        region_data.write('smt-server-name = smt-1.susecloud.net\n')
+        region_data.write('smt-registry-name = registry-1.susecloud.net\n')
+        region_data.write('smt-fingerprint = aa:bb:cc\n')
+        region_data.write('[region-2]\n')
+        region_data.write('public-ips = 10.1.3.0/24\n')
+        region_data.write('smt-server-ip = 5.6.7.8\n')
+        region_data.write('smt-server-name = smt-2.susecloud.net\n')
+        region_data.write('smt-registry-name = registry-2.susecloud.net\n')
+        region_data.write('smt-fingerprint = dd:ee:ff\n')
+
+    caplog.set_level('INFO')
+    region_map = region_srv.create_smt_region_map(str(conf), aggregate=True)
+
+    assert sorted(region_map.ipv4_ranges_map) == [
+        '10.1.0.0/16', '10.1.3.0/24', '10.2.0.0/16'
+    ]
+    assert list(region_map.ipv6_ranges_map) == ['2001:db8::/32']
+    assert region_map.ipv4_ranges_map.get('10.1.2.1')[0][5] == 'region-1'
+    assert region_map.ipv4_ranges_map.get('10.1.3.1')[0][5] == 'region-2'
+    assert 'IPv4 ranges: 5 configured, aggregated to 3, 1 conflicts' in \
+        caplog.text
+    assert 'IPv4 range 10.1.3.0/24 of region region-2 overlaps range ' \
+        '10.1.0.0/17 of region region-1' in caplog.text
@@ -0,0 +1,202 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import signal
+import sys
+import time
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+
+import region_srv
+
+
+def write_region_data(path, region):
+    with open(path, 'w') as region_data:
+        region_data.write('[%s]\n' % region)
+        region_data.write('public-ips = 10.0.0.0/8\n')
+        region_data.write('smt-server-ip = 1.2.3.4\n')
+        region_data.write('smt-server-name = smt.susecloud.net\n')
+        region_data.write('smt-registry-name = registry.susecloud.net\n')
+        region_data.write('smt-fingerprint = aa:bb:cc\n')
+
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_load(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    shutil.copy(
+        os.path.join(config_path, 'regionData_client_ips.cfg'), region_data
+    )
+    reloader = region_srv.RegionMapReloader(region_data)
+
+    assert reloader.load()
+    assert 'region-1' in reloader.region_map.region_name_to_smt_data_map
+    assert not reloader.check()
+
+
+def test_prepare_on_publish_and_refresh(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    write_region_data(region_data, 'region-a')
+    state = {'value': 1}
+    reloader = region_srv.RegionMapReloader(
+        region_data,
+        prepare=lambda region_map: region_map._replace(
+            weighted_responses=state['value']
+        )
+    )
+
+    reloader.refresh()
+    assert reloader.region_map is None
+    assert reloader.load()
+    assert reloader.region_map.weighted_responses == 1
+
+    state['value'] = 2
+    region_map = reloader.region_map
+    reloader.refresh()
+    assert reloader.region_map is not region_map
+    assert reloader.region_map.weighted_responses == 2
+    assert reloader.region_map.ipv4_ranges_map is region_map.ipv4_ranges_map
+
+
+def test_check_reloads_changed_file(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    write_region_data(region_data, 'region-a')
+    reloader = region_srv.RegionMapReloader(region_data)
+    reloader.load()
+    region_map = reloader.region_map
+
+    write_region_data(region_data + '.new', 'region-b')
+    os.rename(region_data + '.new', region_data)
+
+    assert reloader.check()
+    assert reloader.region_map is not region_map
+    assert reloader.region_map.ipv4_ranges_map.get('10.1.1.1')[0][5] == \
+        'region-b'
+
+
+def test_invalid_data_keeps_current_map(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    write_region_data(region_data, 'region-a')
+    reloader = region_srv.RegionMapReloader(region_data)
+    reloader.load()
+    region_map = reloader.region_map
+
+    with open(region_data, 'w') as invalid_data:
+        invalid_data.write('[region-a]\nsmt-server-ip = 1.2.3.4\n')
+
+    assert not reloader.load()
+    assert reloader.region_map is region_map
+
+
+def test_request_reload(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    write_region_data(region_data, 'region-a')
+    reloader = region_srv.RegionMapReloader(region_data)
+    reloader.load()
+    region_map = reloader.region_map
+    reloader.start()
+
+    reloader.request_reload()
+
+    assert wait_for(lambda: reloader.region_map is not region_map)
+
+
+def test_reload_starts_new_lookup_cache(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    write_region_data(region_data, 'region-a')
+    reloader = region_srv.RegionMapReloader(
+        region_data, lookup_cache_size=10
+    )
+    reloader.load()
+    lookup_cache = reloader.region_map.lookup_cache
+    lookup_cache.put('10.1.1.1', None)
+
+    reloader.load()
+
+    assert reloader.region_map.lookup_cache is not lookup_cache
+    assert len(reloader.region_map.lookup_cache) == 0
+
+
+def test_check_reloads_changed_range_file(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    ranges_file = str(tmp_path / 'ranges.txt')
+    with open(ranges_file, 'w') as ranges:
+        ranges.write('10.0.0.0/8\n')
+    with open(region_data, 'w') as region_data_file:
+        region_data_file.write('[region-a]\n')
+        region_data_file.write('public-ips-file = ranges.txt\n')
+        region_data_file.write('smt-server-ip = 1.2.3.4\n')
+        region_data_file.write('smt-server-name = smt.susecloud.net\n')
+        region_data_file.write(
+            'smt-registry-name = registry.susecloud.net\n'
+        )
+        region_data_file.write('smt-fingerprint = aa:bb:cc\n')
+    reloader = region_srv.RegionMapReloader(region_data)
+    reloader.load()
+
+    assert not reloader.check()
+
+    with open(ranges_file, 'a') as ranges:
+        ranges.write('11.0.0.0/8\n')
+
+    assert reloader.check()
+    assert reloader.region_map.ipv4_ranges_map.get('11.1.1.1')
+
+
+def test_load_with_other_loader(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    write_region_data(region_data, 'region-a')
+    loaded = []
+
+    def loader(conf, processes=1):
+        loaded.append(processes)
+        return region_srv.create_smt_region_map(conf, processes=processes)
+
+    reloader = region_srv.RegionMapReloader(region_data, loader=loader)
+
+    assert reloader.load(lambda conf: loader(conf, processes=2))
+    assert reloader.region_map.ipv4_ranges_map.get('10.1.1.1')[0][5] == \
+        'region-a'
+    assert reloader.load()
+    assert loaded == [2, 1]
+
+
+def test_install_signal_handler(tmp_path, monkeypatch, caplog):
+    reloader = region_srv.RegionMapReloader(str(tmp_path / 'regionData.cfg'))
+    handler = signal.getsignal(signal.SIGHUP)
+    try:
+        assert reloader.install_signal_handler()
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert wait_for(reloader._reload_requested.is_set)
+    finally:
+        signal.signal(signal.SIGHUP, handler)
+
+    # Like mod_wsgi with WSGIRestrictSignal On
+    monkeypatch.setattr(signal, 'signal', lambda signum, handler: None)
+    assert not reloader.install_signal_handler()
+    assert 'Reload signal handler was not installed' in caplog.text
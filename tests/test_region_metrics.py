@@ -0,0 +1,63 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import threading
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+
+sys.path.insert(0, code_path)
+
+import region_metrics
+
+
+def test_observe_buckets():
+    request_metrics = region_metrics.RequestMetrics()
+
+    request_metrics.observe('hint_hit', 900, 2000)
+    request_metrics.observe('not_found', 20000000)
+
+    totals = request_metrics.collect()
+    assert totals.requests == {
+        'hint_hit': 1, 'ipv4_hit': 0, 'ipv6_hit': 0, 'not_found': 1
+    }
+    assert totals.buckets['lookup'][0] == 1
+    assert totals.buckets['lookup'][-1] == 1
+    assert totals.buckets['render'][1] == 1
+    assert totals.sums == {'lookup': 20000900, 'render': 2000}
+
+
+def test_observe_from_many_threads():
+    request_metrics = region_metrics.RequestMetrics()
+
+    def observe():
+        for _ in range(1000):
+            request_metrics.observe('ipv4_hit', 1500, 1500)
+
+    threads = [threading.Thread(target=observe) for _ in range(15)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Shards of the ended threads are folded into one
+    assert request_metrics.collect().requests['ipv4_hit'] == 15000
+    assert request_metrics._shards == []
+    request_metrics.observe('ipv4_hit', 1500)
+    assert request_metrics.collect().requests['ipv4_hit'] == 15001
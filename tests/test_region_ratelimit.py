@@ -0,0 +1,71 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+
+sys.path.insert(0, code_path)
+
+import region_ratelimit
+
+
+def test_rate_limiter():
+    now = [0.0]
+    rate_limiter = region_ratelimit.RateLimiter(
+        2, 3, 2, ipv4_prefix=24, clock=lambda: now[0]
+    )
+
+    # A full bucket allows a burst, then rate requests per second
+    assert [rate_limiter.allow('10.1.1.1') for _ in range(4)] == \
+        [True, True, True, False]
+    assert not rate_limiter.allow('10.1.1.2')
+    assert not rate_limiter.allow('::ffff:10.1.1.3')
+    now[0] = 0.5
+    assert rate_limiter.allow('10.1.1.1')
+    assert not rate_limiter.allow('10.1.1.1')
+    assert rate_limiter.rejected == 4
+
+    # Addresses of the same IPv6 /64 share a bucket
+    for _ in range(3):
+        assert rate_limiter.allow('2001:db8::1')
+    assert not rate_limiter.allow('2001:db8::ffff:1')
+    assert rate_limiter.allow('2001:db8:0:1::1')
+
+    # The least recently seen clients are evicted
+    assert len(rate_limiter) == 2
+    assert rate_limiter.evictions == 1
+    assert rate_limiter.allow('10.1.1.1')
+    assert rate_limiter.evictions == 2
+
+    # Rejected clients are evicted as well
+    rate_limiter = region_ratelimit.RateLimiter(1, 0, 3)
+    for i in range(100):
+        assert not rate_limiter.allow('10.1.1.%d' % i)
+    assert len(rate_limiter) == 3
+    assert rate_limiter.evictions == 97
+
+
+def test_rate_limiter_cost():
+    rate_limiter = region_ratelimit.RateLimiter(1, 5, 10, clock=lambda: 0.0)
+
+    assert rate_limiter.allow('10.1.1.1', 4)
+    assert not rate_limiter.allow('10.1.1.1', 2)
+    assert rate_limiter.allow('10.1.1.1')
+    assert rate_limiter.rejected == 1
@@ -0,0 +1,200 @@
+# Copyright (c) 2026 SUSE LLC
+#
+# This file is part of cloud-regionsrv.
+#
+# cloud-regionsrv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cloud-regionsrv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with cloud-regionsrv.  If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing
+import os
+import shutil
+import sys
+import pytest
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+code_path = os.path.abspath('%s/../srv/www/regionService' % test_path)
+config_path = os.path.join(test_path, 'configs')
+
+sys.path.insert(0, code_path)
+
+import region_snapshot
+import region_srv
+
+addresses = [
+    '10.0.255.255', '10.1.0.0', '10.1.255.255', '10.2.3.4', '10.3.0.1',
+    '10.4.0.0', '0.0.0.0', '255.255.255.255', '2001:db8:1::1',
+    '2001:db8:2:ffff::1', '2001:db8:3::', '::', '::ffff:10.1.0.1'
+]
+
+
+@pytest.fixture
+def region_data(tmp_path):
+    region_data = str(tmp_path / 'regionData.cfg')
+    shutil.copy(
+        os.path.join(config_path, 'regionData_client_ips.cfg'), region_data
+    )
+    return region_data
+
+
+def lookup(region_map, address):
+    if ':' in address:
+        return region_map.ipv6_ranges_map.get(address)
+    return region_map.ipv4_ranges_map.get(address)
+
+
+def test_snapshot_matches_region_map(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+
+    assert region_snapshot.compile_region_map(region_data, snapshot)
+
+    region_map = region_srv.create_smt_region_map(region_data)
+    snapshot_map = region_snapshot.load_snapshot(snapshot)
+
+    assert snapshot_map.region_name_to_smt_data_map == \
+        region_map.region_name_to_smt_data_map
+    assert snapshot_map.response_cache == region_map.response_cache
+    for address in addresses:
+        assert lookup(snapshot_map, address) == lookup(region_map, address)
+
+
+def test_snapshot_with_weights_and_aliases(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+    with open(region_data, 'a') as region_data_file:
+        region_data_file.write('smt-server-weight = 3,1\n')
+        region_data_file.write('aliases = second\n')
+
+    assert region_snapshot.compile_region_map(region_data, snapshot)
+
+    snapshot_map = region_snapshot.load_snapshot(snapshot)
+    assert snapshot_map.server_weights == {'region-2': (3.0, 1.0)}
+    assert snapshot_map.region_aliases.regions == \
+        region_srv.create_smt_region_map(region_data).region_aliases.regions
+
+
+def test_load_region_map_uses_current_snapshot(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+    region_snapshot.compile_region_map(region_data, snapshot)
+
+    assert region_snapshot.is_current(snapshot, region_data)
+
+    region_map = region_snapshot.load_region_map(region_data, snapshot)
+
+    assert isinstance(
+        region_map.ipv4_ranges_map, region_srv.IntervalRanges
+    )
+
+
+def test_load_region_map_ignores_stale_snapshot(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+    region_snapshot.compile_region_map(region_data, snapshot)
+    with open(region_data, 'a') as region_data_file:
+        region_data_file.write('\n')
+
+    assert not region_snapshot.is_current(snapshot, region_data)
+
+    region_map = region_snapshot.load_region_map(region_data, snapshot)
+
+    assert not isinstance(
+        region_map.ipv4_ranges_map, region_srv.IntervalRanges
+    )
+
+
+def test_load_snapshot_rejects_other_files(region_data):
+    with pytest.raises(ValueError, match='Not a region map snapshot'):
+        region_snapshot.load_snapshot(region_data)
+
+
+def test_snapshot_with_range_files(tmp_path):
+    shutil.copytree(config_path, str(tmp_path / 'configs'))
+    region_data = str(tmp_path / 'configs' / 'regionData_client_ips_files.cfg')
+    ranges_file = str(tmp_path / 'configs' / 'ranges' / 'region-1-ipv4.txt')
+    snapshot = str(tmp_path / 'regionData.snap')
+    region_snapshot.compile_region_map(region_data, snapshot)
+
+    assert region_snapshot.is_current(snapshot, region_data)
+    assert region_snapshot.load_snapshot(snapshot).ipv4_ranges_map.get(
+        '10.5.0.1'
+    )[0][5] == 'region-1'
+
+    with open(ranges_file, 'a') as ranges:
+        ranges.write('10.6.0.0/16\n')
+
+    assert not region_snapshot.is_current(snapshot, region_data)
+
+
+def test_snapshot_with_range_file_changed_while_compiling(
+        tmp_path, monkeypatch
+):
+    shutil.copytree(config_path, str(tmp_path / 'configs'))
+    region_data = str(tmp_path / 'configs' / 'regionData_client_ips_files.cfg')
+    ranges_file = str(tmp_path / 'configs' / 'ranges' / 'region-1-ipv4.txt')
+    snapshot = str(tmp_path / 'regionData.snap')
+    create_smt_region_map = region_srv.create_smt_region_map
+
+    def create_and_change(conf, **kwargs):
+        region_map = create_smt_region_map(conf, **kwargs)
+        with open(ranges_file, 'a') as ranges:
+            ranges.write('10.6.0.0/16\n')
+        return region_map
+
+    monkeypatch.setattr(
+        region_srv, 'create_smt_region_map', create_and_change
+    )
+    assert region_snapshot.compile_region_map(region_data, snapshot)
+    assert not region_snapshot.is_current(snapshot, region_data)
+
+
+def test_snapshot_generation(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+
+    assert region_snapshot.read_generation(snapshot) == 0
+    region_snapshot.compile_region_map(region_data, snapshot)
+    region_snapshot.compile_region_map(region_data, snapshot)
+
+    assert region_snapshot.read_generation(snapshot) == 2
+    assert region_snapshot.load_snapshot(snapshot).generation == 2
+
+
+def test_load_shared_region_map(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+
+    region_map = region_snapshot.load_shared_region_map(region_data, snapshot)
+    assert region_map.generation == 1
+    assert region_map.source_files == (region_data, snapshot)
+    assert lookup(region_map, '10.2.3.4')[0][5] == 'region-1'
+
+    # A current snapshot is mapped without compiling it again
+    region_map = region_snapshot.load_shared_region_map(region_data, snapshot)
+    assert region_map.generation == 1
+
+    with open(region_data, 'a') as region_data_file:
+        region_data_file.write('\n')
+    region_map = region_snapshot.load_shared_region_map(region_data, snapshot)
+    assert region_map.generation == 2
+
+
+def load_shared_generation(region_data, snapshot):
+    return region_snapshot.load_shared_region_map(
+        region_data, snapshot
+    ).generation
+
+
+def test_load_shared_region_map_from_many_processes(region_data, tmp_path):
+    snapshot = str(tmp_path / 'regionData.snap')
+
+    # Only one process compiles the snapshot, all map the same generation
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        generations = pool.starmap(
+            load_shared_generation, [(region_data, snapshot)] * 8
+        )
+    assert generations == [1] * 8